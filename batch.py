@@ -0,0 +1,95 @@
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from cache import open_cache
+from validator import BoazValidator
+
+# upper bound on how many files a worker is handed at once, big enough
+# to amortise the inter-process round trip, small enough to keep every
+# worker busy until the end of the run
+MAX_CHUNKSIZE = 256
+
+def collect_files(patterns, files_from=None):
+    '''
+    Expands directories (searched recursively for .boaz files), globs and
+    plain paths, plus one path per line of the files_from list ('-' for
+    stdin). Returns them deduplicated and sorted so output order is stable
+    '''
+    paths = set()
+
+    if (files_from is not None):
+        if (files_from == "-"):
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(files_from) as f:
+                lines = f.read().splitlines()
+        patterns = list(patterns) + [line.strip() for line in lines if line.strip()]
+
+    for pattern in patterns:
+        if (os.path.isdir(pattern)):
+            paths.update(glob.glob(os.path.join(pattern, "**", "*.boaz"), recursive=True))
+        elif (glob.has_magic(pattern)):
+            paths.update(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+        else:
+            paths.add(pattern)
+
+    return sorted(set(map(os.path.normpath, paths)))
+
+def validate_file(path, cache_path=None, cache_size=None, tier="full", limits=None):
+    '''
+    Worker entry point, returns (path, "ok" or "error", error kind).
+    With cache_path, unchanged files are answered from that ParseCache.
+    tier is how much of the analysis is run, see BoazValidator.TIERS,
+    and limits the Limits each file is validated within
+    '''
+    cache = open_cache(cache_path, cache_size) if cache_path else None
+
+    try:
+        with open(path, "r") as f:
+            validator = BoazValidator(f, cache, tier=tier, limits=limits)
+            if (validator.run()):
+                return (path, "ok", "")
+            return (path, "error", validator.error_kind)
+    except (OSError, UnicodeDecodeError) as e:
+        return (path, "error", type(e).__name__)
+
+def run_batch(paths, jobs=None, cache_path=None, cache_size=None, tier="full", limits=None):
+    '''
+    Yields one result per path, in the order of paths. jobs is the
+    number of worker processes, None for one per core and 1 to validate
+    in this process
+    '''
+    jobs = jobs or os.cpu_count() or 1
+    validate = partial(validate_file, cache_path=cache_path, cache_size=cache_size, tier=tier, limits=limits)
+
+    if (jobs == 1 or len(paths) <= 1):
+        yield from map(validate, paths)
+        return
+
+    chunksize = max(1, min(MAX_CHUNKSIZE, len(paths) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(validate, paths, chunksize=chunksize)
+
+def main(patterns, jobs=None, files_from=None, cache_path=None, cache_size=None, tier="full", limits=None, out=sys.stdout):
+    '''
+    Prints a tab separated 'path, ok/error, error kind' line per file and
+    a summary on stderr. Exit code is 0 if every file is ok, 1 if any
+    failed and 2 if nothing matched
+    '''
+    paths = collect_files(patterns, files_from)
+    if (not paths):
+        print("no .boaz files found", file=sys.stderr)
+        return 2
+
+    failed = 0
+    for path, verdict, kind in run_batch(paths, jobs, cache_path, cache_size, tier, limits):
+        if (verdict == "ok"):
+            print(path, verdict, sep="\t", file=out)
+        else:
+            failed += 1
+            print(path, verdict, kind, sep="\t", file=out)
+
+    print("{} files, {} ok, {} error".format(len(paths), len(paths)-failed, failed), file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,168 @@
+'''
+Benchmarks Tokenizer.tokenize and Parser.parse separately on generated
+Boaz programs, reporting tokens/sec, time and peak memory per phase.
+Lexing is the "lex" validation tier, parsing is timed both without the
+semantic checks (the "syntax" tier) and with them ("full")
+
+    python benchmarks/bench.py                        # run the default scenarios
+    python benchmarks/bench.py --save baseline.json   # ... and record them
+    python benchmarks/bench.py --check baseline.json  # fail on regressions
+    python benchmarks/bench.py --statements 50000 --depth 8 --expression-length 20
+'''
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.generator import generate
+from tokenizer import Tokenizer
+from myparser import Parser
+
+# name -> generator knobs
+SCENARIOS = {
+    "small": dict(statements=100, variables=5),
+    "large": dict(statements=20000, variables=50),
+    "long_expressions": dict(statements=2000, expression_length=40),
+    "deep_nesting": dict(statements=5000, depth=40),
+    "char_heavy": dict(statements=5000, char_ratio=0.9),
+}
+
+def time_phases(code, repeat):
+    '''
+    Best of repeat runs, (token count, tokenize seconds, syntax only
+    parse seconds, parse seconds)
+    '''
+    tokenize_times, syntax_times, parse_times = [], [], []
+
+    for _ in range(repeat):
+        tokenizer = Tokenizer(code)
+        start = time.perf_counter()
+        tokenizer.tokenize()
+        tokenize_times.append(time.perf_counter() - start)
+
+        parser = Parser(tokenizer)
+        parser.SEMANTIC_CHECKS = False
+        start = time.perf_counter()
+        parser.parse()
+        syntax_times.append(time.perf_counter() - start)
+
+        tokenizer.CURRENT_TOKEN = 0
+        parser = Parser(tokenizer)
+        start = time.perf_counter()
+        parser.parse()
+        parse_times.append(time.perf_counter() - start)
+
+    return (len(tokenizer.TOKENS), min(tokenize_times), min(syntax_times), min(parse_times))
+
+def peak_memory(code):
+    '''
+    Peak bytes allocated by each phase, measured apart from the timings
+    as tracing slows everything down
+    '''
+    tokenizer = Tokenizer(code)
+    tracemalloc.start()
+    tokenizer.tokenize()
+    tokenize_peak = tracemalloc.get_traced_memory()[1]
+
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    Parser(tokenizer).parse()
+    parse_peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    return (tokenize_peak, parse_peak)
+
+def run_scenario(knobs, seed, repeat):
+    code = generate(seed, **knobs)
+    tokens, tokenize_time, syntax_time, parse_time = time_phases(code, repeat)
+    tokenize_peak, parse_peak = peak_memory(code)
+
+    return {
+        "source_bytes": len(code),
+        "tokens": tokens,
+        "tokenize_seconds": tokenize_time,
+        "tokenize_tokens_per_second": tokens / tokenize_time,
+        "tokenize_peak_bytes": tokenize_peak,
+        "syntax_seconds": syntax_time,
+        "syntax_tokens_per_second": tokens / syntax_time,
+        "parse_seconds": parse_time,
+        "parse_tokens_per_second": tokens / parse_time,
+        "parse_peak_bytes": parse_peak,
+    }
+
+def check(results, baseline, tolerance):
+    '''
+    Returns the regressions against baseline, a throughput more than
+    tolerance (a fraction) below the recorded one
+    '''
+    regressions = []
+    for name, result in results.items():
+        if (name not in baseline):
+            continue
+        for metric in ("tokenize_tokens_per_second", "syntax_tokens_per_second", "parse_tokens_per_second"):
+            # baselines saved before a metric was added
+            if (metric not in baseline[name]):
+                continue
+            recorded = baseline[name][metric]
+            if (result[metric] < recorded * (1 - tolerance)):
+                regressions.append("{} {}: {:.0f} < {:.0f}".format(name, metric, result[metric], recorded))
+    return regressions
+
+def report(name, result, out=sys.stdout):
+    print("{:<18} {:>9} tokens  tokenize {:>8.4f}s {:>11.0f} tok/s {:>8.1f} KiB  syntax {:>8.4f}s {:>11.0f} tok/s  parse {:>8.4f}s {:>11.0f} tok/s {:>8.1f} KiB".format(
+        name, result["tokens"],
+        result["tokenize_seconds"], result["tokenize_tokens_per_second"], result["tokenize_peak_bytes"] / 1024,
+        result["syntax_seconds"], result["syntax_tokens_per_second"],
+        result["parse_seconds"], result["parse_tokens_per_second"], result["parse_peak_bytes"] / 1024,
+    ), file=out)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the Boaz tokenizer and parser")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per scenario, the best is kept")
+    parser.add_argument("--statements", type=int, help="run one custom scenario with these knobs instead of the defaults")
+    parser.add_argument("--variables", type=int, default=10)
+    parser.add_argument("--expression-length", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--char-ratio", type=float, default=0.3)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--save", metavar="FILE", help="save the results as a baseline")
+    parser.add_argument("--check", metavar="FILE", help="exit with 1 if throughput regressed against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline, as a fraction")
+    args = parser.parse_args(argv)
+
+    scenarios = SCENARIOS
+    if (args.statements is not None):
+        scenarios = {"custom": dict(
+            statements=args.statements, variables=args.variables, expression_length=args.expression_length,
+            depth=args.depth, char_ratio=args.char_ratio
+        )}
+
+    results = {}
+    for name, knobs in scenarios.items():
+        results[name] = run_scenario(knobs, args.seed, args.repeat)
+        if (not args.json):
+            report(name, results[name])
+
+    if (args.json):
+        print(json.dumps(results, indent=2))
+
+    if (args.save):
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if (args.check):
+        with open(args.check) as f:
+            regressions = check(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print("regression: " + regression, file=sys.stderr)
+        return 1 if regressions else 0
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
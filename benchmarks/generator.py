@@ -0,0 +1,145 @@
+import random
+
+class BoazGenerator:
+    '''
+    Seeded generator of synthetic Boaz programs. The same seed and knobs
+    always give the same program
+
+    - statements: number of statements, nested ones included
+    - variables: number of declared variables
+    - expression_length: number of terms in each generated expression
+    - depth: maximum nesting of if/while statements
+    - char_ratio: fraction of the variables (and expressions) of type char
+    - error: None for a valid program, or "lexical", "syntax" or
+      "semantic" to put exactly one error of that kind in it
+    '''
+
+    ERRORS = (None, "lexical", "syntax", "semantic")
+
+    def __init__(self, seed=0, statements=100, variables=10, expression_length=4, depth=3, char_ratio=0.3, error=None):
+        if (error not in self.ERRORS):
+            raise ValueError("error has to be one of {}".format(self.ERRORS))
+
+        self.random = random.Random(seed)
+        self.statements = statements
+        self.variables = max(1, variables)
+        self.expression_length = max(1, expression_length)
+        self.depth = depth
+        self.char_ratio = char_ratio
+        self.error = error
+
+    def generate(self):
+        names = ["v{}".format(i) for i in range(self.variables)]
+        chars = set(name for name in names if self.random.random() < self.char_ratio)
+        self.types = {name: ("char" if name in chars else "int") for name in names}
+
+        lines = ["program generated"]
+        for var_type in ("int", "char"):
+            declared = [name for name in names if self.types[name] == var_type]
+            if (declared):
+                lines.append("{} {};".format(var_type, ", ".join(declared)))
+        lines.append("begin")
+        lines.extend(self.statement_lines(self.statements))
+        lines.append("end")
+
+        if (self.error is not None):
+            self.add_error(lines)
+
+        return "\n".join(lines) + "\n"
+
+    def statement_lines(self, count):
+        '''
+        count statements as indented lines, if/while blocks are opened
+        while there is room for a body under the depth limit
+        '''
+        lines = []
+        # open blocks, (closing keyword, statements left in its body)
+        blocks = []
+
+        while (count > 0 or blocks):
+            indent = "    " * (len(blocks) + 1)
+
+            if (blocks and (blocks[-1][1] == 0 or count == 0)):
+                closing, _ = blocks.pop()
+                lines.append("    " * (len(blocks) + 1) + closing + ";")
+                continue
+
+            count -= 1
+            if (blocks):
+                blocks[-1][1] -= 1
+
+            choice = self.random.random()
+            if (len(blocks) < self.depth and count > 0 and choice < 0.2):
+                body = self.random.randint(1, max(1, min(count, 8)))
+                if (self.random.random() < 0.5):
+                    lines.append(indent + "while " + self.expression("bool") + " do")
+                    blocks.append(["od", body])
+                else:
+                    lines.append(indent + "if " + self.expression("bool") + " then")
+                    blocks.append(["fi", body])
+            elif (choice < 0.3):
+                lines.append(indent + "print " + self.expression(self.random.choice(("int", "char"))) + ";")
+            else:
+                name = self.random.choice(list(self.types))
+                lines.append(indent + name + " := " + self.expression(self.types[name]) + ";")
+
+        return lines
+
+    def term(self, expression_type):
+        variables = [name for name, var_type in self.types.items() if var_type == expression_type]
+        if (variables and self.random.random() < 0.5):
+            term = self.random.choice(variables)
+        elif (expression_type == "char"):
+            term = '"{}"'.format(self.random.choice("abcdefghijklmnopqrstuvwxyz"))
+        else:
+            term = str(self.random.randint(0, 999))
+
+        if (expression_type == "int" and self.random.random() < 0.1):
+            term = "-" + term
+        return term
+
+    def expression(self, expression_type):
+        length = self.expression_length
+
+        if (expression_type == "bool"):
+            # a comparison of two halves, maybe negated or combined
+            left = self.arithmetic("int", max(1, length // 2))
+            right = self.arithmetic("int", max(1, length - length // 2))
+            expression = "{} {} {}".format(left, self.random.choice(("=", "!=", "<", ">", "<=", ">=")), right)
+            if (self.random.random() < 0.2):
+                expression = "!(" + expression + ")"
+            if (self.random.random() < 0.2):
+                expression += " {} {} < {}".format(self.random.choice("&|"), self.term("int"), self.term("int"))
+            return expression
+
+        return self.arithmetic(expression_type, length)
+
+    def arithmetic(self, expression_type, length):
+        # a char expression needs at least one char term, the rest can be ints
+        terms = [self.term(expression_type)]
+        for _ in range(length - 1):
+            term_type = "char" if (expression_type == "char" and self.random.random() < 0.5) else "int"
+            terms.append(self.term(term_type))
+
+        expression = terms[0]
+        for term in terms[1:]:
+            expression += " {} {}".format(self.random.choice("+-*/"), term)
+
+        if (length > 2 and self.random.random() < 0.2):
+            expression = "(" + expression + ")"
+        return expression
+
+    def add_error(self, lines):
+        # somewhere between 'begin' and 'end'
+        begin = lines.index("begin")
+        index = self.random.randint(begin + 1, len(lines) - 2) if len(lines) - 2 > begin else begin + 1
+
+        if (self.error == "lexical"):
+            lines.insert(index, "    ?")
+        elif (self.error == "syntax"):
+            lines.insert(index, "    := ;")
+        else:
+            lines.insert(index, "    undeclared := 1;")
+
+def generate(seed=0, **knobs):
+    return BoazGenerator(seed, **knobs).generate()
@@ -0,0 +1,224 @@
+'''
+Compares loop throughput of compiled bytecode on vm.VM against a naive
+AST walking interpreter, on while heavy Boaz programs
+
+    python benchmarks/vmbench.py
+    python benchmarks/vmbench.py --iterations 200000 --json
+'''
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compiler import Compiler
+from myparser import Parser
+from tokenizer import Tokenizer
+from vm import VM
+
+# name -> program with an {outer} x {inner} loop nest, each scenario's
+# inner loop body runs outer * inner times
+SCENARIOS = {
+    "counting": '''program counting int i, j, sum; begin
+        sum := 0; i := 0;
+        while i < {outer} do
+            j := 0;
+            while j < {inner} do sum := sum + j; j := j + 1; od;
+            i := i + 1;
+        od;
+        print sum;
+    end;''',
+    "branching": '''program branching int i, j, even, odd; begin
+        even := 0; odd := 0; i := 0;
+        while i < {outer} do
+            j := 0;
+            while j < {inner} do
+                if j / 2 * 2 = j then even := even + 1; else odd := odd + 1; fi;
+                j := j + 1;
+            od;
+            i := i + 1;
+        od;
+        print even; print odd;
+    end;''',
+    "chars": '''program chars int i, j, vowels; char c; begin
+        vowels := 0; i := 0;
+        while i < {outer} do
+            j := 0; c := "a";
+            while j < {inner} & c <= "z" do
+                if c = "a" | c = "e" | c = "i" | c = "o" | c = "u" then vowels := vowels + 1; fi;
+                c := c + 1; j := j + 1;
+            od;
+            i := i + 1;
+        od;
+        print vowels; print c;
+    end;''',
+}
+
+class AstInterpreter:
+    '''
+    The straightforward interpreter the VM is measured against, walks
+    the AST recursively with variables in a dict. Same semantics as vm.VM
+    '''
+
+    def __init__(self, out):
+        self.out = out
+        self.variables = {}
+        self.types = {}
+
+    def run(self, program, symbol_table):
+        self.types = dict(symbol_table)
+        self.variables = dict.fromkeys(symbol_table, 0)
+        self.execute(program.body)
+
+    def execute(self, body):
+        for node in body:
+            getattr(self, "execute_" + type(node).__name__)(node)
+
+    def execute_Assign(self, node):
+        value = self.evaluate(node.value)
+        if (self.types[node.target.name] == "char"):
+            value &= 0xFF
+        self.variables[node.target.name] = value
+
+    def execute_If(self, node):
+        if (self.evaluate(node.condition)):
+            self.execute(node.body)
+        else:
+            self.execute(node.orelse)
+
+    def execute_While(self, node):
+        while (self.evaluate(node.condition)):
+            self.execute(node.body)
+
+    def execute_Print(self, node):
+        value = self.evaluate(node.value)
+        if (node.value.type == "char"):
+            self.out.write(chr(value & 0xFF) + "\n")
+        elif (node.value.type == "bool"):
+            self.out.write("true\n" if value else "false\n")
+        else:
+            self.out.write("{}\n".format(int(value)))
+
+    def evaluate(self, node):
+        return getattr(self, "evaluate_" + type(node).__name__)(node)
+
+    def evaluate_Const(self, node):
+        return node.value if node.kind == "INT_CONST" else ord(node.value)
+
+    def evaluate_Ref(self, node):
+        return self.variables[node.name]
+
+    def evaluate_UnaryOp(self, node):
+        value = self.evaluate(node.operand)
+        return -value if node.op == "-" else not value
+
+    def evaluate_BinOp(self, node):
+        left = self.evaluate(node.left)
+        right = self.evaluate(node.right)
+        op = node.op
+
+        if (op == "+"):
+            return left + right
+        if (op == "-"):
+            return left - right
+        if (op == "*"):
+            return left * right
+        if (op == "/"):
+            return VM.divide(left, right)
+        if (op == "&"):
+            return bool(left) and bool(right)
+        if (op == "|"):
+            return bool(left) or bool(right)
+        if (op == "="):
+            return left == right
+        if (op == "!="):
+            return left != right
+        if (op == "<"):
+            return left < right
+        if (op == ">"):
+            return left > right
+        if (op == "<="):
+            return left <= right
+        return left >= right
+
+def parse(code):
+    tokenizer = Tokenizer(code)
+    tokenizer.tokenize()
+    parser = Parser(tokenizer)
+    return parser.parse(build_ast=True), parser.SYMBOL_TABLE
+
+def best_time(run, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = run()
+        times.append(time.perf_counter() - start)
+    return min(times), output
+
+def run_scenario(template, outer, inner, repeat):
+    program, symbol_table = parse(template.format(outer=outer, inner=inner))
+    iterations = outer * inner
+
+    start = time.perf_counter()
+    bytecode = Compiler.compile(program, symbol_table)
+    compile_time = time.perf_counter() - start
+
+    def run_ast():
+        out = io.StringIO()
+        AstInterpreter(out).run(program, symbol_table)
+        return out.getvalue()
+
+    def run_vm():
+        out = io.StringIO()
+        VM(bytecode, out).run()
+        return out.getvalue()
+
+    ast_time, ast_output = best_time(run_ast, repeat)
+    vm_time, vm_output = best_time(run_vm, repeat)
+    if (ast_output != vm_output):
+        raise AssertionError("VM and AST interpreter disagree: {!r} != {!r}".format(vm_output, ast_output))
+
+    return {
+        "iterations": iterations,
+        "instructions": len(bytecode.code),
+        "compile_seconds": compile_time,
+        "ast_seconds": ast_time,
+        "ast_iterations_per_second": iterations / ast_time,
+        "vm_seconds": vm_time,
+        "vm_iterations_per_second": iterations / vm_time,
+        "speedup": ast_time / vm_time,
+    }
+
+def report(name, result, out=sys.stdout):
+    print("{:<10} {:>9} iterations  ast {:>8.4f}s {:>10.0f} it/s  vm {:>8.4f}s {:>10.0f} it/s  {:>5.2f}x".format(
+        name, result["iterations"],
+        result["ast_seconds"], result["ast_iterations_per_second"],
+        result["vm_seconds"], result["vm_iterations_per_second"],
+        result["speedup"],
+    ), file=out)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the Boaz VM against an AST walking interpreter")
+    parser.add_argument("--iterations", type=int, default=50000, help="inner loop iterations per scenario")
+    parser.add_argument("--inner", type=int, default=100, help="iterations of the inner loop per outer one")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per interpreter, the best is kept")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, template in SCENARIOS.items():
+        # the chars scenario's inner loop stops after 'z'
+        inner = min(args.inner, 26) if name == "chars" else args.inner
+        results[name] = run_scenario(template, max(1, args.iterations // inner), inner, args.repeat)
+        if (not args.json):
+            report(name, results[name])
+
+    if (args.json):
+        print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,90 @@
+from constants import BOOL_TYPE, CHAR_TYPE
+
+class Node:
+    '''
+    Base of the Boaz AST nodes. start and end are the span of the node
+    in the token stream, the index of its first token and one past its
+    last one, a TokenStore maps them back to source offsets
+    '''
+    __slots__ = ("start", "end")
+    _fields = ()
+
+    def __init__(self, start, end, *values):
+        self.start = start
+        self.end = end
+        for name, value in zip(self._fields, values):
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        '''
+        Structural equality, spans are ignored
+        '''
+        if (type(self) is not type(other)):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({})".format(
+            type(self).__name__,
+            ", ".join("{}={!r}".format(name, getattr(self, name)) for name in self._fields)
+        )
+
+    def source_span(self, tokens):
+        '''
+        (start, end) offsets of the node in the source tokens were lexed from
+        '''
+        return (tokens.starts[self.start], tokens.ends[self.end-1])
+
+class Program(Node):
+    __slots__ = _fields = ("name", "declarations", "body")
+
+class VarDec(Node):
+    __slots__ = _fields = ("type", "names")
+
+class Assign(Node):
+    __slots__ = _fields = ("target", "value")
+
+class If(Node):
+    __slots__ = _fields = ("condition", "body", "orelse")
+
+class While(Node):
+    __slots__ = _fields = ("condition", "body")
+
+class Print(Node):
+    __slots__ = _fields = ("value",)
+
+class Expression(Node):
+    '''
+    flags are the or-ed type flags of the expression and everything in
+    it, as used by Parser.check_matching_types
+    '''
+    __slots__ = ("flags",)
+
+    def __init__(self, start, end, flags, *values):
+        Node.__init__(self, start, end, *values)
+        self.flags = flags
+
+    @property
+    def type(self):
+        if (self.flags & BOOL_TYPE):
+            return "bool"
+        if (self.flags & CHAR_TYPE):
+            return "char"
+        return "int"
+
+class BinOp(Expression):
+    __slots__ = _fields = ("op", "left", "right")
+
+class UnaryOp(Expression):
+    __slots__ = _fields = ("op", "operand")
+
+class Const(Expression):
+    '''
+    value is the int for an INT_CONST or the character of a CHAR_CONST
+    '''
+    __slots__ = _fields = ("kind", "value")
+
+class Ref(Expression):
+    __slots__ = _fields = ("name",)
@@ -0,0 +1,127 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+import time
+from constants import VERSION
+
+class ParseCache:
+    '''
+    Verdicts of sources that were already validated, keyed by a hash of
+    the source and VERSION, optionally with the tokens they lexed to.
+    Kept in an SQLite database so any number of processes can share it,
+    the least recently used entries are evicted once the stored results
+    go over max_bytes
+    '''
+
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    # rough per entry overhead on top of the stored token bytes
+    ENTRY_SIZE = 128
+
+    # seconds a hit's last_used is left alone for, so a run of hits
+    # doesn't write to the database every time
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, path, max_bytes=None):
+        self.path = path
+        self.max_bytes = max_bytes or self.DEFAULT_MAX_BYTES
+        # autocommit, transactions are opened explicitly where needed
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, ok INTEGER NOT NULL, error TEXT,"
+            " tokens BLOB, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        # the running total of results' sizes, kept by put() and evict()
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)")
+        self.db.execute("INSERT OR IGNORE INTO meta (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM results")
+
+    @staticmethod
+    def key(source, tier="full"):
+        '''
+        source is the program text, as a str or ASCII bytes-like (the
+        same key either way), or an open text file, which is read to
+        its end. Verdicts of the cheaper validation tiers are kept apart
+        from full ones
+        '''
+        digest = hashlib.sha256(VERSION.encode() + b"\0")
+        if (tier != "full"):
+            digest.update(tier.encode() + b"\0")
+        if (isinstance(source, str)):
+            digest.update(source.encode("utf-8", "surrogatepass"))
+        elif (isinstance(source, (bytes, bytearray, mmap.mmap))):
+            digest.update(source)
+        else:
+            for chunk in iter(lambda: source.read(1 << 16), ""):
+                digest.update(chunk.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        '''
+        Returns (ok, error kind, token bytes or None), or None when the
+        source isn't cached
+        '''
+        row = self.db.execute("SELECT ok, error, tokens, last_used FROM results WHERE key = ?", (key,)).fetchone()
+        if (row is None):
+            return None
+
+        now = time.time()
+        if (now - row[3] > self.TOUCH_INTERVAL):
+            self.db.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+        return (bool(row[0]), row[1], row[2])
+
+    def put(self, key, ok, error=None, tokens=None):
+        size = self.ENTRY_SIZE + (len(tokens) if tokens is not None else 0)
+
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            old = self.db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO results (key, ok, error, tokens, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, int(ok), error, tokens, size, time.time())
+            )
+            self.db.execute("UPDATE meta SET total = total + ? WHERE id = 0", (size - (old[0] if old else 0),))
+            self.evict()
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def evict(self):
+        # called inside put()'s transaction, which keeps meta's total right
+        total = self.db.execute("SELECT total FROM meta WHERE id = 0").fetchone()[0]
+        if (total <= self.max_bytes):
+            return
+
+        # drop the least recently used entries until back under the cap
+        excess = total - self.max_bytes
+        rows = self.db.execute("SELECT key, size FROM results ORDER BY last_used")
+        stale = []
+        freed = 0
+        for key, size in rows:
+            stale.append((key,))
+            freed += size
+            if (freed >= excess):
+                break
+        self.db.executemany("DELETE FROM results WHERE key = ?", stale)
+        self.db.execute("UPDATE meta SET total = total - ? WHERE id = 0", (freed,))
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+# one connection per cache file per process, batch workers reuse theirs
+# for every file they're handed
+_OPEN_CACHES = {}
+
+def open_cache(path, max_bytes=None):
+    path = os.path.abspath(path)
+    if (path not in _OPEN_CACHES):
+        _OPEN_CACHES[path] = ParseCache(path, max_bytes)
+    return _OPEN_CACHES[path]
@@ -0,0 +1,145 @@
+from boazast import Assign, If, While, Print, BinOp, UnaryOp, Const, Ref
+
+# opcodes, the ones taking an operand are followed by it in the code,
+# roughly in the order the VM tests for them
+(LOAD, CONST, STORE, STORE_CHAR, ADD, SUB, LT, GT, EQ, NE, LE, GE, MUL, DIV,
+ AND, OR, NEG, NOT, JUMP, JUMP_IF_TRUE, JUMP_IF_FALSE, PRINT_INT, PRINT_CHAR,
+ PRINT_BOOL, HALT) = range(25)
+
+OPCODE_NAMES = (
+    "LOAD", "CONST", "STORE", "STORE_CHAR", "ADD", "SUB", "LT", "GT", "EQ", "NE", "LE", "GE", "MUL", "DIV",
+    "AND", "OR", "NEG", "NOT", "JUMP", "JUMP_IF_TRUE", "JUMP_IF_FALSE", "PRINT_INT", "PRINT_CHAR",
+    "PRINT_BOOL", "HALT"
+)
+HAS_OPERAND = frozenset((LOAD, CONST, STORE, STORE_CHAR, JUMP, JUMP_IF_TRUE, JUMP_IF_FALSE))
+
+BINARY_OPCODES = {
+    "+": ADD, "-": SUB, "*": MUL, "/": DIV, "&": AND, "|": OR,
+    "=": EQ, "!=": NE, "<": LT, ">": GT, "<=": LE, ">=": GE,
+}
+UNARY_OPCODES = {"-": NEG, "!": NOT}
+PRINT_OPCODES = {"int": PRINT_INT, "char": PRINT_CHAR, "bool": PRINT_BOOL}
+
+class Bytecode:
+    '''
+    A compiled program. code is a flat list of opcodes, each followed by
+    its operand if it has one, jump operands are indexes into code.
+    Variables live in numbered slots, names and types are per slot
+    '''
+
+    def __init__(self, code, names, types):
+        self.code = code
+        self.names = names
+        self.types = types
+
+    def disassemble(self):
+        lines = []
+        pc = 0
+        while (pc < len(self.code)):
+            op = self.code[pc]
+            if (op in HAS_OPERAND):
+                operand = self.code[pc+1]
+                if (op in (LOAD, STORE, STORE_CHAR)):
+                    operand = "{} ({})".format(operand, self.names[operand])
+                lines.append("{:>5} {} {}".format(pc, OPCODE_NAMES[op], operand))
+                pc += 2
+            else:
+                lines.append("{:>5} {}".format(pc, OPCODE_NAMES[op]))
+                pc += 1
+        return lines
+
+class Compiler:
+    '''
+    Compiles the AST of a validated program (Parser.parse(build_ast=True))
+    into Bytecode for vm.VM. Every variable in the parser's SYMBOL_TABLE
+    gets a slot. Char values are character codes, int and bool ones are
+    Python ints. A while loop is compiled with its condition after the
+    body, so each iteration costs one conditional jump
+    '''
+
+    def __init__(self, symbol_table):
+        self.slots = {name: slot for slot, name in enumerate(symbol_table)}
+        self.types = list(symbol_table.values())
+        self.code = []
+
+    @classmethod
+    def compile(cls, program, symbol_table):
+        compiler = cls(symbol_table)
+        compiler.statements(program.body)
+        compiler.code.append(HALT)
+        return Bytecode(compiler.code, list(compiler.slots), compiler.types)
+
+    def statements(self, body):
+        '''
+        Statement lists are walked on an explicit stack, as blocks can be
+        nested deeply. Under a nested body's iterator is what comes after
+        it, (kind, node, index of the jump operand to patch)
+        '''
+        code = self.code
+        stack = [iter(body)]
+
+        while (stack):
+            item = stack.pop()
+
+            if (type(item) is tuple):
+                kind, node, jump = item
+                if (kind == "while"):
+                    code[jump] = len(code)
+                    self.expression(node.condition)
+                    code += (JUMP_IF_TRUE, jump+1)
+                elif (kind == "then" and node.orelse):
+                    code += (JUMP, None)
+                    code[jump] = len(code)
+                    stack += (("else", node, len(code) - 1), iter(node.orelse))
+                else:
+                    code[jump] = len(code)
+                continue
+
+            for node in item:
+                node_type = type(node)
+
+                if (node_type is Assign):
+                    self.expression(node.value)
+                    slot = self.slots[node.target.name]
+                    code += (STORE_CHAR if self.types[slot] == "char" else STORE, slot)
+                elif (node_type is While):
+                    # jump to the condition, which jumps back to the body
+                    code += (JUMP, None)
+                    stack += (item, ("while", node, len(code) - 1), iter(node.body))
+                    break
+                elif (node_type is If):
+                    self.expression(node.condition)
+                    code += (JUMP_IF_FALSE, None)
+                    stack += (item, ("then", node, len(code) - 1), iter(node.body))
+                    break
+                elif (node_type is Print):
+                    self.expression(node.value)
+                    code.append(PRINT_OPCODES[node.value.type])
+
+    def expression(self, root):
+        '''
+        Operands before their operator, on an explicit stack as
+        expressions can be long. A node is pushed again as visited under
+        its children, to emit its opcode once they're done
+        '''
+        code = self.code
+        stack = [(root, False)]
+
+        while (stack):
+            node, visited = stack.pop()
+            node_type = type(node)
+
+            if (node_type is Const):
+                code += (CONST, node.value if node.kind == "INT_CONST" else ord(node.value))
+            elif (node_type is Ref):
+                code += (LOAD, self.slots[node.name])
+            elif (node_type is BinOp):
+                if (visited):
+                    code.append(BINARY_OPCODES[node.op])
+                else:
+                    stack += ((node, True), (node.right, False), (node.left, False))
+            elif (node_type is UnaryOp):
+                if (visited):
+                    code.append(UNARY_OPCODES[node.op])
+                else:
+                    stack += ((node, True), (node.operand, False))
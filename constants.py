@@ -1,4 +1,21 @@
 ARITHMETIC_OP = ("+", "-", "*", "/")
 BOOLEAN_OP = ("&", "|")
 RELATIONAL_OP = ("=", "!=", "<", ">", "<=", ">=")
-UNARY_OP = ("-", "!")
\ No newline at end of file
+UNARY_OP = ("-", "!")
+
+# expression type summary, the flags of every operator and operand in
+# an expression are or-ed together, see Parser.check_matching_types
+BOOL_TYPE = 1
+CHAR_TYPE = 2
+# an undeclared identifier's, only when recovering from errors, it
+# matches any type so one missing declaration isn't reported again as
+# type errors
+UNKNOWN_TYPE = 4
+
+# token kinds, a kind's code is its index in TOKEN_KINDS
+TOKEN_KINDS = ("KEYWORD", "IDENTIFIER", "INT_CONST", "CHAR_CONST", "SYMBOL")
+KEYWORD_KIND, IDENTIFIER_KIND, INT_CONST_KIND, CHAR_CONST_KIND, SYMBOL_KIND = range(len(TOKEN_KINDS))
+
+# bump whenever a change to the tokenizer or parser can change a verdict
+# or the tokens produced, cached results are keyed on it
+VERSION = "1"
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import os
+import socket
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from validator import BoazValidator
+
+# every message is a 4 byte big-endian length followed by that many
+# bytes of UTF-8 JSON
+HEADER = struct.Struct(">I")
+
+# requests bigger than this are refused and the connection is dropped
+MAX_REQUEST_BYTES = 256 * 1024 * 1024
+
+def validate_source(source, limits=None, tier="full"):
+    '''
+    Worker entry point, the verdict for one program text as a response,
+    validated within limits if they're given
+    '''
+    validator = BoazValidator(source, tier=tier, limits=limits)
+    if (validator.run()):
+        return {"verdict": "ok"}
+    line, column = validator.error_position()
+    return {"verdict": "error", "error": validator.error_kind, "message": str(validator.error), "line": line, "column": column}
+
+def bad_request(request):
+    '''
+    The response to a request that isn't an object with a "source"
+    string, None for a good one
+    '''
+    if (not isinstance(request, dict) or not isinstance(request.get("source"), str)):
+        return {"verdict": "error", "error": "BadRequest", "message": "request needs a 'source' string"}
+    return None
+
+class ValidationServer:
+    '''
+    Long-running validation service on a Unix domain socket. Requests
+    are {"source": ..., "id": ...} objects ("id" is optional and echoed
+    back), responses carry the same ok/error verdict main.py prints plus
+    the error kind and message. Clients can pipeline any number of
+    requests on one connection, responses come back in request order.
+    Validation runs in a pool of worker processes so the event loop only
+    moves bytes, and a big file occupies one worker while small ones go
+    through the others
+    '''
+
+    def __init__(self, path, jobs=None, limits=None):
+        self.path = path
+        self.jobs = jobs or os.cpu_count() or 1
+        self.limits = limits
+        self.pool = None
+        self.server = None
+        self.connections = set()
+
+    async def start(self):
+        if (os.path.exists(self.path)):
+            os.unlink(self.path)
+
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs)
+        self.server = await asyncio.start_unix_server(self.handle, path=self.path)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            self.close()
+
+    async def stop(self):
+        '''
+        Stop listening and drop the open connections, then close()
+        '''
+        self.server.close()
+        for task in self.connections:
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        self.close()
+
+    def close(self):
+        if (self.server is not None):
+            self.server.close()
+        if (self.pool is not None):
+            self.pool.shutdown(cancel_futures=True)
+        if (os.path.exists(self.path)):
+            os.unlink(self.path)
+
+    async def validate(self, request):
+        response = bad_request(request)
+        if (response is None):
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self.pool, partial(validate_source, limits=self.limits), request["source"])
+
+        if (isinstance(request, dict) and "id" in request):
+            response["id"] = request["id"]
+        return response
+
+    async def handle(self, reader, writer):
+        # responses are written in request order, each one as soon as
+        # its own validation and every one before it are done
+        pending = asyncio.Queue()
+        task = asyncio.current_task()
+        self.connections.add(task)
+
+        async def write_responses():
+            while (True):
+                response = await pending.get()
+                if (response is None):
+                    return
+                await write_message(writer, await response)
+
+        writer_task = asyncio.create_task(write_responses())
+        try:
+            while (True):
+                try:
+                    request = await read_message(reader)
+                except ValueError as e:
+                    await pending.put(asyncio.sleep(0, {"verdict": "error", "error": "BadRequest", "message": str(e)}))
+                    break
+                if (request is None):
+                    break
+                await pending.put(asyncio.ensure_future(self.validate(request)))
+        finally:
+            await pending.put(None)
+            await writer_task
+            writer.close()
+            self.connections.discard(task)
+
+async def read_message(reader):
+    '''
+    None at a clean end of stream, ValueError for a bad frame
+    '''
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if (e.partial):
+            raise ValueError("truncated message header")
+        return None
+
+    size, = HEADER.unpack(header)
+    if (size > MAX_REQUEST_BYTES):
+        raise ValueError("message of {} bytes is over the {} byte limit".format(size, MAX_REQUEST_BYTES))
+
+    try:
+        request = json.loads(await reader.readexactly(size))
+    except asyncio.IncompleteReadError:
+        raise ValueError("truncated message")
+    except json.JSONDecodeError as e:
+        raise ValueError("message isn't JSON: {}".format(e))
+
+    if (not isinstance(request, dict)):
+        raise ValueError("message isn't a JSON object")
+    return request
+
+async def write_message(writer, message):
+    payload = json.dumps(message).encode()
+    writer.write(HEADER.pack(len(payload)) + payload)
+    await writer.drain()
+
+def request(path, sources):
+    '''
+    Blocking client, sends every source on one connection and returns
+    the responses in the same order
+    '''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        for source in sources:
+            payload = json.dumps({"source": source}).encode()
+            client.sendall(HEADER.pack(len(payload)) + payload)
+
+        stream = client.makefile("rb")
+        responses = []
+        for _ in sources:
+            size, = HEADER.unpack(stream.read(HEADER.size))
+            responses.append(json.loads(stream.read(size)))
+        return responses
+
+def serve(path, jobs=None, limits=None):
+    server = ValidationServer(path, jobs, limits)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
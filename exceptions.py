@@ -1,21 +1,42 @@
+# offset is where in the source the error is, when the raiser knows it
 class TokenizeException(Exception):
-    def __init__(self, token):
+    def __init__(self, token, offset=None):
         self.token = token
+        self.offset = offset
 
     def __str__(self):
         return "Error trying to create a token from the character/string: {}".format(self.token)
 
 class ParserException(Exception):
-    def __init__(self, _type, token):
+    def __init__(self, _type, token, offset=None):
         self.type = _type
         self.token = token
+        self.offset = offset
     
     def __str__(self):
         return "Something wrong with the last token or its type - TYPE:{}, TOKEN:{}".format(self.type, self.token)
     
 class ParserSemanticException(Exception):
-    def __init__(self, message):
+    def __init__(self, message, offset=None):
         self.message = message
+        self.offset = offset
     
     def __str__(self):
-        return self.message
\ No newline at end of file
+        return self.message
+
+class BoazRuntimeException(Exception):
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+# not a verdict on the source, the validation went over one of its Limits
+class ResourceLimitException(Exception):
+    def __init__(self, limit, value, offset=None):
+        self.limit = limit
+        self.value = value
+        self.offset = offset
+
+    def __str__(self):
+        return "Resource limit exceeded - {}: {}".format(self.limit, self.value)
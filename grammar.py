@@ -0,0 +1,175 @@
+from constants import BOOLEAN_OP, RELATIONAL_OP
+
+# terminals named by the token values they stand for, ID, BAD_ID, INT,
+# CHAR and OTHER are told apart by the kind of the token instead. An
+# IDENTIFIER token that isn't a valid identifier is a BAD_ID, any other
+# keyword or symbol is OTHER, neither is ever expected by the grammar
+TERMINALS = {
+    "int": ("int",), "char": ("char",), "begin": ("begin",),
+    "if": ("if",), "while": ("while",), "print": ("print",),
+    "then": ("then",), "do": ("do",), "else": ("else",),
+    "CLOSER": ("end", "od", "fi"),
+    ":=": (":=",), ",": (",",), ";": (";",), "(": ("(",), ")": (")",), "!": ("!",),
+    "MINUS": ("-",), "ARITH": ("+", "*", "/"), "BOOL_OP": BOOLEAN_OP + RELATIONAL_OP,
+    "ID": (), "BAD_ID": (), "INT": (), "CHAR": (), "OTHER": (),
+}
+KIND_TERMINALS = {
+    "IDENTIFIER": "ID", "INT_CONST": "INT", "CHAR_CONST": "CHAR",
+    "KEYWORD": "OTHER", "SYMBOL": "OTHER",
+}
+
+# everything after the program header, as (nonterminal, alternatives).
+# Names starting with '@' are semantic actions the parser runs when it
+# gets to them. These rules keep the language's quirks: 'else' is a
+# no-op statement, any closing keyword closes any block, the statement
+# list ends at one with no block open, and any of ';', 'then', 'do' and
+# ')' ends an expression or closes a '('
+BOAZ_GRAMMAR = (
+    ("Body", (
+        ("int", "@type", "VarList", "Body"),
+        ("char", "@type", "VarList", "Body"),
+        ("begin", "Statements"),
+    )),
+    ("VarList", (
+        ("ID", "@declare", "VarTail"),
+    )),
+    ("VarTail", (
+        (",", "ID", "@declare", "VarTail"),
+        (";",),
+    )),
+    ("Statements", (
+        ("CLOSER",),
+        ("else", "Statements"),
+        ("Statement", "Statements"),
+    )),
+    ("Block", (
+        ("CLOSER", "@close_block", ";"),
+        ("else", "Block"),
+        ("Statement", "Block"),
+    )),
+    ("Statement", (
+        ("if", "@open_block", "@start", "Expression", "@check_if", "Block"),
+        ("while", "@open_block", "@start", "Expression", "@check_while", "Block"),
+        ("print", "@start", "Expression"),
+        ("ID", "@target", ":=", "@start", "Expression", "@check_assign"),
+    )),
+    ("Expression", (
+        ("Term", "Tail"),
+    )),
+    ("Term", (
+        ("MINUS", "Term"),
+        ("!", "@bool", "Term"),
+        ("INT",),
+        ("CHAR", "@char"),
+        ("ID", "@ref"),
+        ("(", "@open_paren", "Expression", "@close_paren"),
+    )),
+    ("Tail", (
+        ("ARITH", "Term", "Tail"),
+        ("MINUS", "Term", "Tail"),
+        ("BOOL_OP", "@bool", "Term", "Tail"),
+        (";",), ("then",), ("do",), (")",),
+    )),
+)
+
+# nonterminals where an unexpected token that could be an identifier is
+# reported as an undeclared one, like the descent parser does
+IDENTIFIER_ERRORS = frozenset(("Statements", "Block", "Statement", "Expression", "Term"))
+
+class Grammar:
+    '''
+    An LL(1) grammar compiled into a predictive parse table. Every
+    symbol gets an integer code, terminals first, then nonterminals,
+    then actions, so the parser tells them apart with two comparisons.
+    table[nonterminal - NONTERMINAL_BASE][terminal] is the production to
+    expand, reversed to be pushed onto the parse stack, or None if the
+    terminal can't come next. Raises ValueError if the rules aren't LL(1)
+    '''
+
+    def __init__(self, rules, terminals=TERMINALS, kind_terminals=KIND_TERMINALS):
+        self.terminals = list(terminals)
+        self.nonterminals = [name for name, _ in rules]
+        self.actions = sorted({symbol for _, alternatives in rules for alternative in alternatives for symbol in alternative if symbol.startswith("@")})
+
+        self.NONTERMINAL_BASE = len(self.terminals)
+        self.ACTION_BASE = self.NONTERMINAL_BASE + len(self.nonterminals)
+        self.codes = {name: code for code, name in enumerate(self.terminals + self.nonterminals + self.actions)}
+        self.start = self.codes[self.nonterminals[0]]
+
+        # token value or kind -> terminal code
+        self.value_terminals = {value: self.codes[name] for name, values in terminals.items() for value in values}
+        self.kind_terminals = {kind: self.codes[name] for kind, name in kind_terminals.items()}
+
+        self.rules = {name: [list(alternative) for alternative in alternatives] for name, alternatives in rules}
+        self.first = self.first_sets()
+        self.follow = self.follow_sets()
+        self.table = self.build_table()
+
+    def is_terminal(self, symbol):
+        return symbol in self.codes and self.codes[symbol] < self.NONTERMINAL_BASE
+
+    def first_of(self, symbols, first):
+        '''
+        FIRST of a sequence of symbols, with None in it if they can all
+        derive nothing
+        '''
+        result = set()
+        for symbol in symbols:
+            if (symbol.startswith("@")):
+                continue
+            if (self.is_terminal(symbol)):
+                result.add(symbol)
+                return result
+            result |= first[symbol] - {None}
+            if (None not in first[symbol]):
+                return result
+        result.add(None)
+        return result
+
+    def first_sets(self):
+        first = {name: set() for name in self.nonterminals}
+        changed = True
+        while (changed):
+            changed = False
+            for name, alternatives in self.rules.items():
+                for alternative in alternatives:
+                    symbols = self.first_of(alternative, first)
+                    if (not symbols <= first[name]):
+                        first[name] |= symbols
+                        changed = True
+        return first
+
+    def follow_sets(self):
+        follow = {name: set() for name in self.nonterminals}
+        changed = True
+        while (changed):
+            changed = False
+            for name, alternatives in self.rules.items():
+                for alternative in alternatives:
+                    for i, symbol in enumerate(alternative):
+                        if (symbol not in follow):
+                            continue
+                        rest = self.first_of(alternative[i+1:], self.first)
+                        symbols = (rest - {None}) | (follow[name] if None in rest else set())
+                        if (not symbols <= follow[symbol]):
+                            follow[symbol] |= symbols
+                            changed = True
+        return follow
+
+    def build_table(self):
+        table = []
+        for name in self.nonterminals:
+            row = [None] * len(self.terminals)
+            for alternative in self.rules[name]:
+                lookahead = self.first_of(alternative, self.first)
+                if (None in lookahead):
+                    lookahead = (lookahead - {None}) | self.follow[name]
+
+                production = tuple(self.codes[symbol] for symbol in reversed(alternative))
+                for terminal in lookahead:
+                    code = self.codes[terminal]
+                    if (row[code] is not None):
+                        raise ValueError("{} isn't LL(1), two alternatives start with {}".format(name, terminal))
+                    row[code] = production
+            table.append(row)
+        return table
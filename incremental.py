@@ -0,0 +1,279 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from exceptions import TokenizeException, ParserException, ParserSemanticException
+from lineindex import LineIndex
+from tokenizer import Tokenizer
+from tokenstore import TokenStore
+from myparser import Parser
+
+def shifted(offsets, delta):
+    '''
+    A copy of the offsets array with delta added to each. The whole array
+    is added to as one big int with delta in every lane, no lane can
+    carry or borrow as offsets stay inside the source, which is several
+    times faster than adding one offset at a time
+    '''
+    if (delta == 0 or not offsets):
+        return offsets[:]
+
+    data = offsets.tobytes()
+    lanes = int.from_bytes(abs(delta).to_bytes(offsets.itemsize, "little") * len(offsets), "little")
+    total = int.from_bytes(data, "little")
+    total = total + lanes if delta > 0 else total - lanes
+
+    result = array(offsets.typecode)
+    result.frombytes(total.to_bytes(len(data), "little"))
+    return result
+
+class Checkpoints:
+    '''
+    Statements one parse started, as the index of their first token and
+    the number of blocks open, and the error the parse stopped at (None
+    if it got to the end). Parsing from any of them again with the same
+    symbol table ends the same way, as long as the tokens from there on
+    are the same
+    '''
+
+    def __init__(self, indexes=None, depths=None, error=None):
+        self.indexes = array("Q") if indexes is None else indexes
+        self.depths = array("Q") if depths is None else depths
+        self.error = error
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def find(self, index, depth):
+        # position of the checkpoint (index, depth), or None
+        k = bisect_left(self.indexes, index)
+        if (k < len(self.indexes) and self.indexes[k] == index and self.depths[k] == depth):
+            return k
+        return None
+
+    def tail(self, start, shift, delta):
+        '''
+        The checkpoints from token index start on, their indexes moved by
+        shift and the error's offset by delta, or None if there are none
+        '''
+        k = bisect_left(self.indexes, start)
+        if (k == len(self.indexes)):
+            return None
+
+        if (self.error is not None):
+            self.error.offset += delta
+        return Checkpoints(shifted(self.indexes[k:], shift), self.depths[k:], self.error)
+
+class Synced(Exception):
+    '''
+    Raised from the parser's checkpoint once a parse gets to a statement
+    that an earlier parse started in the same state
+    '''
+
+    def __init__(self, segment, position):
+        self.segment = segment
+        self.position = position
+
+class IncrementalValidator:
+    '''
+    Validation of a source that is being edited, e.g. by an editor on
+    every keystroke. edit() only lexes again the tokens around the edit,
+    and only parses again from the statement the damage starts in, up to
+    the first statement after it that an earlier parse started in the
+    same state. The declarations' symbol table is kept unless the edit
+    reaches into the header or the declarations. ok, error and error_kind
+    are always those a BoazValidator of the whole new code would give
+    '''
+
+    ERRORS = (TokenizeException, ParserException, ParserSemanticException)
+
+    # lexing a token can look at up to this many characters from its start
+    LEXER_LOOKAHEAD = 3
+
+    # checkpoints of earlier parses kept to sync with, past where the
+    # current one stopped at an error
+    MAX_SEGMENTS = 8
+
+    def __init__(self, code):
+        self.code = code
+        self.tokenizer = Tokenizer(code)
+        self.parser = Parser(self.tokenizer)
+        self.parser.ENGINE = "descent"
+
+        self.lex_errors = self.tokenizer.tokenize_all()
+        # the current parse's Checkpoints first, then earlier ones'
+        self.segments = []
+        # the one all of them were parsed with
+        self.symbol_table = None
+
+        # what the last edit did, for the curious
+        self.relexed = len(self.tokenizer.TOKENS)
+        self.reparsed = 0
+        self.reparse(0, 0, 0, 0)
+
+    @property
+    def tokens(self):
+        return self.tokenizer.TOKENS
+
+    @property
+    def error(self):
+        if (self.lex_errors):
+            return self.lex_errors[0]
+        return self.segments[0].error
+
+    @property
+    def error_kind(self):
+        return None if self.error is None else type(self.error).__name__
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def error_offset(self):
+        return None if self.error is None else self.error.offset
+
+    def error_position(self):
+        '''
+        1-based (line, column) of the error, or None
+        '''
+        if (self.error is None):
+            return None
+        return LineIndex(self.code).position(self.error.offset)
+
+    def edit(self, offset, deleted, inserted):
+        '''
+        Replaces the deleted characters at offset with the inserted text,
+        returns whether the new code is valid
+        '''
+        if (offset < 0 or deleted < 0 or offset + deleted > len(self.code)):
+            raise ValueError("edit out of range")
+
+        self.code = self.code[:offset] + inserted + self.code[offset+deleted:]
+        self.tokenizer.CODE = self.code
+        first, old_end, new_end = self.relex(offset, deleted, inserted)
+
+        # the parse of the tokens there are is kept up to date even while
+        # a bad lexeme decides the verdict, so fixing it is cheap too
+        self.reparse(first, old_end, new_end, len(inserted) - deleted)
+        return self.ok
+
+    def relex(self, offset, deleted, inserted):
+        '''
+        Lexes again from the last token that starts far enough before the
+        edit not to have looked at it, up to the first token after the
+        edit that starts where an old one did, the rest of the old tokens
+        are simply moved. Returns the index of the first changed token,
+        and where the unchanged ones start in the old and new tokens
+        '''
+        old = self.tokenizer.TOKENS
+        code = self.code
+        delta = len(inserted) - deleted
+        edit_end = offset + len(inserted)
+
+        first = bisect_right(old.starts, offset - self.LEXER_LOOKAHEAD) - 1
+        if (first < 0):
+            first = pos = 0
+        else:
+            pos = old.starts[first]
+
+        kinds, starts, ends = array("B"), [], []
+        errors = [e for e in self.lex_errors if e.offset < pos]
+        synced = len(old)
+
+        while (True):
+            try:
+                for kind, start, end in self.tokenizer.generate_spans(code, pos=pos):
+                    if (start >= edit_end):
+                        j = bisect_left(old.starts, start - delta, first)
+                        if (j < len(old) and old.starts[j] == start - delta):
+                            synced = j
+                            break
+                    kinds.append(kind)
+                    starts.append(start)
+                    ends.append(end)
+                break
+            except TokenizeException as e:
+                errors.append(e)
+                pos = e.offset + len(e.token)
+
+        if (synced < len(old)):
+            for e in self.lex_errors:
+                if (e.offset >= old.starts[synced]):
+                    e.offset += delta
+                    errors.append(e)
+
+        # spliced in place, unless the offsets no longer fit their type
+        tokens = old
+        if (TokenStore(code).starts.typecode != old.starts.typecode):
+            tokens = TokenStore(code)
+            tokens.kinds, tokens.starts, tokens.ends = old.kinds[:], array(tokens.starts.typecode, old.starts), array(tokens.ends.typecode, old.ends)
+        tokens.code = code
+        typecode = tokens.starts.typecode
+        tokens.kinds[first:] = kinds + tokens.kinds[synced:]
+        tokens.starts[first:] = array(typecode, starts) + shifted(tokens.starts[synced:], delta)
+        tokens.ends[first:] = array(typecode, ends) + shifted(tokens.ends[synced:], delta)
+
+        self.tokenizer.TOKENS = tokens
+        self.lex_errors = errors
+        self.relexed = len(kinds)
+        return first, synced, first + len(kinds)
+
+    def reparse(self, first, old_end, new_end, delta):
+        '''
+        Tokens before first are unchanged, so is the parse up to the last
+        statement that started at or before it, it's parsed again from
+        there. Tokens from old_end on are now the ones from new_end on,
+        so checkpoints from there on are moved and still hold
+        '''
+        parser = self.parser
+        shift = new_end - old_end
+        targets = []
+        for segment in self.segments:
+            segment = segment.tail(old_end, shift, delta)
+            if (segment is not None):
+                targets.append(segment)
+
+        current = self.segments[0] if self.segments else Checkpoints()
+        restart = bisect_right(current.indexes, first) - 1
+        kept = max(restart, 0)
+        checkpoints = Checkpoints(current.indexes[:kept], current.depths[:kept])
+        indexes, depths = checkpoints.indexes, checkpoints.depths
+        self.reparsed = 0
+
+        def checkpoint(index, depth):
+            if (not indexes and parser.SYMBOL_TABLE != self.symbol_table):
+                # other declarations, what earlier parses found is moot
+                targets.clear()
+                self.symbol_table = dict(parser.SYMBOL_TABLE)
+
+            indexes.append(index)
+            depths.append(depth)
+            self.reparsed += 1
+            if (index >= new_end):
+                for i, target in enumerate(targets):
+                    k = target.find(index, depth)
+                    if (k is not None):
+                        raise Synced(i, k)
+
+        parser.CHECKPOINT = checkpoint
+        try:
+            if (restart < 0):
+                # the header or the declarations changed
+                self.tokenizer.CURRENT_TOKEN = 0
+                parser.parse()
+            else:
+                self.tokenizer.CURRENT_TOKEN = current.indexes[restart]
+                parser.parse_statements(current.depths[restart])
+        except Synced as synced:
+            # the rest goes as it did then
+            target = targets.pop(synced.segment)
+            indexes.pop()
+            depths.pop()
+            indexes += target.indexes[synced.position:]
+            depths += target.depths[synced.position:]
+            checkpoints.error = target.error
+        except self.ERRORS as e:
+            self.tokenizer.error_offset(e)
+            checkpoints.error = e
+        finally:
+            parser.CHECKPOINT = None
+
+        self.segments = [checkpoints] + targets[:self.MAX_SEGMENTS]
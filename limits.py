@@ -0,0 +1,69 @@
+import time
+from exceptions import ResourceLimitException
+
+class Limits:
+    '''
+    Budgets for validating untrusted sources, any of them None for no
+    limit. source_size is in characters (bytes for a bytes source),
+    depth applies to if/while blocks and '(' nesting alike, and
+    expression_length is in tokens. Going over one raises a
+    ResourceLimitException, so how long a validation can take and how
+    much it can hold doesn't depend on what it's given. One Limits can
+    be shared by any number of sessions
+    '''
+
+    NAMES = ("source_size", "tokens", "depth", "expression_length", "seconds")
+
+    def __init__(self, source_size=None, tokens=None, depth=None, expression_length=None, seconds=None):
+        self.source_size = source_size
+        self.tokens = tokens
+        self.depth = depth
+        self.expression_length = expression_length
+        self.seconds = seconds
+
+    def __repr__(self):
+        return "Limits({})".format(", ".join("{}={}".format(name, getattr(self, name)) for name in self.NAMES))
+
+    def deadline(self):
+        # the monotonic time a validation starting now has to end by
+        return None if self.seconds is None else time.monotonic() + self.seconds
+
+    def check_source(self, source):
+        if (self.source_size is not None and len(source) > self.source_size):
+            raise ResourceLimitException("source_size", self.source_size, self.source_size)
+
+    def check_tokens(self, tokens):
+        if (self.tokens is not None and len(tokens) > self.tokens):
+            # at the first token past the limit, if tokens know their offsets
+            starts = getattr(tokens, "starts", None)
+            raise ResourceLimitException("tokens", self.tokens, None if starts is None else starts[self.tokens])
+
+    def sized(self, chunks):
+        '''
+        Passes the chunks of a streamed source through, raising once
+        they add up to more than source_size
+        '''
+        if (self.source_size is None):
+            yield from chunks
+            return
+
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            if (size > self.source_size):
+                raise ResourceLimitException("source_size", self.source_size, self.source_size)
+            yield chunk
+
+    def counted(self, tokens):
+        '''
+        Passes a stream of tokens through, raising at the one past the
+        tokens limit
+        '''
+        if (self.tokens is None):
+            yield from tokens
+            return
+
+        for count, token in enumerate(tokens, 1):
+            if (count > self.tokens):
+                raise ResourceLimitException("tokens", self.tokens)
+            yield token
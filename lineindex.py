@@ -0,0 +1,27 @@
+import re
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, repeat
+from operator import add
+
+class LineIndex:
+    '''
+    Maps source offsets to 1-based (line, column) positions. The line
+    start offsets are found by one split of the source on newlines, so
+    only build it once an error actually needs a position
+    '''
+
+    def __init__(self, code):
+        if (isinstance(code, (str, bytes, bytearray))):
+            newline = "\n" if isinstance(code, str) else b"\n"
+            # each line starts one past the end of the one before
+            line_lengths = map(add, map(len, code.split(newline)), repeat(1))
+            self.starts = array("Q", accumulate(line_lengths, initial=0))
+        else:
+            # an mmap can't be split without copying it
+            self.starts = array("Q", [0])
+            self.starts.extend(match.end() for match in re.finditer(b"\n", code))
+
+    def position(self, offset):
+        line = bisect_right(self.starts, offset)
+        return (line, offset - self.starts[line-1] + 1)
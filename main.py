@@ -1,44 +1,158 @@
+import argparse
+import mmap
 import os
 import sys
-from exceptions import TokenizeException, ParserException, ParserSemanticException
+import batch
+import daemon
+import ndjson
+import symbolindex
+import tokenfile
+from functools import partial
+from cache import open_cache
+from exceptions import ResourceLimitException
+from limits import Limits
+from stats import Stats
 from tokenizer import Tokenizer
-from myparser import Parser
+from validator import BoazValidator
 
 #------------------------------------------------------------------------
 
-if len(sys.argv) != 2:
-    print("error")
-    sys.exit()
+class ArgumentParser(argparse.ArgumentParser):
+    # a bad command line gets the same plain verdict as a bad file
+    def error(self, message):
+        print("error")
+        sys.exit()
 
-filename = sys.argv[1]
+def build_arg_parser():
+    parser = ArgumentParser(description="Validate Boaz programs, prints 'ok' or 'error'")
+    parser.add_argument("paths", nargs="*", help="the .boaz file to validate ('-' for a program on stdin), or with --batch any number of files, directories and globs")
+    parser.add_argument("--batch", action="store_true", help="validate many files, one result line per file")
+    parser.add_argument("--ndjson", action="store_true", help="read {\"id\", \"source\"} records from stdin one per line, write a JSON verdict line for each")
+    parser.add_argument("--index", metavar="DB", help="update this symbol index with the files given (found as with --batch), then answer any queries")
+    parser.add_argument("--declared", metavar="NAME", help="with --index, list where NAME is declared")
+    parser.add_argument("--type", choices=("int", "char"), help="with --declared, only declarations of this type")
+    parser.add_argument("--assigned", metavar="NAME", help="with --index, list where NAME is assigned to")
+    parser.add_argument("--used", metavar="NAME", help="with --index, list where NAME is read")
+    parser.add_argument("--serve", metavar="SOCKET", help="run as a validation daemon listening on this Unix socket")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes for --batch, --index, --serve and --ndjson (default: one per core)")
+    parser.add_argument("--files-from", metavar="LIST", help="with --batch or --index, also read paths one per line from LIST ('-' for stdin)")
+    parser.add_argument("--cache", metavar="DB", help="answer unchanged files from (and record new verdicts in) this cache database")
+    parser.add_argument("--cache-size", type=int, metavar="BYTES", help="evict least recently used cache entries above this size")
+    parser.add_argument("--all-errors", action="store_true", help="carry on after errors and report every one of them on stderr")
+    parser.add_argument("--stats", action="store_true", help="print phase timings and parser counters to stderr")
+    parser.add_argument("--stats-format", choices=("text", "json"), default="text", help="how --stats prints them (default: text)")
+    parser.add_argument("--tier", choices=BoazValidator.TIERS, default="full", help="only lex, or lex and parse without the semantic checks (default: full)")
+    parser.add_argument("--max-source-size", type=int, metavar="CHARS", help="stop validating sources longer than this")
+    parser.add_argument("--max-tokens", type=int, metavar="N", help="stop validating sources with more tokens than this")
+    parser.add_argument("--max-depth", type=int, metavar="N", help="stop at if/while blocks or '(' nested deeper than this")
+    parser.add_argument("--max-expression-length", type=int, metavar="TOKENS", help="stop at expressions longer than this")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS", help="stop validating a source after this long")
+    parser.add_argument("--save-tokens", metavar="FILE", help="write the file's tokens and parse result to FILE, see tokenfile.py")
+    return parser
 
-if not filename.endswith(".boaz") or not os.path.isfile("./"+filename):
-    print("error")
-    sys.exit()
+def build_limits(args):
+    '''
+    The Limits the command line asks for, or None if it sets none
+    '''
+    limits = Limits(args.max_source_size, args.max_tokens, args.max_depth, args.max_expression_length, args.timeout)
+    if (all(getattr(limits, name) is None for name in Limits.NAMES)):
+        return None
+    return limits
 
-# read the .boaz input file 
-with open(filename, "r") as f:
-    code = f.read()
+def validate_file(filename, cache=None, stats=None, recover=False, save_tokens=None, tier="full", limits=None):
+    if not filename.endswith(".boaz") or not os.path.isfile("./"+filename):
+        return False
 
-if (len(code) == 0):
-    print("error")
-    sys.exit()
+    if (os.path.getsize(filename) == 0):
+        return False
+
+    # with stats, every error or saved tokens the file is lexed whole, so
+    # tokenize and parse are separate phases. An ASCII file is mapped into
+    # memory and lexed as bytes rather than read and decoded
+    if (stats is not None or recover or save_tokens):
+        with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as code:
+            if (Tokenizer.NON_ASCII_PATTERN.search(code) is None):
+                return validate_whole(filename, code, cache, stats, recover, save_tokens, tier, limits)
+
+        with open(filename, "r") as f:
+            return validate_whole(filename, f.read(), cache, stats, recover, save_tokens, tier, limits)
+
+    # lexical analysis is streamed from the .boaz input file, tokens are
+    # generated as the syntax + simple semantic analysis asks for them so
+    # the first bad token stops both
+    with open(filename, "r") as f:
+        return report(filename, BoazValidator(f, cache, tier=tier, limits=limits))
+
+def validate_whole(filename, code, cache=None, stats=None, recover=False, save_tokens=None, tier="full", limits=None):
+    # a cache hit has no tokens to save, the file has to be lexed
+    if (save_tokens):
+        cache = None
+    validator = BoazValidator(code, cache, stats=stats, recover=recover, tier=tier, limits=limits)
+    ok = report(filename, validator)
+    if (save_tokens):
+        tokenfile.write(save_tokens, validator.tokenizer.TOKENS, tokenfile.ParseResult.from_validator(validator, ok))
+    return ok
+
+def validate_stdin(cache=None, stats=None, recover=False, save_tokens=None, tier="full", limits=None):
+    # no more than the source size limit is read, one past it to tell
+    size = -1
+    if (limits is not None and limits.source_size is not None):
+        size = limits.source_size + 1
+
+    code = sys.stdin.read(size)
+    if (not code):
+        return False
+
+    return validate_whole("<stdin>", code, cache, stats, recover, save_tokens, tier, limits)
+
+def report(filename, validator):
+    if (validator.run()):
+        return True
+
+    # stdout keeps the plain verdict, where and why goes to stderr
+    for error in validator.errors or [validator.error]:
+        # no position, finding it could mean reading all of a huge source
+        if (isinstance(error, ResourceLimitException)):
+            print("{}: {}".format(filename, error), file=sys.stderr)
+            continue
+
+        position = validator.error_position(error)
+        if (position is not None):
+            print("{}:{}:{}: {}".format(filename, *position, error), file=sys.stderr)
+    return False
 
 #------------------------------------------------------------------------
 
-# lexical analysis, generate tokens from source code
-try:
-    Tokenizer.CODE = code
-    Tokenizer.tokenize()
-except TokenizeException:
-    print("error")
-    sys.exit()
-
-# syntax + simple semantic analysis, check tokens against grammar of Boaz language
-try:
-    Parser.parse()
-except (ParserException, ParserSemanticException):
-    print("error")
-    sys.exit()
-
-print("ok")
\ No newline at end of file
+def main(argv):
+    args = build_arg_parser().parse_args(argv)
+
+    limits = build_limits(args)
+
+    if (args.serve):
+        daemon.serve(args.serve, args.jobs, limits)
+        return 0
+
+    if (args.batch):
+        return batch.main(args.paths, args.jobs, args.files_from, args.cache, args.cache_size, args.tier, limits)
+
+    if (args.index):
+        return symbolindex.main(args.index, args.paths, args.jobs, args.files_from, args.declared, args.type, args.assigned, args.used)
+
+    if (args.ndjson):
+        return ndjson.run(sys.stdin, sys.stdout, args.jobs, limits, args.tier)
+
+    if (len(args.paths) != 1):
+        print("error")
+        return 0
+
+    cache = open_cache(args.cache, args.cache_size) if args.cache else None
+    stats = Stats() if args.stats else None
+    validate = validate_stdin if args.paths[0] == "-" else partial(validate_file, args.paths[0])
+    print("ok" if validate(cache, stats, args.all_errors, args.save_tokens, args.tier, limits) else "error")
+
+    if (stats is not None):
+        print(stats.format(args.stats_format), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
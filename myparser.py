@@ -1,19 +1,141 @@
+import time
+import unicodedata
 from constants import *
 from tokenizer import Tokenizer
-from exceptions import ParserException, ParserSemanticException
+from exceptions import ParserException, ParserSemanticException, ResourceLimitException
+from utils import hybridmethod
+from boazast import Program, VarDec, Assign, If, While, Print, BinOp, UnaryOp, Const, Ref
+from grammar import Grammar, BOAZ_GRAMMAR, IDENTIFIER_ERRORS
+
+def int_value(token):
+    '''
+    The value of an INT_CONST. The lexer takes any str.isdigit() run,
+    such as '²', which int() would refuse
+    '''
+    value = 0
+    for char in token:
+        value = value * 10 + unicodedata.digit(char)
+    return value
 
 class Parser:
     
     SYMBOL_TABLE = {}
 
-    @classmethod
+    # type flags contributed by each binary operator, unary operator
+    # and declared type
+    BINARY_OP_TYPES = dict.fromkeys(ARITHMETIC_OP, 0)
+    BINARY_OP_TYPES.update(dict.fromkeys(BOOLEAN_OP+RELATIONAL_OP, BOOL_TYPE))
+    UNARY_OP_TYPES = {"-": 0, "!": BOOL_TYPE}
+    DECLARED_TYPES = {"int": 0, "char": CHAR_TYPE, "unknown": UNKNOWN_TYPE}
+
+    # the grammar itself has no operator precedence, ASTs use the usual
+    # one with every binary operator left associative, unary operators
+    # bind tighter than any of them
+    PRECEDENCE = {"|": 1, "&": 2, "+": 4, "-": 4, "*": 5, "/": 5}
+    PRECEDENCE.update(dict.fromkeys(RELATIONAL_OP, 3))
+    UNARY_PRECEDENCE = 6
+
+    # where tokens are pulled from, the Tokenizer class itself is the
+    # shared default session
+    TOKENIZER = Tokenizer
+
+    # deepest if/while block nesting and '(' nesting seen by the last parse
+    MAX_BLOCK_DEPTH = 0
+    MAX_EXPRESSION_DEPTH = 0
+
+    # errors collected by parse_all, None while errors are raised
+    DIAGNOSTICS = None
+
+    # where a statement list picks up again after a syntax error
+    SYNC_TOKENS = (";", "end", "od", "fi")
+
+    # called with (index of the next token, number of open blocks) at the
+    # start of each statement parse_statements reads, see incremental.py
+    CHECKPOINT = None
+
+    # "descent" for the hand written parse_* methods, or "table" to parse
+    # with the predictive parse table compiled from GRAMMAR. Building ASTs
+    # and recovering from errors always use the descent methods
+    ENGINE = "descent"
+    GRAMMAR = Grammar(BOAZ_GRAMMAR)
+
+    # with False only the syntax is checked, identifiers don't have to be
+    # declared (a keyword still isn't one) and types aren't matched
+    SEMANTIC_CHECKS = True
+
+    # budgets for untrusted sources (see limits.py) and the monotonic time
+    # the parse has to be done by, None for no limits. The table engine
+    # doesn't check them, a parse with limits always uses the descent one.
+    # Building an AST checks them the same way parsing does
+    LIMITS = None
+    DEADLINE = None
+    # with a DEADLINE, the clock is also checked this often in tokens
+    # inside a statement, so one long expression can't overrun it
+    DEADLINE_INTERVAL = 1024
+
+    def __init__(self, tokenizer):
+        self.TOKENIZER = tokenizer
+        self.SYMBOL_TABLE = {}
+        self.MAX_BLOCK_DEPTH = 0
+        self.MAX_EXPRESSION_DEPTH = 0
+        self.DIAGNOSTICS = None
+        self.CHECKPOINT = None
+        self.LIMITS = None
+        self.DEADLINE = None
+
+    @hybridmethod
+    def report(cls, error):
+        '''
+        Raises error, or when recovering records it with its source
+        offset and returns so parsing carries on
+        '''
+        if (cls.DIAGNOSTICS is None):
+            raise error
+
+        cls.TOKENIZER.error_offset(error)
+        cls.DIAGNOSTICS.append(error)
+
+    @hybridmethod
+    def synchronise(cls, error, sync_tokens):
+        '''
+        Reports a syntax error, then skips tokens up to the first one in
+        sync_tokens, which might be the bad token itself, and returns it
+        '''
+        # nothing to pick up from if the tokens ran out
+        if (error.type == "MISSING"):
+            raise error
+
+        cls.report(error)
+        token = error.token
+        while (token not in sync_tokens):
+            _, token = cls.TOKENIZER.get_next_token()
+
+        return token
+
+    @hybridmethod
+    def check_depth(cls, depth):
+        # only called when a parse goes deeper than it has been before
+        if (cls.LIMITS is not None and cls.LIMITS.depth is not None and depth > cls.LIMITS.depth):
+            raise ResourceLimitException("depth", cls.LIMITS.depth)
+
+    @hybridmethod
+    def check_deadline(cls):
+        if (cls.DEADLINE is not None and time.monotonic() > cls.DEADLINE):
+            raise ResourceLimitException("seconds", cls.LIMITS.seconds)
+
+    @hybridmethod
     def is_identifier_declared(cls, token):
+        if (not cls.SEMANTIC_CHECKS):
+            return token not in Tokenizer.KEYWORD_SET
+
         if token not in cls.SYMBOL_TABLE.keys():
-            raise ParserSemanticException("Identifier: {}, has not been declared".format(token))
+            cls.report(ParserSemanticException("Identifier: {}, has not been declared".format(token)))
+            # only reported once
+            cls.SYMBOL_TABLE[token] = "unknown"
         
         return True
 
-    @classmethod
+    @hybridmethod
     def is_valid_identifier(cls, token):
         '''
         starts with a letter and is alphanumeric + any
@@ -25,161 +147,607 @@ class Parser:
         
         return False
 
-    @classmethod
-    def check_matching_types(cls, intended_type, expression):
+    @hybridmethod
+    def check_matching_types(cls, intended_type, expression_type):
+        '''
+        expression_type is the or-ed type flags of the expression
+        '''
+        # anything goes with an undeclared identifier in it
+        if (expression_type & UNKNOWN_TYPE or intended_type == "unknown"):
+            return True
+
         # it contains any boolean related operators
-        for char in RELATIONAL_OP+BOOLEAN_OP+("!",):
-            if char in expression:
-                return intended_type == "bool"
-        
+        if (expression_type & BOOL_TYPE):
+            return intended_type == "bool"
+
         # it contains a character constant or identifier
-        if '"' in expression or "char" in expression:
+        if (expression_type & CHAR_TYPE):
             return intended_type == "char"
 
         return intended_type == "int"
 
-    @classmethod
-    def parse(cls):
-        _, program_token = Tokenizer.get_next_token()
-        _type, id_token = Tokenizer.get_next_token()
+    @hybridmethod
+    def check_condition(cls, keyword, expression_type):
+        if (cls.SEMANTIC_CHECKS and not cls.check_matching_types("bool", expression_type)):
+            cls.report(ParserSemanticException("{} statement condition has to evaluate to a BOOLEAN".format(keyword.capitalize())))
+
+    @hybridmethod
+    def check_assignment(cls, assignment_type, expression_type):
+        if (cls.SEMANTIC_CHECKS and not cls.check_matching_types(assignment_type, expression_type)):
+            cls.report(ParserSemanticException("Wrong type assignment to identifier of type: {}".format(assignment_type)))
+
+    @hybridmethod
+    def parse(cls, build_ast=False):
+        '''
+        Validates the program, raising at the first error. With build_ast
+        the program's AST is built along the way and returned
+        '''
+        cls.SYMBOL_TABLE = {}
+        cls.MAX_BLOCK_DEPTH = 0
+        cls.MAX_EXPRESSION_DEPTH = 0
+        start = cls.TOKENIZER.CURRENT_TOKEN
+
+        _, program_token = cls.TOKENIZER.get_next_token()
+        _type, id_token = cls.TOKENIZER.get_next_token()
 
         if (program_token != "program" or _type != "IDENTIFIER" or not cls.is_valid_identifier(id_token)):
             raise ParserException(_type, program_token+" or "+id_token)
 
+        if (build_ast):
+            return cls.build_program(start, id_token)
+
+        if (cls.ENGINE == "table" and cls.DIAGNOSTICS is None and cls.LIMITS is None):
+            return cls.parse_table()
+
         cls.parse_var_decs()
         cls.parse_statements()
 
-    @classmethod
+    @hybridmethod
+    def parse_all(cls):
+        '''
+        Parses like parse, but instead of raising at the first error it
+        records it and carries on. Semantic errors are simply recorded,
+        after a syntax error tokens are skipped up to the next ';' or
+        block closing keyword (';' or 'begin' in the declarations).
+        Returns every error found, a bad program header or running out
+        of tokens still ends the parse
+        '''
+        cls.DIAGNOSTICS = []
+        try:
+            cls.parse()
+        except (ParserException, ParserSemanticException, ResourceLimitException) as e:
+            cls.TOKENIZER.error_offset(e)
+            cls.DIAGNOSTICS.append(e)
+
+        diagnostics = cls.DIAGNOSTICS
+        cls.DIAGNOSTICS = None
+        return diagnostics
+
+    @hybridmethod
     def parse_var_decs(cls):
-        _type, token = Tokenizer.get_next_token()
-        if (token == "begin"):
-            return
-        elif (token in ("int", "char")):
-            cls.parse_var_list(token)
-            cls.parse_var_decs()
-        else:
-            raise ParserException(_type, token)
+        _type, token = cls.TOKENIZER.get_next_token()
+
+        while (token != "begin"):
+            try:
+                if (token not in ("int", "char")):
+                    raise ParserException(_type, token)
+
+                cls.parse_var_list(token)
+            except ParserException as error:
+                if (cls.synchronise(error, (";", "begin")) == "begin"):
+                    return
+
+            _type, token = cls.TOKENIZER.get_next_token()
     
-    @classmethod
+    @hybridmethod
     def parse_var_list(cls, var_type):
         '''
         Each variable declaration starts with an identifier after a type
-        declaration, then its followed by either a ',' or ends with a ';'
+        declaration, then its followed by either a ',' or ends with a ';'.
+        Returns the declared names
         '''
+        names = []
 
-        _type, token = Tokenizer.get_next_token()
+        while (True):
+            _type, token = cls.TOKENIZER.get_next_token()
 
-        if (_type != "IDENTIFIER"):
-            raise ParserException(_type,  token)
+            if (_type != "IDENTIFIER"):
+                raise ParserException(_type,  token)
 
-        if (not cls.is_valid_identifier(token)):
-            raise ParserException(_type, token)
+            if (not cls.is_valid_identifier(token)):
+                raise ParserException(_type, token)
 
-        cls.SYMBOL_TABLE[token] = var_type
+            cls.SYMBOL_TABLE[token] = var_type
+            names.append(token)
 
-        _type, token = Tokenizer.get_next_token()
-        if (token == ";"):
-            return
-        elif (token == ","):
-            cls.parse_var_list(var_type)
-        else:
-            raise ParserException(_type, token)
+            _type, token = cls.TOKENIZER.get_next_token()
+            if (token == ";"):
+                return names
+            elif (token != ","):
+                raise ParserException(_type, token)
 
-    @classmethod
-    def parse_statements(cls):
+    @hybridmethod
+    def parse_statements(cls, depth=0):
         '''
         Only possible statements are:
         - assign statement
         - if statement (+ else clause)
         - print statement
         - while statement
+
+        The bodies of if and while statements are kept on an explicit
+        stack of open blocks rather than parsed recursively, a block is
+        closed by 'end', 'od' or 'fi' followed by a ';', the statement
+        list itself ends on a closing keyword with no block open. depth
+        blocks are already open when it starts
         '''
-        
-        _type, token = Tokenizer.get_next_token()
-
-        if (token in ("end", "od", "fi")):
-            return
-        elif (token == "else"):
-            cls.parse_statements()
-            return
-        elif (token == "while"):
-            cls.parse_while()
-        elif (token == "if"):
-            cls.parse_if()
-        elif (token == "print"):
-            cls.parse_expression()
-        elif (cls.is_valid_identifier(token) and cls.is_identifier_declared(token)):
-            # assignment statement starts with a valid identifier
-            # otherwise it is incorrect
-            cls.parse_assign(cls.SYMBOL_TABLE[token])
-        else:
-            raise ParserException(_type, token)
-        
-        cls.parse_statements()
 
-    @classmethod
-    def parse_if(cls):
-        line = cls.parse_expression()
-        if (not cls.check_matching_types("bool", line)):
-            raise ParserSemanticException("If statement condition has to evaluate to a BOOLEAN")
-        cls.parse_statements()
+        get_next_token = cls.TOKENIZER.get_next_token
+        checkpoint = cls.CHECKPOINT
+        deadline = cls.DEADLINE
+        blocks = [None] * depth
 
-        _type, token = Tokenizer.get_next_token()
-        if (token != ";"):
-            raise ParserException(_type, token)
+        while (True):
+            if (checkpoint is not None):
+                checkpoint(cls.TOKENIZER.CURRENT_TOKEN, len(blocks))
+            if (deadline is not None):
+                cls.check_deadline()
+            _type, token = get_next_token()
+
+            try:
+                if (token in ("end", "od", "fi")):
+                    if (not blocks):
+                        return
+
+                    blocks.pop()
+                    _type, token = get_next_token()
+                    if (token != ";"):
+                        raise ParserException(_type, token)
+                elif (token == "else"):
+                    continue
+                elif (token == "while" or token == "if"):
+                    # opened before the condition is parsed, so the
+                    # block's closing keyword matches even if it's bad
+                    blocks.append(token)
+                    if (len(blocks) > cls.MAX_BLOCK_DEPTH):
+                        cls.MAX_BLOCK_DEPTH = len(blocks)
+                        cls.check_depth(len(blocks))
+
+                    if (token == "while"):
+                        cls.parse_while()
+                    else:
+                        cls.parse_if()
+                elif (token == "print"):
+                    cls.parse_expression()
+                elif (cls.is_valid_identifier(token) and cls.is_identifier_declared(token)):
+                    # assignment statement starts with a valid identifier
+                    # otherwise it is incorrect
+                    cls.parse_assign(cls.SYMBOL_TABLE.get(token, "unknown"))
+                else:
+                    raise ParserException(_type, token)
+
+            except ParserException as error:
+                token = cls.synchronise(error, cls.SYNC_TOKENS)
+                # a closing keyword still closes its block
+                while (token != ";"):
+                    if (not blocks):
+                        return
+
+                    blocks.pop()
+                    _type, token = get_next_token()
+                    if (token != ";"):
+                        token = cls.synchronise(ParserException(_type, token), cls.SYNC_TOKENS)
+
+    @hybridmethod
+    def parse_if(cls):
+        '''
+        Only the condition, parse_statements carries on with the body
+        '''
+        cls.check_condition("if", cls.parse_expression())
 
-    @classmethod
+    @hybridmethod
     def parse_assign(cls, assignment_type):
-        _type, token = Tokenizer.get_next_token()
+        _type, token = cls.TOKENIZER.get_next_token()
         
         if (token == ":="):
-            line = cls.parse_expression()
-            if (not cls.check_matching_types(assignment_type, line)):
-                raise ParserSemanticException("Wrong type assignment to identifier of type: {}".format(assignment_type))
+            cls.check_assignment(assignment_type, cls.parse_expression())
         else:
             raise ParserException(_type, token)
 
-    @classmethod
+    @hybridmethod
     def parse_while(cls):
-        line = cls.parse_expression()
-        if (not cls.check_matching_types("bool", line)):
-            raise ParserSemanticException("While statement condition has to evaluate to a BOOLEAN")
-        cls.parse_statements()
-        
-        _type, token = Tokenizer.get_next_token()
-        if (token != ";"):
-            raise ParserException(_type, token)
+        '''
+        Only the condition, parse_statements carries on with the body
+        '''
+        cls.check_condition("while", cls.parse_expression())
 
-    @classmethod
-    def parse_expression(cls, expression=""):
-        expression+=cls.parse_term()
+    @hybridmethod
+    def parse_expression(cls):
+        '''
+        A sequence of terms joined by binary operators, returns the or-ed
+        type flags of all of them. A '(' term opens a nested expression,
+        only the nesting depth is needed to know whether a terminator
+        closes the nested or the outer expression
+        '''
+        tokenizer = cls.TOKENIZER
+        get_next_token = tokenizer.get_next_token
+        binary_op_types = cls.BINARY_OP_TYPES
+        expression_type = 0
+        depth = 0
 
-        _type, token = Tokenizer.get_next_token()
+        # index of the last token the expression may take, None for no limit
+        end = None
+        if (cls.LIMITS is not None and cls.LIMITS.expression_length is not None):
+            end = tokenizer.CURRENT_TOKEN + cls.LIMITS.expression_length
+        deadline = cls.DEADLINE
+        next_check = tokenizer.CURRENT_TOKEN + cls.DEADLINE_INTERVAL
 
-        if (token in (";", "then", "do", ")")):
-            return expression
-        elif (token in ARITHMETIC_OP+BOOLEAN_OP+RELATIONAL_OP):
-            expression += token
-            expression += cls.parse_expression()
-        else:
-            raise ParserException(_type, token)
+        while (True):
+            term_type = cls.parse_term(end)
+            if (end is not None and tokenizer.CURRENT_TOKEN > end):
+                raise ResourceLimitException("expression_length", cls.LIMITS.expression_length)
+            if (deadline is not None and tokenizer.CURRENT_TOKEN >= next_check):
+                cls.check_deadline()
+                next_check = tokenizer.CURRENT_TOKEN + cls.DEADLINE_INTERVAL
+            if (term_type is None):
+                depth += 1
+                if (depth > cls.MAX_EXPRESSION_DEPTH):
+                    cls.MAX_EXPRESSION_DEPTH = depth
+                    cls.check_depth(depth)
+                continue
+            expression_type |= term_type
 
-        return expression
+            while (True):
+                _type, token = get_next_token()
 
-    @classmethod
-    def parse_term(cls, expression=""):
-        _type, token = Tokenizer.get_next_token()
+                if (token in (";", "then", "do", ")")):
+                    if (depth == 0):
+                        return expression_type
+                    depth -= 1
+                elif (token in binary_op_types):
+                    expression_type |= binary_op_types[token]
+                    break
+                else:
+                    raise ParserException(_type, token)
 
-        if (_type != "INT_CONST" and _type != "CHAR_CONST"):
-            if (token == "("):
-                expression+=cls.parse_expression()
-            elif (token in UNARY_OP):
-                expression+=cls.parse_term()
+    @hybridmethod
+    def parse_term(cls, end=None):
+        '''
+        Consumes any unary operators and the operand after them, returns
+        their or-ed type flags, or None if the operand is a '(' that
+        opens a nested expression. end is the index of the last token
+        the expression may take, None for no limit
+        '''
+        get_next_token = cls.TOKENIZER.get_next_token
+        term_type = 0
+
+        while (True):
+            _type, token = get_next_token()
+
+            if (_type == "INT_CONST"):
+                return term_type
+            elif (_type == "CHAR_CONST"):
+                return term_type | CHAR_TYPE
+            elif (token == "("):
+                return None
+            elif (token in cls.UNARY_OP_TYPES):
+                term_type |= cls.UNARY_OP_TYPES[token]
+                # a run of them can be as long as the source
+                if (end is not None and cls.TOKENIZER.CURRENT_TOKEN > end):
+                    raise ResourceLimitException("expression_length", cls.LIMITS.expression_length)
+                if (cls.DEADLINE is not None and cls.TOKENIZER.CURRENT_TOKEN % cls.DEADLINE_INTERVAL == 0):
+                    cls.check_deadline()
             elif (cls.is_valid_identifier(token) and cls.is_identifier_declared(token)):
-                expression += cls.SYMBOL_TABLE[token]
-                return expression
+                return term_type | cls.DECLARED_TYPES[cls.SYMBOL_TABLE.get(token, "unknown")]
             else:
                 raise ParserException(_type, token)
 
-        expression+=token
-        return expression
\ No newline at end of file
+    @hybridmethod
+    def parse_table(cls):
+        '''
+        Parses everything after the program header with the predictive
+        parse table of GRAMMAR, same verdicts and errors as parse_var_decs
+        and parse_statements. The next token is only read once a terminal
+        or nonterminal has to look at it, so actions run and errors are
+        raised at the same point as in the descent parser
+        '''
+        grammar = cls.GRAMMAR
+        table = grammar.table
+        nonterminal_base = grammar.NONTERMINAL_BASE
+        action_base = grammar.ACTION_BASE
+        value_terminals = grammar.value_terminals
+        kind_terminals = grammar.kind_terminals
+        identifier = grammar.codes["ID"]
+        bad_identifier = grammar.codes["BAD_ID"]
+        get_next_token = cls.TOKENIZER.get_next_token
+        is_valid_identifier = cls.is_valid_identifier
+
+        # state the actions share
+        symbol_table = cls.SYMBOL_TABLE
+        declared_types = cls.DECLARED_TYPES
+        var_type = assignment_type = None
+        expression_type = blocks = depth = 0
+
+        def set_type(token):
+            nonlocal var_type
+            var_type = token
+
+        def declare(token):
+            symbol_table[token] = var_type
+
+        def target(token):
+            nonlocal assignment_type
+            cls.is_identifier_declared(token)
+            assignment_type = symbol_table.get(token, "unknown")
+
+        def start(token):
+            nonlocal expression_type
+            expression_type = 0
+
+        def ref(token):
+            nonlocal expression_type
+            cls.is_identifier_declared(token)
+            expression_type |= declared_types[symbol_table.get(token, "unknown")]
+
+        def boolean(token):
+            nonlocal expression_type
+            expression_type |= BOOL_TYPE
+
+        def char(token):
+            nonlocal expression_type
+            expression_type |= CHAR_TYPE
+
+        def open_paren(token):
+            nonlocal depth
+            depth += 1
+            if (depth > cls.MAX_EXPRESSION_DEPTH):
+                cls.MAX_EXPRESSION_DEPTH = depth
+
+        def close_paren(token):
+            nonlocal depth
+            depth -= 1
+
+        def open_block(token):
+            nonlocal blocks
+            blocks += 1
+            if (blocks > cls.MAX_BLOCK_DEPTH):
+                cls.MAX_BLOCK_DEPTH = blocks
+
+        def close_block(token):
+            nonlocal blocks
+            blocks -= 1
+
+        def check_if(token):
+            cls.check_condition("if", expression_type)
+
+        def check_while(token):
+            cls.check_condition("while", expression_type)
+
+        def check_assign(token):
+            cls.check_assignment(assignment_type, expression_type)
+
+        handlers = {
+            "@type": set_type, "@declare": declare, "@target": target, "@start": start,
+            "@ref": ref, "@bool": boolean, "@char": char,
+            "@open_paren": open_paren, "@close_paren": close_paren,
+            "@open_block": open_block, "@close_block": close_block,
+            "@check_if": check_if, "@check_while": check_while, "@check_assign": check_assign,
+        }
+        # indexed by action code - ACTION_BASE
+        actions = [handlers[name] for name in grammar.actions]
+
+        stack = [grammar.start]
+        pop = stack.pop
+        terminal = None
+        # the last token matched by a terminal, what actions are given
+        matched = None
+
+        while (stack):
+            symbol = pop()
+
+            if (symbol >= action_base):
+                actions[symbol - action_base](matched)
+                continue
+
+            if (terminal is None):
+                _type, token = get_next_token()
+                terminal = value_terminals.get(token)
+                if (terminal is None):
+                    terminal = kind_terminals[_type]
+                    if (terminal == identifier and not is_valid_identifier(token)):
+                        terminal = bad_identifier
+
+            if (symbol < nonterminal_base):
+                if (symbol != terminal):
+                    raise ParserException(_type, token)
+                matched = token
+                terminal = None
+                continue
+
+            production = table[symbol - nonterminal_base][terminal]
+            if (production is None):
+                if (grammar.nonterminals[symbol - nonterminal_base] in IDENTIFIER_ERRORS and is_valid_identifier(token)):
+                    # read as an identifier that was never declared
+                    cls.is_identifier_declared(token)
+                raise ParserException(_type, token)
+            stack += production
+
+    # AST construction, the same grammar and checks as the parse_*
+    # methods above, kept apart so plain validation doesn't pay for it
+
+    @hybridmethod
+    def token_index(cls):
+        # index of the token get_next_token returned last
+        return cls.TOKENIZER.CURRENT_TOKEN - 1
+
+    @hybridmethod
+    def build_program(cls, start, name):
+        declarations = []
+
+        _type, token = cls.TOKENIZER.get_next_token()
+        while (token != "begin"):
+            if (token not in ("int", "char")):
+                raise ParserException(_type, token)
+
+            dec_start = cls.token_index()
+            names = cls.parse_var_list(token)
+            declarations.append(VarDec(dec_start, cls.token_index()+1, token, names))
+            _type, token = cls.TOKENIZER.get_next_token()
+
+        body = cls.build_statements()
+        return Program(start, cls.token_index()+1, name, declarations, body)
+
+    @hybridmethod
+    def build_statements(cls):
+        '''
+        Same walk as parse_statements, returns the list of statement
+        nodes. Inside an if, the first 'else' moves on to its orelse
+        list, anywhere else 'else' is accepted and ignored like it is
+        by parse_statements
+        '''
+        get_next_token = cls.TOKENIZER.get_next_token
+        deadline = cls.DEADLINE
+        body = []
+        # (open if/while node, the statement list it belongs to)
+        blocks = []
+
+        while (True):
+            if (deadline is not None):
+                cls.check_deadline()
+            _type, token = get_next_token()
+            start = cls.token_index()
+
+            if (token in ("end", "od", "fi")):
+                if (not blocks):
+                    return body
+
+                node, body = blocks.pop()
+                _type, token = get_next_token()
+                if (token != ";"):
+                    raise ParserException(_type, token)
+                node.end = cls.token_index()+1
+            elif (token == "else"):
+                if (blocks and type(blocks[-1][0]) is If and body is blocks[-1][0].body):
+                    body = blocks[-1][0].orelse
+            elif (token == "while" or token == "if"):
+                # the depth counts the block before its condition, as
+                # parse_statements does
+                if (len(blocks) + 1 > cls.MAX_BLOCK_DEPTH):
+                    cls.MAX_BLOCK_DEPTH = len(blocks) + 1
+                    cls.check_depth(len(blocks) + 1)
+                condition = cls.build_expression()
+                cls.check_condition(token, condition.flags)
+
+                if (token == "while"):
+                    node = While(start, start, condition, [])
+                else:
+                    node = If(start, start, condition, [], [])
+                body.append(node)
+                blocks.append((node, body))
+                body = node.body
+            elif (token == "print"):
+                value = cls.build_expression()
+                body.append(Print(start, cls.token_index()+1, value))
+            elif (cls.is_valid_identifier(token) and cls.is_identifier_declared(token)):
+                var_type = cls.SYMBOL_TABLE.get(token, "unknown")
+                target = Ref(start, start+1, cls.DECLARED_TYPES[var_type], token)
+
+                _type, token = get_next_token()
+                if (token != ":="):
+                    raise ParserException(_type, token)
+
+                value = cls.build_expression()
+                cls.check_assignment(var_type, value.flags)
+                body.append(Assign(start, cls.token_index()+1, target, value))
+            else:
+                raise ParserException(_type, token)
+
+    @hybridmethod
+    def build_expression(cls):
+        '''
+        Same walk as parse_expression and parse_term, returns the root
+        node of the expression. Operands and pending operators are kept
+        on two explicit stacks and reduced by precedence, a None on the
+        operator stack marks an open '('
+        '''
+        tokenizer = cls.TOKENIZER
+        get_next_token = tokenizer.get_next_token
+        operands = []
+        # (precedence, operator, is unary, index of the operator token)
+        operators = []
+        # index of each open '(', its group's span starts there
+        parens = []
+        depth = 0
+
+        # the same limits as parse_expression, checked on every token of
+        # a term so a run of unary operators is bounded too
+        end = None
+        if (cls.LIMITS is not None and cls.LIMITS.expression_length is not None):
+            end = tokenizer.CURRENT_TOKEN + cls.LIMITS.expression_length
+        deadline = cls.DEADLINE
+
+        def reduce():
+            precedence, op, unary, index = operators.pop()
+            if (unary):
+                operand = operands.pop()
+                operands.append(UnaryOp(index, operand.end, operand.flags | cls.UNARY_OP_TYPES[op], op, operand))
+            else:
+                right = operands.pop()
+                left = operands.pop()
+                flags = left.flags | right.flags | cls.BINARY_OP_TYPES[op]
+                operands.append(BinOp(left.start, right.end, flags, op, left, right))
+
+        while (True):
+            # a term, any unary operators or '(' then an operand
+            while (True):
+                _type, token = get_next_token()
+                index = cls.token_index()
+                if (end is not None and index >= end):
+                    raise ResourceLimitException("expression_length", cls.LIMITS.expression_length)
+                if (deadline is not None and index % cls.DEADLINE_INTERVAL == 0):
+                    cls.check_deadline()
+
+                if (_type == "INT_CONST"):
+                    operands.append(Const(index, index+1, 0, _type, int_value(token)))
+                    break
+                elif (_type == "CHAR_CONST"):
+                    operands.append(Const(index, index+1, CHAR_TYPE, _type, token[1]))
+                    break
+                elif (token == "("):
+                    operators.append(None)
+                    parens.append(index)
+                    depth += 1
+                    if (depth > cls.MAX_EXPRESSION_DEPTH):
+                        cls.MAX_EXPRESSION_DEPTH = depth
+                        cls.check_depth(depth)
+                elif (token in cls.UNARY_OP_TYPES):
+                    operators.append((cls.UNARY_PRECEDENCE, token, True, index))
+                elif (cls.is_valid_identifier(token) and cls.is_identifier_declared(token)):
+                    operands.append(Ref(index, index+1, cls.DECLARED_TYPES[cls.SYMBOL_TABLE.get(token, "unknown")], token))
+                    break
+                else:
+                    raise ParserException(_type, token)
+
+            # then a binary operator, or terminators closing expressions
+            while (True):
+                _type, token = get_next_token()
+
+                if (token in (";", "then", "do", ")")):
+                    while (operators and operators[-1] is not None):
+                        reduce()
+                    if (depth == 0):
+                        return operands.pop()
+                    operators.pop()
+                    depth -= 1
+                    # the group's node spans its parentheses too, so the
+                    # nodes built around it span balanced source
+                    operands[-1].start = parens.pop()
+                    operands[-1].end = cls.token_index()+1
+                elif (token in cls.BINARY_OP_TYPES):
+                    precedence = cls.PRECEDENCE[token]
+                    while (operators and operators[-1] is not None and operators[-1][0] >= precedence):
+                        reduce()
+                    operators.append((precedence, token, False, cls.token_index()))
+                    break
+                else:
+                    raise ParserException(_type, token)
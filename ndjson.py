@@ -0,0 +1,85 @@
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from daemon import validate_source, bad_request
+
+# input lines handed to a worker at once, enough to amortise the
+# inter-process round trip
+CHUNK_SIZE = 64
+
+# chunks in flight per worker, reading more input waits for the oldest
+# one once they're all taken so memory stays bounded however fast the
+# input comes
+PENDING_PER_JOB = 4
+
+def validate_line(line, limits=None, tier="full"):
+    '''
+    Worker entry point, the verdict for one input line, a JSON object
+    {"source": ..., "id": ...} ("id" is optional and echoed back).
+    Returns (whether it's ok, the response as one line of JSON) with the
+    same responses as the daemon gives
+    '''
+    try:
+        request = json.loads(line)
+    except ValueError:
+        request = None
+
+    response = bad_request(request)
+    if (response is None):
+        response = validate_source(request["source"], limits, tier)
+    if (isinstance(request, dict) and "id" in request):
+        response["id"] = request["id"]
+
+    return (response["verdict"] == "ok", json.dumps(response))
+
+def validate_lines(lines, limits=None, tier="full"):
+    return [validate_line(line, limits, tier) for line in lines]
+
+def run(lines, out=sys.stdout, jobs=1, limits=None, tier="full"):
+    '''
+    Writes a response line to out for each line of input that isn't
+    blank, in input order. With one job each is validated and written
+    as soon as it's read, more jobs validate chunks of lines in worker
+    processes. Returns 0 if every program was ok, 1 otherwise
+    '''
+    jobs = jobs or os.cpu_count() or 1
+    lines = (line for line in lines if line.strip())
+    failed = False
+
+    def write(results):
+        nonlocal failed
+        for ok, response in results:
+            failed = failed or not ok
+            out.write(response + "\n")
+        out.flush()
+
+    if (jobs == 1):
+        for line in lines:
+            write([validate_line(line, limits, tier)])
+        return 1 if failed else 0
+
+    validate = partial(validate_lines, limits=limits, tier=tier)
+    pending = deque()
+    chunk = []
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for line in lines:
+            chunk.append(line)
+            if (len(chunk) == CHUNK_SIZE):
+                pending.append(pool.submit(validate, chunk))
+                chunk = []
+                if (len(pending) >= jobs * PENDING_PER_JOB):
+                    write(pending.popleft().result())
+            # whatever is done already goes out straight away
+            while (pending and pending[0].done()):
+                write(pending.popleft().result())
+
+        if (chunk):
+            pending.append(pool.submit(validate, chunk))
+        while (pending):
+            write(pending.popleft().result())
+
+    return 1 if failed else 0
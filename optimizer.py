@@ -0,0 +1,224 @@
+import operator
+from boazast import Assign, If, While, Print, BinOp, UnaryOp, Const
+from constants import BOOLEAN_OP, RELATIONAL_OP
+from vm import VM
+
+# how vm.VM evaluates each operator, bools as 0 or 1
+BINARY_OPERATORS = {
+    "+": operator.add, "-": operator.sub, "*": operator.mul, "/": VM.divide,
+    "&": lambda left, right: int(bool(left) and bool(right)),
+    "|": lambda left, right: int(bool(left) or bool(right)),
+    "=": lambda left, right: int(left == right),
+    "!=": lambda left, right: int(left != right),
+    "<": lambda left, right: int(left < right),
+    ">": lambda left, right: int(left > right),
+    "<=": lambda left, right: int(left <= right),
+    ">=": lambda left, right: int(left >= right),
+}
+UNARY_OPERATORS = {"-": operator.neg, "!": lambda value: int(not value)}
+
+# the operators whose value is always 0 or 1
+BOOLEAN_RESULTS = frozenset(BOOLEAN_OP + RELATIONAL_OP)
+
+def value_of(const):
+    return const.value if const.kind == "INT_CONST" else ord(const.value)
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while (stack):
+        node = stack.pop()
+        count += 1
+        if (type(node) is BinOp):
+            stack += (node.left, node.right)
+        elif (type(node) is UnaryOp):
+            stack.append(node.operand)
+    return count
+
+class Optimizer:
+    '''
+    Simplifies the expressions of a program's AST in place, with the
+    same results under vm.VM:
+    - operators on constants are folded into one constant
+    - '- -' is dropped, so is '! !' in front of something already 0 or 1
+    - x+0, x-0, 0+x, x*1, 1*x and x/1 become x, 0-x becomes -x
+    - x*0, x&0 and x|1 (either way round) become a constant, unless x
+      could divide by zero
+    - constants in a chain of '+'/'-' or of '*' are brought together,
+      (x+1)+2 becomes x+3
+
+    A node is only ever replaced by one with the same type flags, so
+    Parser.check_matching_types sees the same types as before. Folded
+    constants are INT_CONST with a number as the value, whatever their
+    flags say the type is. removed counts the nodes taken out
+    '''
+
+    def __init__(self):
+        self.removed = 0
+
+    @classmethod
+    def optimize(cls, program):
+        '''
+        Returns the number of nodes removed from program
+        '''
+        optimizer = cls()
+        optimizer.statements(program.body)
+        return optimizer.removed
+
+    def statements(self, body):
+        bodies = [body]
+        while (bodies):
+            for node in bodies.pop():
+                node_type = type(node)
+                if (node_type is Assign or node_type is Print):
+                    node.value = self.expression(node.value)
+                elif (node_type is While):
+                    node.condition = self.expression(node.condition)
+                    bodies.append(node.body)
+                elif (node_type is If):
+                    node.condition = self.expression(node.condition)
+                    bodies += (node.body, node.orelse)
+
+    def expression(self, root):
+        '''
+        Returns the simplified root, children are simplified before
+        their parents on an explicit stack as expressions can be long
+        '''
+        before = count_nodes(root)
+        # (node, whether it could divide by zero) for finished subtrees
+        results = []
+        stack = [(root, False)]
+
+        while (stack):
+            node, visited = stack.pop()
+            node_type = type(node)
+
+            if (node_type is BinOp):
+                if (not visited):
+                    stack += ((node, True), (node.right, False), (node.left, False))
+                    continue
+                right = results.pop()
+                left = results.pop()
+                results.append(self.binary(node, left, right))
+            elif (node_type is UnaryOp):
+                if (not visited):
+                    stack += ((node, True), (node.operand, False))
+                    continue
+                results.append(self.unary(node, results.pop()))
+            else:
+                results.append((node, False))
+
+        root = results.pop()[0]
+        self.removed += before - count_nodes(root)
+        return root
+
+    def constant(self, node, value):
+        return Const(node.start, node.end, node.flags, "INT_CONST", int(value))
+
+    def replace(self, node, child, fails):
+        # only by something of the same type
+        if (child.flags == node.flags):
+            return (child, fails)
+        return (node, fails)
+
+    def unary(self, node, result):
+        operand, fails = result
+        node.operand = operand
+
+        if (type(operand) is Const):
+            return (self.constant(node, UNARY_OPERATORS[node.op](value_of(operand))), False)
+
+        if (type(operand) is UnaryOp and operand.op == node.op):
+            inner = operand.operand
+            if (node.op == "-" or self.is_boolean(inner)):
+                return self.replace(node, inner, fails)
+
+        return (node, fails)
+
+    def is_boolean(self, node):
+        node_type = type(node)
+        if (node_type is BinOp):
+            return node.op in BOOLEAN_RESULTS
+        if (node_type is UnaryOp):
+            return node.op == "!"
+        return node_type is Const and value_of(node) in (0, 1)
+
+    def binary(self, node, left_result, right_result):
+        left, left_fails = left_result
+        right, right_fails = right_result
+        node.left, node.right = left, right
+        op = node.op
+        left_value = value_of(left) if type(left) is Const else None
+        right_value = value_of(right) if type(right) is Const else None
+
+        if (op == "/" and right_value == 0):
+            # kept to fail at run time
+            return (node, True)
+        fails = left_fails or right_fails or (op == "/" and right_value is None)
+
+        if (left_value is not None and right_value is not None):
+            return (self.constant(node, BINARY_OPERATORS[op](left_value, right_value)), False)
+
+        if (op == "+"):
+            if (right_value == 0):
+                return self.replace(node, left, fails)
+            if (left_value == 0):
+                return self.replace(node, right, fails)
+        elif (op == "-"):
+            if (right_value == 0):
+                return self.replace(node, left, fails)
+            if (left_value == 0 and left.flags | right.flags == right.flags):
+                return (UnaryOp(node.start, node.end, node.flags, "-", right), fails)
+        elif (op == "*"):
+            if (right_value == 1):
+                return self.replace(node, left, fails)
+            if (left_value == 1):
+                return self.replace(node, right, fails)
+            if ((left_value == 0 and not right_fails) or (right_value == 0 and not left_fails)):
+                return (self.constant(node, 0), False)
+        elif (op == "/"):
+            if (right_value == 1):
+                return self.replace(node, left, fails)
+        elif (op == "&"):
+            if ((left_value == 0 and not right_fails) or (right_value == 0 and not left_fails)):
+                return (self.constant(node, 0), False)
+        elif (op == "|"):
+            if ((left_value not in (None, 0) and not right_fails) or (right_value not in (None, 0) and not left_fails)):
+                return (self.constant(node, 1), False)
+
+        if (right_value is not None and op in ("+", "-", "*")):
+            return self.reassociate(node, fails)
+        return (node, fails)
+
+    def reassociate(self, node, fails):
+        '''
+        node is (x op c) op2 c2 or (c op x) op2 c2, with both operators
+        '+'/'-' or both '*', and becomes x + c3 or x * c3
+        '''
+        left, right = node.left, node.right
+        if (type(left) is not BinOp):
+            return (node, fails)
+
+        additive = node.op in ("+", "-")
+        if (left.op not in (("+", "-") if additive else ("*",))):
+            return (node, fails)
+
+        if (type(left.right) is Const):
+            x, c = left.left, left.right
+            value = value_of(c) if left.op != "-" else -value_of(c)
+        elif (type(left.left) is Const and left.op != "-"):
+            x, c = left.right, left.left
+            value = value_of(c)
+        else:
+            return (node, fails)
+
+        if (additive):
+            value += value_of(right) if node.op == "+" else -value_of(right)
+            op = "+"
+        else:
+            value *= value_of(right)
+            op = "*"
+
+        # x keeps its flags, the constants' are merged into the new one
+        merged = Const(c.start, right.end, c.flags | right.flags, "INT_CONST", value)
+        return self.binary(BinOp(node.start, node.end, node.flags, op, x, merged), (x, fails), (merged, False))
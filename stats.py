@@ -0,0 +1,107 @@
+import json
+import time
+from collections import Counter
+from constants import TOKEN_KINDS
+from tokenstore import TokenStore
+
+class Stats:
+    '''
+    Phase timings and hot-path counters for one validation. instrument()
+    wraps methods of a BoazValidator's own tokenizer and parser
+    instances, so sessions without Stats run the plain methods and pay
+    nothing for it. Times are wall clock and inclusive, parse contains
+    the get_next_token and parse_expression time spent inside it
+    '''
+
+    # (owner attribute on the validator, method) pairs that get timed
+    TIMED = (
+        ("tokenizer", "tokenize"),
+        ("tokenizer", "get_next_token"),
+        ("parser", "parse"),
+        ("parser", "parse_expression"),
+    )
+
+    def __init__(self):
+        self.calls = Counter()
+        self.seconds = Counter()
+        self.token_kinds = Counter()
+        self.max_block_depth = 0
+        self.max_expression_depth = 0
+        self.symbol_table_size = 0
+
+    def wrap(self, owner, name):
+        method = getattr(owner, name)
+        calls, seconds = self.calls, self.seconds
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                seconds[name] += clock() - start
+                calls[name] += 1
+
+        setattr(owner, name, timed)
+
+    def count_tokens(self, tokenizer):
+        # streamed tokens are never stored, count them as they're handed out
+        method = tokenizer.get_next_token
+        kinds = self.token_kinds
+
+        def counted():
+            token = method()
+            kinds[token[0]] += 1
+            return token
+
+        tokenizer.get_next_token = counted
+
+    def instrument(self, validator):
+        if (validator.streamed):
+            self.count_tokens(validator.tokenizer)
+        for owner, name in self.TIMED:
+            self.wrap(getattr(validator, owner), name)
+
+    def collect(self, validator):
+        '''
+        Picks up what can be read off the session once it has run
+        '''
+        tokens = validator.tokenizer.TOKENS
+        if (isinstance(tokens, TokenStore)):
+            self.token_kinds = Counter({TOKEN_KINDS[kind]: count for kind, count in Counter(tokens.kinds).items()})
+        elif (tokens):
+            self.token_kinds = Counter(kind for kind, _ in tokens)
+
+        self.max_block_depth = validator.parser.MAX_BLOCK_DEPTH
+        self.max_expression_depth = validator.parser.MAX_EXPRESSION_DEPTH
+        self.symbol_table_size = len(validator.parser.SYMBOL_TABLE)
+
+    def as_dict(self):
+        return {
+            "phases": {name: self.seconds[name] for name in ("tokenize", "parse") if self.calls[name]},
+            "calls": {name: self.calls[name] for _, name in self.TIMED},
+            "seconds": {name: self.seconds[name] for _, name in self.TIMED},
+            "tokens": sum(self.token_kinds.values()),
+            "token_kinds": {kind: self.token_kinds[kind] for kind in TOKEN_KINDS},
+            "max_block_depth": self.max_block_depth,
+            "max_expression_depth": self.max_expression_depth,
+            "symbol_table_size": self.symbol_table_size,
+        }
+
+    def format(self, style="text"):
+        stats = self.as_dict()
+        if (style == "json"):
+            return json.dumps(stats, indent=2)
+
+        lines = []
+        for phase, seconds in stats["phases"].items():
+            lines.append("{:<24} {:.6f}s".format(phase + " phase", seconds))
+        for name, calls in stats["calls"].items():
+            lines.append("{:<24} {} calls, {:.6f}s".format(name, calls, stats["seconds"][name]))
+        lines.append("{:<24} {}".format("tokens", stats["tokens"]))
+        for kind, count in stats["token_kinds"].items():
+            lines.append("  {:<22} {}".format(kind, count))
+        lines.append("{:<24} {}".format("max block depth", stats["max_block_depth"]))
+        lines.append("{:<24} {}".format("max expression depth", stats["max_expression_depth"]))
+        lines.append("{:<24} {}".format("symbol table size", stats["symbol_table_size"]))
+        return "\n".join(lines)
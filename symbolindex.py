@@ -0,0 +1,237 @@
+import hashlib
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from batch import MAX_CHUNKSIZE, collect_files
+from constants import VERSION
+from lineindex import LineIndex
+from tokenizer import Tokenizer
+from validator import BoazValidator
+
+def scan_source(code):
+    '''
+    What the index keeps of one source: (program name, ok, error kind,
+    declarations, references). Declarations are (name, type, offset,
+    line, column) and references (name, "assign" or "use", offset, line,
+    column). The source is validated with error recovery and the rest is
+    read off its tokens, so a file with errors is still indexed
+    '''
+    validator = BoazValidator(code, recover=True)
+    ok = validator.run()
+    tokens = list(validator.tokenizer.TOKENS)
+    starts = validator.tokenizer.TOKENS.starts
+    lines = LineIndex(code)
+
+    program = None
+    first = 0
+    if (tokens[:1] == [("KEYWORD", "program")] and len(tokens) > 1 and tokens[1][0] == "IDENTIFIER"):
+        program = tokens[1][1]
+        first = 2
+
+    declarations, references = [], []
+    in_body = False
+    var_type = None
+
+    for i in range(first, len(tokens)):
+        kind, value = tokens[i]
+
+        if (not in_body):
+            if (kind == "KEYWORD" and value == "begin"):
+                in_body = True
+            elif (kind == "KEYWORD" and value in ("int", "char")):
+                var_type = value
+            elif (kind == "IDENTIFIER" and var_type is not None):
+                declarations.append((value, var_type, starts[i]) + lines.position(starts[i]))
+        elif (kind == "IDENTIFIER"):
+            # an assignment's target is the only identifier followed by ':='
+            usage = "assign" if i+1 < len(tokens) and tokens[i+1][1] == ":=" else "use"
+            references.append((value, usage, starts[i]) + lines.position(starts[i]))
+
+    return (program, ok, validator.error_kind, declarations, references)
+
+def index_file(path, known_hash=None):
+    '''
+    Worker entry point, returns (path, mtime, size, hash, scan), scan is
+    None when the file's hash is still known_hash
+    '''
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+            stat = os.fstat(f.fileno())
+    except OSError as e:
+        return (path, 0, 0, None, (None, False, type(e).__name__, [], []))
+
+    digest = hashlib.sha256(data).hexdigest()
+    if (digest == known_hash):
+        return (path, stat.st_mtime_ns, stat.st_size, digest, None)
+
+    # ASCII sources are lexed as bytes without decoding them, anything
+    # else lexes differently from its text so it's decoded first
+    if (Tokenizer.NON_ASCII_PATTERN.search(data) is not None):
+        try:
+            data = data.decode("utf-8")
+        except UnicodeDecodeError as e:
+            return (path, stat.st_mtime_ns, stat.st_size, digest, (None, False, type(e).__name__, [], []))
+
+    return (path, stat.st_mtime_ns, stat.st_size, digest, scan_source(data))
+
+def run_index(work, jobs=None):
+    '''
+    Yields index_file results for (path, known hash) pairs, in worker
+    processes unless jobs is 1
+    '''
+    jobs = jobs or os.cpu_count() or 1
+    if (jobs == 1 or len(work) <= 1):
+        for path, known_hash in work:
+            yield index_file(path, known_hash)
+        return
+
+    chunksize = max(1, min(MAX_CHUNKSIZE, len(work) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(index_file, *zip(*work), chunksize=chunksize)
+
+class SymbolIndex:
+    '''
+    Cross-file index of Boaz sources in an SQLite database: each file's
+    program name and verdict, the variables it declares with their
+    types, and every identifier reference with its position. update()
+    only reads files whose mtime or size changed, and only indexes them
+    again if their hash changed too, so queries over a whole corpus are
+    answered without lexing or parsing any of it
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        # autocommit, transactions are opened explicitly where needed
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, mtime INTEGER NOT NULL,"
+            " size INTEGER NOT NULL, hash TEXT, version TEXT NOT NULL,"
+            " program TEXT, ok INTEGER NOT NULL, error TEXT)"
+        )
+        for table, kind in (("declarations", "type"), ("refs", "kind")):
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS {} ("
+                " file INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,"
+                " name TEXT NOT NULL, {} TEXT NOT NULL, offset INTEGER NOT NULL,"
+                " line INTEGER NOT NULL, col INTEGER NOT NULL)".format(table, kind)
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS {0}_name ON {0} (name, {1})".format(table, kind))
+            self.db.execute("CREATE INDEX IF NOT EXISTS {0}_file ON {0} (file)".format(table))
+
+    def update(self, paths, jobs=None):
+        '''
+        Brings the index up to date with paths, and drops indexed files
+        that no longer exist. Returns (indexed, unchanged, removed) counts
+        '''
+        known = {}
+        for path, mtime, size, digest, version in self.db.execute("SELECT path, mtime, size, hash, version FROM files"):
+            # indexed by another VERSION, it all has to be done again
+            known[path] = (mtime, size, digest if version == VERSION else None)
+
+        work = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            mtime, size, digest = known.get(path, (None, None, None))
+            if ((stat.st_mtime_ns, stat.st_size) != (mtime, size) or digest is None):
+                work.append((path, digest))
+
+        removed = [(path,) for path in known if not os.path.exists(path)]
+        indexed = 0
+
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            for path, mtime, size, digest, scan in run_index(work, jobs):
+                if (scan is None):
+                    self.db.execute("UPDATE files SET mtime = ?, size = ? WHERE path = ?", (mtime, size, path))
+                else:
+                    self.store(path, mtime, size, digest, scan)
+                    indexed += 1
+            self.db.executemany("DELETE FROM files WHERE path = ?", removed)
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+        return (indexed, len(paths) - indexed, len(removed))
+
+    def store(self, path, mtime, size, digest, scan):
+        program, ok, error, declarations, references = scan
+
+        self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+        file_id = self.db.execute(
+            "INSERT INTO files (path, mtime, size, hash, version, program, ok, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, mtime, size, digest, VERSION, program, int(ok), error)
+        ).lastrowid
+        self.db.executemany(
+            "INSERT INTO declarations (file, name, type, offset, line, col) VALUES (?, ?, ?, ?, ?, ?)",
+            ((file_id,) + declaration for declaration in declarations)
+        )
+        self.db.executemany(
+            "INSERT INTO refs (file, name, kind, offset, line, col) VALUES (?, ?, ?, ?, ?, ?)",
+            ((file_id,) + reference for reference in references)
+        )
+
+    def declared(self, name, var_type=None):
+        '''
+        Where name is declared, optionally only as var_type, as (path,
+        program name, type, line, column) rows
+        '''
+        query = (
+            "SELECT path, program, type, line, col FROM declarations JOIN files ON files.id = declarations.file"
+            " WHERE name = ?{} ORDER BY path, offset".format("" if var_type is None else " AND type = ?")
+        )
+        return self.db.execute(query, (name,) if var_type is None else (name, var_type)).fetchall()
+
+    def references(self, name, kind=None):
+        '''
+        Where name is assigned to ("assign") or read ("use"), or both
+        without a kind, as (path, kind, line, column) rows
+        '''
+        query = (
+            "SELECT path, kind, line, col FROM refs JOIN files ON files.id = refs.file"
+            " WHERE name = ?{} ORDER BY path, offset".format("" if kind is None else " AND kind = ?")
+        )
+        return self.db.execute(query, (name,) if kind is None else (name, kind)).fetchall()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+def main(db_path, patterns, jobs=None, files_from=None, declared=None, var_type=None, assigned=None, used=None, out=sys.stdout):
+    '''
+    Updates the index with the files patterns and files_from match, as
+    --batch collects them, then prints a tab separated line per result
+    of the declared/assigned/used queries given
+    '''
+    index = SymbolIndex(db_path)
+    try:
+        if (patterns or files_from is not None):
+            paths = collect_files(patterns, files_from)
+            indexed, unchanged, removed = index.update(paths, jobs)
+            print("{} files, {} indexed, {} unchanged, {} removed".format(len(paths), indexed, unchanged, removed), file=sys.stderr)
+
+        rows = []
+        if (declared is not None):
+            rows += index.declared(declared, var_type)
+        if (assigned is not None):
+            rows += index.references(assigned, "assign")
+        if (used is not None):
+            rows += index.references(used, "use")
+
+        for row in rows:
+            print(*("" if value is None else value for value in row), sep="\t", file=out)
+    finally:
+        index.close()
+
+    return 0
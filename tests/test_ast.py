@@ -0,0 +1,89 @@
+import sys
+sys.path.append("..")
+
+from tokenizer import Tokenizer
+from myparser import Parser
+from boazast import Program, VarDec, Assign, If, While, Print, BinOp, UnaryOp, Const, Ref
+from exceptions import ParserException, ParserSemanticException
+from pathlib import Path
+import unittest
+
+BOAZ_DIR = Path(__file__).parent
+BOAZ_DIR = BOAZ_DIR.parent / "boazfiles"
+
+class TestAst(unittest.TestCase):
+
+    def build(self, code):
+        self.tokenizer = Tokenizer(code)
+        self.tokenizer.tokenize()
+        return Parser(self.tokenizer).parse(build_ast=True)
+
+    def test_validation_only_parse_returns_nothing(self):
+        tokenizer = Tokenizer("program x begin end")
+        tokenizer.tokenize()
+        self.assertIsNone(Parser(tokenizer).parse())
+
+    def test_declarations_and_statements(self):
+        program = self.build('program x int a, b; char c; begin a := 1; c := "z"; print b; end')
+
+        self.assertEqual(program, Program(0, 0, "x", [VarDec(0, 0, "int", ["a", "b"]), VarDec(0, 0, "char", ["c"])], [
+            Assign(0, 0, Ref(0, 0, 0, "a"), Const(0, 0, 0, "INT_CONST", 1)),
+            Assign(0, 0, Ref(0, 0, 0, "c"), Const(0, 0, 0, "CHAR_CONST", "z")),
+            Print(0, 0, Ref(0, 0, 0, "b")),
+        ]))
+
+    def test_operator_precedence_and_associativity(self):
+        program = self.build("program x int a; begin a := 1 - 2 - 3 * -a; end")
+        two, three = Const(0, 0, 0, "INT_CONST", 2), Const(0, 0, 0, "INT_CONST", 3)
+
+        self.assertEqual(program.body[0].value, BinOp(0, 0, 0, "-",
+            BinOp(0, 0, 0, "-", Const(0, 0, 0, "INT_CONST", 1), two),
+            BinOp(0, 0, 0, "*", three, UnaryOp(0, 0, 0, "-", Ref(0, 0, 0, "a")))
+        ))
+
+    def test_parenthesised_expression_and_types(self):
+        program = self.build('program x char c; begin if !(c = "a") | 1 < 2 then fi; end')
+        condition = program.body[0].condition
+
+        self.assertEqual(condition.op, "|")
+        self.assertEqual(condition.left, UnaryOp(0, 0, 0, "!", BinOp(0, 0, 0, "=", Ref(0, 0, 0, "c"), Const(0, 0, 0, "CHAR_CONST", "a"))))
+        self.assertEqual(condition.type, "bool")
+        self.assertEqual(condition.left.operand.left.type, "char")
+        self.assertEqual(condition.right.left.type, "int")
+
+    def test_if_else_and_while_blocks(self):
+        with open(BOAZ_DIR / "all_legal_syntax.boaz") as f:
+            program = self.build(f.read())
+
+        loop = program.body[3]
+        self.assertIsInstance(loop, While)
+        self.assertIsInstance(loop.body[0], If)
+        self.assertEqual(len(loop.body[0].body), 2)
+        self.assertEqual(len(loop.body[0].orelse), 2)
+        self.assertIsInstance(program.body[-1], Print)
+
+    def test_spans_map_back_to_source(self):
+        code = "program x int a; begin while a < 3 do a := a + 1; od; print a; end"
+        program = self.build(code)
+        loop, assign = program.body[0], program.body[0].body[0]
+
+        self.assertEqual(code[slice(*loop.source_span(self.tokenizer.TOKENS))], "while a < 3 do a := a + 1; od;")
+        self.assertEqual(code[slice(*assign.value.source_span(self.tokenizer.TOKENS))], "a + 1")
+
+        code = "program x int a, b, c; begin a := (a + b) * -(c); end"
+        value = self.build(code).body[0].value
+        self.assertEqual(code[slice(*value.source_span(self.tokenizer.TOKENS))], "(a + b) * -(c)")
+        self.assertEqual(code[slice(*value.left.source_span(self.tokenizer.TOKENS))], "(a + b)")
+        self.assertEqual(code[slice(*value.right.operand.source_span(self.tokenizer.TOKENS))], "(c)")
+
+    def test_any_digits_the_lexer_takes(self):
+        program = self.build("program x int a; begin a := \u00b2 + \u0661\u0660; end")
+        self.assertEqual(program.body[0].value, BinOp(0, 0, 0, "+", Const(0, 0, 0, "INT_CONST", 2), Const(0, 0, 0, "INT_CONST", 10)))
+
+    def test_errors_match_validation(self):
+        self.assertRaises(ParserSemanticException, self.build, "program x begin a := 1; end")
+        self.assertRaises(ParserSemanticException, self.build, "program x int a; begin while a do od; end")
+        self.assertRaises(ParserException, self.build, "program x int a; begin a := 1 + ; end")
+
+if __name__ == "__main__":
+    unittest.main()
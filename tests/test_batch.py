@@ -0,0 +1,38 @@
+import sys
+sys.path.append("..")
+
+import batch
+from pathlib import Path
+import unittest
+
+BOAZ_DIR = Path(__file__).parent
+BOAZ_DIR = BOAZ_DIR.parent / "boazfiles"
+
+class TestBatch(unittest.TestCase):
+
+    def test_collect_files_from_directory_and_glob(self):
+        from_dir = batch.collect_files([str(BOAZ_DIR)])
+        from_glob = batch.collect_files([str(BOAZ_DIR / "*.boaz"), str(BOAZ_DIR / "simple.boaz")])
+
+        self.assertEqual(from_dir, from_glob)
+        self.assertEqual(len(from_dir), 6)
+        self.assertEqual(from_dir, sorted(from_dir))
+
+    def test_pool_results_match_serial_results_in_order(self):
+        paths = batch.collect_files([str(BOAZ_DIR)]) * 3
+
+        serial = list(batch.run_batch(paths, jobs=1))
+        pooled = list(batch.run_batch(paths, jobs=2))
+
+        self.assertEqual(serial, pooled)
+        self.assertEqual([path for path, _, _ in pooled], paths)
+
+    def test_error_kinds(self):
+        results = {Path(path).stem: (verdict, kind) for path, verdict, kind in batch.run_batch(batch.collect_files([str(BOAZ_DIR)]), jobs=1)}
+
+        self.assertEqual(results["simple"], ("ok", ""))
+        self.assertEqual(results["untokenizable"], ("error", "TokenizeException"))
+        self.assertEqual(results["empty"], ("error", "ParserException"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import sys
+sys.path.append("..")
+
+import cache
+from cache import ParseCache
+from validator import BoazValidator
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+import os
+import tempfile
+import time
+import unittest
+
+VALID = "program x int a; begin a := 1; end"
+INVALID = "program x begin a := 1; end"
+
+def put_many(path, worker):
+    store = ParseCache(path)
+    for i in range(50):
+        store.put(ParseCache.key("{} {}".format(worker, i)), True)
+    store.close()
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "cache.db")
+        self.cache = ParseCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        self.dir.cleanup()
+
+    def test_verdicts_are_answered_from_the_cache(self):
+        first = BoazValidator(INVALID, self.cache)
+        self.assertFalse(first.run())
+        self.assertFalse(first.cached)
+
+        second = BoazValidator(INVALID, self.cache)
+        with patch.object(second.parser, "parse") as parse:
+            self.assertFalse(second.run())
+            parse.assert_not_called()
+        self.assertTrue(second.cached)
+        self.assertEqual(second.error_kind, "ParserSemanticException")
+
+    def test_key_depends_on_source_and_version(self):
+        key = ParseCache.key(VALID)
+        self.assertNotEqual(key, ParseCache.key(VALID + " "))
+        with patch.object(cache, "VERSION", "next"):
+            self.assertNotEqual(key, ParseCache.key(VALID))
+
+    def test_tiers_are_cached_apart(self):
+        self.assertTrue(BoazValidator(INVALID, self.cache, tier="syntax").run())
+
+        full = BoazValidator(INVALID, self.cache)
+        self.assertFalse(full.run())
+        self.assertFalse(full.cached)
+        self.assertTrue(BoazValidator(INVALID, self.cache, tier="syntax").run())
+
+    def test_tokens_are_restored_from_the_cache(self):
+        first = BoazValidator(VALID, self.cache, cache_tokens=True)
+        self.assertTrue(first.run())
+
+        second = BoazValidator(VALID, self.cache)
+        self.assertTrue(second.run())
+        self.assertTrue(second.cached)
+        self.assertEqual(list(second.tokenizer.TOKENS), list(first.tokenizer.TOKENS))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.cache.max_bytes = ParseCache.ENTRY_SIZE * 3
+        keys = [ParseCache.key(str(i)) for i in range(4)]
+
+        for key in keys[:3]:
+            self.cache.put(key, True)
+        # a hit only counts as a use once TOUCH_INTERVAL has passed
+        with patch("cache.time.time", return_value=time.time() + ParseCache.TOUCH_INTERVAL + 1):
+            self.cache.get(keys[0])
+        self.cache.put(keys[3], True)
+
+        self.assertEqual(len(self.cache), 3)
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[0]))
+
+    def test_running_total(self):
+        self.cache.max_bytes = ParseCache.ENTRY_SIZE * 10
+        for i in range(20):
+            self.cache.put(ParseCache.key(str(i % 15)), True, tokens=b"x" * i)
+
+        total = self.cache.db.execute("SELECT total FROM meta").fetchone()[0]
+        self.assertEqual(total, self.cache.db.execute("SELECT SUM(size) FROM results").fetchone()[0])
+        self.assertLessEqual(total, self.cache.max_bytes)
+
+    def test_recent_hits_are_not_written(self):
+        key = ParseCache.key(VALID)
+        self.cache.put(key, True)
+        with patch.object(self.cache, "db", wraps=self.cache.db) as db:
+            self.cache.get(key)
+        self.assertEqual(len(db.execute.call_args_list), 1)
+
+    def test_concurrent_writers(self):
+        with ProcessPoolExecutor(max_workers=3) as pool:
+            list(pool.map(put_many, [self.path] * 3, range(3)))
+
+        self.assertEqual(len(self.cache), 150)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import sys
+sys.path.append("..")
+
+import asyncio
+import daemon
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+VALID = "program p int x; begin x := 1 + 2; print x; end;"
+SEMANTIC_ERROR = "program p begin y := 1; end;"
+SYNTAX_ERROR = "program p begin print ; end;"
+
+class TestDaemon(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tempdir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tempdir.name, "boaz.sock")
+        cls.loop = asyncio.new_event_loop()
+        cls.server = daemon.ValidationServer(cls.path, jobs=2)
+        cls.loop.run_until_complete(cls.server.start())
+        cls.thread = threading.Thread(target=cls.loop.run_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run_coroutine_threadsafe(cls.server.stop(), cls.loop).result()
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+        cls.loop.close()
+        cls.tempdir.cleanup()
+
+    def test_verdicts(self):
+        ok, semantic, syntax = daemon.request(self.path, [VALID, SEMANTIC_ERROR, SYNTAX_ERROR])
+
+        self.assertEqual(ok, {"verdict": "ok"})
+        self.assertEqual(semantic["verdict"], "error")
+        self.assertEqual(semantic["error"], "ParserSemanticException")
+        self.assertIn("y", semantic["message"])
+        self.assertEqual(syntax["error"], "ParserException")
+
+    def test_pipelined_responses_keep_request_order(self):
+        big = "program p int x; begin " + "x := 1 + 2 * x; " * 20000 + "print x; end;"
+        sources = [big, SYNTAX_ERROR, VALID] * 3
+
+        verdicts = [response["verdict"] for response in daemon.request(self.path, sources)]
+
+        self.assertEqual(verdicts, ["ok", "error", "ok"] * 3)
+
+    def test_bad_request(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(self.path)
+            client.sendall(daemon.HEADER.pack(3) + b"[1]")
+            stream = client.makefile("rb")
+            size, = daemon.HEADER.unpack(stream.read(daemon.HEADER.size))
+            response = daemon.json.loads(stream.read(size))
+
+        self.assertEqual(response["error"], "BadRequest")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import sys
+sys.path.append("..")
+
+from benchmarks.generator import generate
+from validator import BoazValidator
+import unittest
+
+class TestGenerator(unittest.TestCase):
+
+    def test_same_seed_same_program(self):
+        self.assertEqual(generate(7, statements=50), generate(7, statements=50))
+        self.assertNotEqual(generate(7, statements=50), generate(8, statements=50))
+
+    def test_generated_programs_are_valid(self):
+        for seed in range(20):
+            code = generate(seed, statements=200, variables=6, expression_length=5, depth=5, char_ratio=0.5)
+            validator = BoazValidator(code)
+            self.assertTrue(validator.run(), (seed, validator.error))
+
+    def test_generated_errors_have_their_kind(self):
+        kinds = {
+            "lexical": "TokenizeException",
+            "syntax": "ParserException",
+            "semantic": "ParserSemanticException",
+        }
+        for error, kind in kinds.items():
+            for seed in range(10):
+                validator = BoazValidator(generate(seed, statements=50, error=error))
+                self.assertFalse(validator.run())
+                self.assertEqual(validator.error_kind, kind)
+
+if __name__ == "__main__":
+    unittest.main()
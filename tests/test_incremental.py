@@ -0,0 +1,105 @@
+import sys
+sys.path.append("..")
+
+from array import array
+from incremental import IncrementalValidator, shifted
+from tokenizer import Tokenizer
+from validator import BoazValidator
+import unittest
+
+STATEMENTS = "a := a + 1; if a < 3 then print c; fi; while a > 0 do a := a - 1; od; c := \"x\"; "
+CODE = "program p int a; char c; begin " + STATEMENTS * 50 + "end"
+
+def verdict(validator):
+    return (validator.error_kind, str(validator.error), validator.error_offset())
+
+class TestIncremental(unittest.TestCase):
+
+    def assertMatchesFullValidation(self, incremental):
+        validator = BoazValidator(incremental.code)
+        self.assertEqual(incremental.ok, validator.run())
+        self.assertEqual(verdict(incremental), verdict(validator))
+
+        tokenizer = Tokenizer(incremental.code)
+        tokenizer.tokenize_all()
+        self.assertEqual(list(incremental.tokens), list(tokenizer.TOKENS))
+        self.assertEqual(list(incremental.tokens.starts), list(tokenizer.TOKENS.starts))
+
+    def test_typing_a_statement(self):
+        incremental = IncrementalValidator(CODE)
+        offset = CODE.index("od;", len(CODE) // 2) + 3
+
+        for char in " a := (a * 2) - a / 3;":
+            incremental.edit(offset, 0, char)
+            offset += 1
+            self.assertMatchesFullValidation(incremental)
+            self.assertLessEqual(incremental.reparsed, 3)
+            self.assertLessEqual(incremental.relexed, 4)
+
+        self.assertTrue(incremental.ok)
+
+    def test_typing_a_block(self):
+        incremental = IncrementalValidator(CODE)
+        offset = CODE.index("od;", len(CODE) // 2) + 3
+
+        # until it's closed the rest of the program is inside the block
+        for char in " if (a = 1) & (c != \"y\") then a := 2; fi;":
+            incremental.edit(offset, 0, char)
+            offset += 1
+            self.assertMatchesFullValidation(incremental)
+
+        # closing it parses the if, its statement and the one after again
+        self.assertTrue(incremental.ok)
+        self.assertLessEqual(incremental.reparsed, 4)
+
+    def test_deleting_and_replacing(self):
+        incremental = IncrementalValidator(CODE)
+        offset = CODE.index("a + 1", len(CODE) // 2)
+
+        self.assertFalse(incremental.edit(offset + 4, 1, "\"q\""))
+        self.assertEqual(incremental.error_kind, "ParserSemanticException")
+        self.assertMatchesFullValidation(incremental)
+
+        self.assertTrue(incremental.edit(offset + 4, 3, "7"))
+        self.assertTrue(incremental.edit(offset - 5, 11, ""))
+        self.assertMatchesFullValidation(incremental)
+
+    def test_fixing_a_bad_lexeme_reuses_the_earlier_parse(self):
+        incremental = IncrementalValidator(CODE)
+        offset = CODE.index("c := ", len(CODE) // 2) + 7
+
+        self.assertFalse(incremental.edit(offset, 1, ""))
+        self.assertEqual(incremental.error_kind, "TokenizeException")
+        self.assertMatchesFullValidation(incremental)
+
+        self.assertTrue(incremental.edit(offset, 0, "\""))
+        self.assertLessEqual(incremental.reparsed, 3)
+
+    def test_declarations_are_parsed_again(self):
+        incremental = IncrementalValidator(CODE)
+
+        self.assertFalse(incremental.edit(CODE.index("char c;"), 7, ""))
+        self.assertEqual(str(incremental.error), "Identifier: c, has not been declared")
+        self.assertMatchesFullValidation(incremental)
+
+        self.assertTrue(incremental.edit(CODE.index("char c;"), 0, "char c;"))
+        self.assertMatchesFullValidation(incremental)
+
+    def test_error_positions(self):
+        incremental = IncrementalValidator("program p int a;\nbegin\n  a := 1;\nend")
+        incremental.edit(incremental.code.index("1"), 1, "\"z\"")
+        self.assertEqual(incremental.error_position(), (3, 11))
+
+    def test_edits_out_of_range(self):
+        incremental = IncrementalValidator(CODE)
+        self.assertRaises(ValueError, incremental.edit, len(CODE), 1, "")
+        self.assertRaises(ValueError, incremental.edit, -1, 0, "a")
+
+    def test_shifted(self):
+        offsets = array("I", [0, 5, 9, 2**31])
+        self.assertEqual(list(shifted(offsets, 3)), [3, 8, 12, 2**31 + 3])
+        self.assertEqual(list(shifted(offsets[1:], -5)), [0, 4, 2**31 - 5])
+        self.assertEqual(list(shifted(offsets, 0)), list(offsets))
+
+if __name__ == "__main__":
+    unittest.main()
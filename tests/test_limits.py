@@ -0,0 +1,143 @@
+import sys
+sys.path.append("..")
+
+from cache import ParseCache
+from exceptions import ResourceLimitException
+from limits import Limits
+from myparser import Parser
+from tokenizer import Tokenizer
+from validator import BoazValidator
+from unittest.mock import patch
+import io
+import os
+import tempfile
+import unittest
+
+VALID = "program x int a; begin while a < 10 do if a = 5 then a := (a + 1) * 2; fi; od; end"
+
+def nested(depth):
+    return "program x int a; begin " + "if a = 1 then " * depth + "a := 1; " + "fi; " * depth + "end"
+
+def long_expression(terms):
+    return "program x int a; begin a := " + " + ".join(["a"] * terms) + "; end"
+
+def run(source, **limits):
+    validator = BoazValidator(source, limits=Limits(**limits))
+    ok = validator.run()
+    return ok, validator.error
+
+class TestLimits(unittest.TestCase):
+
+    def assertOverLimit(self, source, limit, **limits):
+        ok, error = run(source, **limits)
+        self.assertFalse(ok)
+        self.assertIsInstance(error, ResourceLimitException)
+        self.assertEqual(error.limit, limit)
+
+    def test_within_limits(self):
+        self.assertEqual(run(VALID, source_size=len(VALID), tokens=40, depth=2, expression_length=8, seconds=10), (True, None))
+
+    def test_source_size(self):
+        self.assertOverLimit(VALID, "source_size", source_size=len(VALID) - 1)
+
+    def test_tokens(self):
+        ok, error = run(VALID, tokens=10)
+        self.assertEqual(error.limit, "tokens")
+        self.assertEqual(error.offset, VALID.index("do"))
+
+    def test_depth(self):
+        self.assertTrue(run(nested(50), depth=50)[0])
+        self.assertOverLimit(nested(51), "depth", depth=50)
+        self.assertOverLimit("program x int a; begin a := " + "(" * 20 + "1" + ")" * 20 + "; end", "depth", depth=10)
+
+    def test_expression_length(self):
+        # n terms take 2n - 1 tokens
+        self.assertTrue(run(long_expression(50), expression_length=99)[0])
+        self.assertOverLimit(long_expression(51), "expression_length", expression_length=100)
+        self.assertOverLimit("program x int a; begin a := " + "- " * 200 + "1; end", "expression_length", expression_length=100)
+
+    def test_expression_length_inside_a_unary_run(self):
+        # stopped as soon as the run goes over, not when its operand is read
+        validator = BoazValidator("program x int a; begin a := " + "- " * 5000 + "1; end", limits=Limits(expression_length=100))
+        self.assertFalse(validator.run())
+        self.assertEqual(validator.error.limit, "expression_length")
+        # 8 tokens up to ":=", then one past the limit
+        self.assertEqual(validator.tokenizer.CURRENT_TOKEN, 8 + 101)
+
+    def test_building_an_ast_is_limited_too(self):
+        def build(source, **limits):
+            tokenizer = Tokenizer(source)
+            tokenizer.tokenize()
+            parser = Parser(tokenizer)
+            parser.LIMITS = Limits(**limits)
+            parser.DEADLINE = parser.LIMITS.deadline()
+            return parser.parse(build_ast=True)
+
+        self.assertIsNotNone(build(nested(5), depth=5, expression_length=3, seconds=10))
+        for source, limit, limits in (
+            (nested(6), "depth", {"depth": 5}),
+            ("program x int a; begin a := " + "(" * 6 + "1" + ")" * 6 + "; end", "depth", {"depth": 5}),
+            (long_expression(51), "expression_length", {"expression_length": 100}),
+            ("program x int a; begin a := " + "- " * 200 + "1; end", "expression_length", {"expression_length": 100}),
+        ):
+            with self.assertRaises(ResourceLimitException) as raised:
+                build(source, **limits)
+            self.assertEqual(raised.exception.limit, limit)
+
+        with patch("time.monotonic", side_effect=[0, 100]):
+            self.assertRaises(ResourceLimitException, build, VALID, seconds=1)
+
+    def test_time(self):
+        # the clock has run out by the time statements are parsed
+        with patch("limits.time.monotonic", side_effect=[0, 0, 100]):
+            self.assertOverLimit(VALID, "seconds", seconds=1)
+
+    def test_time_inside_a_statement(self):
+        # the clock only runs out after the checks a short program needs,
+        # so it's up to the checks inside one long statement or while lexing
+        def assertChecked(source, tier="full"):
+            short = "program x int a; begin a := a + a; end"
+            with patch("time.monotonic", return_value=0) as clock:
+                self.assertTrue(BoazValidator(short, limits=Limits(seconds=1), tier=tier).run())
+            ticks = [0] * clock.call_count
+            with patch("time.monotonic", side_effect=lambda: ticks.pop() if ticks else 100):
+                validator = BoazValidator(source, limits=Limits(seconds=1), tier=tier)
+                self.assertFalse(validator.run())
+            self.assertEqual(validator.error.limit, "seconds")
+
+        assertChecked(long_expression(2000))
+        assertChecked("program x int a; begin a := " + "- " * 3000 + "a; end")
+        assertChecked(long_expression(20000), tier="lex")
+
+    def test_streamed_sources(self):
+        validator = BoazValidator(io.StringIO(nested(60)), limits=Limits(depth=50))
+        self.assertFalse(validator.run())
+        self.assertEqual(validator.error.limit, "depth")
+
+        for limits in (Limits(source_size=20), Limits(tokens=10)):
+            validator = BoazValidator(io.StringIO(VALID), limits=limits)
+            self.assertFalse(validator.run())
+            self.assertIsInstance(validator.error, ResourceLimitException)
+
+    def test_recovering_stops_at_a_limit(self):
+        source = "program x int a; begin a := ; " + "if a = 1 then " * 5 + "end"
+        validator = BoazValidator(source, recover=True, limits=Limits(depth=3))
+        self.assertFalse(validator.run())
+        self.assertEqual([type(e).__name__ for e in validator.errors], ["ParserException", "ResourceLimitException"])
+
+    def test_limit_errors_are_not_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ParseCache(os.path.join(directory, "cache.db"))
+            self.assertFalse(BoazValidator(nested(5), cache, limits=Limits(depth=2)).run())
+            self.assertEqual(len(cache), 0)
+            self.assertTrue(BoazValidator(nested(5), cache).run())
+            cache.close()
+
+    def test_table_engine_sessions_are_limited_too(self):
+        validator = BoazValidator(nested(5), limits=Limits(depth=2))
+        validator.parser.ENGINE = "table"
+        self.assertFalse(validator.run())
+        self.assertEqual(validator.error_kind, "ResourceLimitException")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import sys
+sys.path.append("..")
+
+import main
+import tokenfile
+from unittest.mock import patch
+import io
+import json
+import os
+import tempfile
+import unittest
+
+VALID = "program x int a; begin a := 1; end"
+NON_ASCII = "program x int xé; begin xé := 1; end"
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, source, name="x.boaz"):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(source)
+        # main.py only takes paths relative to the working directory
+        return os.path.relpath(path)
+
+    def run_main(self, argv):
+        '''
+        (stdout, stderr) of main.main(argv)
+        '''
+        with patch("sys.stdout", new_callable=io.StringIO) as out, patch("sys.stderr", new_callable=io.StringIO) as err:
+            main.main(argv)
+        return out.getvalue(), err.getvalue()
+
+    def test_stats(self):
+        path = self.write(VALID)
+
+        out, err = self.run_main(["--stats", path])
+        self.assertEqual(out, "ok\n")
+        self.assertTrue(err)
+
+        out, err = self.run_main([path, "--stats", "--stats-format", "json"])
+        self.assertEqual(out, "ok\n")
+        self.assertEqual(json.loads(err)["symbol_table_size"], 1)
+
+    def test_save_tokens_with_a_cache(self):
+        path = self.write(VALID)
+        tokens = os.path.join(self.dir.name, "x.bzt")
+        cache = os.path.join(self.dir.name, "cache.db")
+
+        self.run_main([path, "--cache", cache])
+        self.assertEqual(self.run_main([path, "--cache", cache, "--save-tokens", tokens])[0], "ok\n")
+        with tokenfile.load(tokens) as saved:
+            self.assertEqual(len(saved.tokens), 11)
+            self.assertTrue(saved.result.ok)
+
+    def test_diagnostics_flags_keep_the_verdict_of_non_ascii_files(self):
+        path = self.write(NON_ASCII)
+        for flags in ([], ["--stats"], ["--all-errors"], ["--save-tokens", os.path.join(self.dir.name, "x.bzt")]):
+            self.assertEqual(self.run_main([path] + flags)[0], "ok\n", flags)
+
+        path = self.write(NON_ASCII.replace("begin xé", "begin yé"))
+        out, err = self.run_main([path, "--all-errors"])
+        self.assertEqual(out, "error\n")
+        # columns count characters, not bytes
+        self.assertIn("x.boaz:1:25: Identifier: yé, has not been declared", err)
+
+if __name__ == "__main__":
+    unittest.main()
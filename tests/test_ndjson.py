@@ -0,0 +1,67 @@
+import sys
+sys.path.append("..")
+
+import main
+import ndjson
+from limits import Limits
+from unittest.mock import patch
+import io
+import json
+import unittest
+
+VALID = "program p int x; begin x := 1 + 2; print x; end"
+SEMANTIC_ERROR = "program p begin y := 1; end"
+SYNTAX_ERROR = "program p begin print ; end"
+
+def records(sources):
+    return [json.dumps({"id": i, "source": source}) + "\n" for i, source in enumerate(sources)]
+
+def run(lines, **kwargs):
+    out = io.StringIO()
+    code = ndjson.run(lines, out, **kwargs)
+    return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+class TestNdjson(unittest.TestCase):
+
+    def test_one_response_per_record(self):
+        code, responses = run(records([VALID, SEMANTIC_ERROR, SYNTAX_ERROR]))
+
+        self.assertEqual(code, 1)
+        self.assertEqual(responses[0], {"verdict": "ok", "id": 0})
+        self.assertEqual((responses[1]["error"], responses[1]["id"]), ("ParserSemanticException", 1))
+        self.assertEqual((responses[2]["line"], responses[2]["column"]), (1, 23))
+        self.assertEqual(run(records([VALID]))[0], 0)
+
+    def test_bad_lines_and_blank_lines(self):
+        lines = ["\n", "not json\n", "[1]\n", '{"id": "x"}\n', '{"source": "program p begin end"}\n']
+        code, responses = run(lines)
+
+        self.assertEqual([response["error"] for response in responses[:3]], ["BadRequest"] * 3)
+        self.assertEqual(responses[2]["id"], "x")
+        self.assertEqual(responses[3], {"verdict": "ok"})
+
+    def test_worker_responses_keep_input_order(self):
+        sources = [VALID, SYNTAX_ERROR, SEMANTIC_ERROR] * 100
+        with patch.object(ndjson, "CHUNK_SIZE", 7), patch.object(ndjson, "PENDING_PER_JOB", 1):
+            code, responses = run(records(sources), jobs=2)
+
+        self.assertEqual(responses, run(records(sources))[1])
+        self.assertEqual([response["id"] for response in responses], list(range(len(sources))))
+
+    def test_limits_and_tiers(self):
+        _, responses = run(records([VALID, SEMANTIC_ERROR]), limits=Limits(tokens=10), tier="syntax")
+        self.assertEqual([response.get("error") for response in responses], ["ResourceLimitException", None])
+
+    def test_main_reads_stdin(self):
+        lines = "".join(records([VALID, SYNTAX_ERROR]))
+        with patch("sys.stdin", io.StringIO(lines)), patch("sys.stdout", new_callable=io.StringIO) as out:
+            self.assertEqual(main.main(["--ndjson", "--jobs", "1"]), 1)
+        self.assertEqual([json.loads(line)["verdict"] for line in out.getvalue().splitlines()], ["ok", "error"])
+
+        for source, verdict in ((VALID, "ok"), (SYNTAX_ERROR, "error"), ("", "error")):
+            with patch("sys.stdin", io.StringIO(source)), patch("sys.stdout", new_callable=io.StringIO) as out, patch("sys.stderr", new_callable=io.StringIO):
+                main.main(["-"])
+            self.assertEqual(out.getvalue(), verdict + "\n")
+
+if __name__ == "__main__":
+    unittest.main()
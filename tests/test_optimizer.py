@@ -0,0 +1,69 @@
+import sys
+sys.path.append("..")
+
+from boazast import BinOp, UnaryOp, Const, Ref
+from constants import BOOL_TYPE
+from myparser import Parser
+from optimizer import Optimizer
+from tokenizer import Tokenizer
+import unittest
+
+def parse(code):
+    '''
+    (AST, symbol table) of code
+    '''
+    tokenizer = Tokenizer(code)
+    tokenizer.tokenize()
+    parser = Parser(tokenizer)
+    return parser.parse(build_ast=True), parser.SYMBOL_TABLE
+
+class TestOptimizer(unittest.TestCase):
+
+    def optimize(self, expression, declarations="int num; char ch;"):
+        program, _ = parse("program p {} begin print {}; end;".format(declarations, expression))
+        flags = program.body[0].value.flags
+        removed = Optimizer.optimize(program)
+
+        value = program.body[0].value
+        self.assertEqual(value.flags, flags)
+        return value, removed
+
+    def test_folds_constants_and_identities(self):
+        # SYN9's expression
+        value, removed = self.optimize("(num + num) * 2 / 4 * 0 * 0 * num - num - num - - - 3")
+
+        num = Ref(0, 0, 0, "num")
+        self.assertEqual(value, BinOp(0, 0, 0, "-", BinOp(0, 0, 0, "-", UnaryOp(0, 0, 0, "-", num), num), Const(0, 0, 0, "INT_CONST", 3)))
+        self.assertEqual(removed, 15)
+        self.assertEqual(self.optimize("1 + 2 * 3 - 4")[0], Const(0, 0, 0, "INT_CONST", 3))
+        self.assertEqual(self.optimize("num + 1 + 2 - 3")[0], Ref(0, 0, 0, "num"))
+        self.assertEqual(self.optimize("num * 1 + 0")[0], Ref(0, 0, 0, "num"))
+
+    def test_collapses_unary_chains(self):
+        # SYN11's expression
+        value, removed = self.optimize("num - - - - - - - - - 10")
+        self.assertEqual(value, BinOp(0, 0, 0, "-", Ref(0, 0, 0, "num"), Const(0, 0, 0, "INT_CONST", 10)))
+        self.assertEqual(removed, 8)
+
+        self.assertEqual(self.optimize("- - num")[0], Ref(0, 0, 0, "num"))
+        self.assertEqual(self.optimize("!!(num < 1)")[0], BinOp(0, 0, 0, "<", Ref(0, 0, 0, "num"), Const(0, 0, 0, "INT_CONST", 1)))
+        # !!num is 0 or 1, num isn't
+        self.assertEqual(type(self.optimize("!!num")[0]), UnaryOp)
+
+    def test_keeps_types_and_runtime_errors(self):
+        self.assertEqual(self.optimize('ch + 1 - 1')[0], Ref(0, 0, 0, "ch"))
+        # a char 0 can't be dropped from an int expression
+        self.assertEqual(type(self.optimize('num + ("a" - "a")')[0]), BinOp)
+
+        value, _ = self.optimize('"a" + 1')
+        self.assertEqual((value.value, value.type), (ord("b"), "char"))
+
+        value, _ = self.optimize("num * 0 & 1")
+        self.assertEqual((value.value, value.flags), (0, BOOL_TYPE))
+
+        # dividing by zero still fails when it's run
+        for expression in ("1 / 0", "num / (num - num) * 0", "(1 / num) * 0"):
+            self.assertNotEqual(type(self.optimize(expression)[0]), Const, expression)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@ import sys
 sys.path.append("..")
 
 import myparser
+import grammar
 from exceptions import ParserException, ParserSemanticException
 
 import unittest
@@ -126,12 +127,34 @@ class MockTokenizer:
     # random semicolon in an expression causes cut off var
     SEM8 = [('KEYWORD', 'program'), ('IDENTIFIER', 'example'), ('KEYWORD', 'int'), ('IDENTIFIER', 'num'), ('SYMBOL', ';'), ('KEYWORD', 'begin'), ('IDENTIFIER', 'num'), ('SYMBOL', ':='), ('SYMBOL', '('), ('IDENTIFIER', 'num'), ('SYMBOL', '+'), ('IDENTIFIER', 'num'), ('SYMBOL', ')'), ('SYMBOL', '*'), ('INT_CONST', '2'), ('SYMBOL', '/'), ('INT_CONST', '4'), ('SYMBOL', '*'), ('INT_CONST', '0'), ('SYMBOL', '*'), ('INT_CONST', '0'), ('SYMBOL', '*'), ('IDENTIFIER', 'num'), ('SYMBOL', '-'), ('IDENTIFIER', 'nu'), ('SYMBOL', ';'), ('IDENTIFIER', 'm'), ('SYMBOL', '-'), ('IDENTIFIER', 'num'), ('SYMBOL', '-'), ('SYMBOL', '-'), ('SYMBOL', '-'), ('INT_CONST', '3'), ('SYMBOL', ';'), ('KEYWORD', 'end')]
 
+    # thousands of statements, long operator chains and deep nesting,
+    # all well past the default recursion limit
+    HEADER = [('KEYWORD', 'program'), ('IDENTIFIER', 'example'), ('KEYWORD', 'int'), ('IDENTIFIER', 'num'), ('SYMBOL', ';'), ('KEYWORD', 'begin')]
+
+    # many assignment statements
+    SYN30 = HEADER + [('IDENTIFIER', 'num'), ('SYMBOL', ':='), ('INT_CONST', '1'), ('SYMBOL', ';')] * 5000 + [('KEYWORD', 'end')]
+
+    # long chains of unary and binary operators
+    SYN31 = HEADER + [('IDENTIFIER', 'num'), ('SYMBOL', ':=')] + [('SYMBOL', '-')] * 5000 + [('IDENTIFIER', 'num')] + [('SYMBOL', '+'), ('INT_CONST', '1')] * 5000 + [('SYMBOL', ';'), ('KEYWORD', 'end')]
+
+    # deeply nested whiles and parenthesised expressions
+    SYN32 = HEADER + [('KEYWORD', 'while'), ('INT_CONST', '1'), ('SYMBOL', '<')] + [('SYMBOL', '(')] * 3000 + [('IDENTIFIER', 'num')] + [('SYMBOL', ')')] * 3000 + [('KEYWORD', 'do')] + ([('KEYWORD', 'while'), ('IDENTIFIER', 'num'), ('SYMBOL', '='), ('INT_CONST', '1'), ('KEYWORD', 'do')] * 3000) + [('KEYWORD', 'od'), ('SYMBOL', ';')] * 3001 + [('KEYWORD', 'end')]
+
+    # deeply nested whiles with one close missing
+    SYN33 = SYN32[:-3] + [('KEYWORD', 'end')]
+
+    # char constants holding operator characters are still of type char
+    SYN34 = [('KEYWORD', 'program'), ('IDENTIFIER', 'example'), ('KEYWORD', 'char'), ('IDENTIFIER', 'ch'), ('SYMBOL', ';'), ('KEYWORD', 'begin'), ('IDENTIFIER', 'ch'), ('SYMBOL', ':='), ('CHAR_CONST', '"="'), ('SYMBOL', ';'), ('IDENTIFIER', 'ch'), ('SYMBOL', ':='), ('CHAR_CONST', '"!"'), ('SYMBOL', '+'), ('CHAR_CONST', '"<"'), ('SYMBOL', ';'), ('KEYWORD', 'end')]
+
+    # ... so they can't be used as a condition
+    SEM9 = [('KEYWORD', 'program'), ('IDENTIFIER', 'example'), ('KEYWORD', 'begin'), ('KEYWORD', 'if'), ('CHAR_CONST', '"<"'), ('KEYWORD', 'then'), ('KEYWORD', 'fi'), ('SYMBOL', ';'), ('KEYWORD', 'end')]
+
     ALL_TOKENS = [
         SEM1, SEM2, SEM3, SEM4, SEM5, SEM6, SEM7, SEM8, SYN1, SYN2, SYN3,
         SYN4, SYN5, SYN6, SYN7, SYN8, SYN9, SYN10, SYN11, SYN12,
         SYN13, SYN14, SYN15, SYN16, SYN17, SYN18, SYN19, SYN20,
         SYN21, SYN22, SYN23, SYN24, SYN25, SYN26, SYN27, SYN28,
-        SYN29
+        SYN29, SYN30, SYN31, SYN32, SYN33, SYN34, SEM9
     ]
 
     @classmethod
@@ -312,4 +335,67 @@ class TestParser(unittest.TestCase):
 
     def test_big_file_no_whitespaces(self):
         MockTokenizer.CURRENT_PARSE_TEST = 36
-        self.parser.parse()
\ No newline at end of file
+        self.parser.parse()
+
+    def test_many_statements(self):
+        MockTokenizer.CURRENT_PARSE_TEST = 37
+        self.parser.parse()
+
+    def test_long_operator_chains(self):
+        MockTokenizer.CURRENT_PARSE_TEST = 38
+        self.parser.parse()
+
+    def test_deep_nesting(self):
+        MockTokenizer.CURRENT_PARSE_TEST = 39
+        self.parser.parse()
+
+    def test_deep_nesting_missing_close(self):
+        MockTokenizer.CURRENT_PARSE_TEST = 40
+        self.assertRaises(ParserException, self.parser.parse)
+
+    def test_operator_char_constants_are_chars(self):
+        MockTokenizer.CURRENT_PARSE_TEST = 41
+        self.parser.parse()
+
+    def test_semantics_operator_char_constant_in_if(self):
+        MockTokenizer.CURRENT_PARSE_TEST = 42
+        self.assertRaises(ParserSemanticException, self.parser.parse)
+
+
+class TestTableParser(TestParser):
+    '''
+    The same cases through the table driven parser
+    '''
+
+    def setUp(self):
+        super().setUp()
+        myparser.Parser.ENGINE = "table"
+
+    def tearDown(self):
+        myparser.Parser.ENGINE = "descent"
+        super().tearDown()
+
+    def test_same_errors_as_descent(self):
+        for test in (7, 8, 17, 21, 40, 42):
+            messages = []
+            for engine in ("descent", "table"):
+                myparser.Parser.ENGINE = engine
+                MockTokenizer.CURRENT_PARSE_TEST = test
+                MockTokenizer.CURRENT_TOKEN = -1
+                with self.assertRaises((ParserException, ParserSemanticException)) as context:
+                    self.parser.parse()
+                messages.append((type(context.exception), str(context.exception)))
+            self.assertEqual(messages[0], messages[1])
+
+class TestGrammar(unittest.TestCase):
+
+    def test_table_is_indexed_by_terminal_codes(self):
+        parser_grammar = myparser.Parser.GRAMMAR
+        row = parser_grammar.table[parser_grammar.codes["Term"] - parser_grammar.NONTERMINAL_BASE]
+        self.assertEqual(len(row), parser_grammar.NONTERMINAL_BASE)
+        self.assertIsNotNone(row[parser_grammar.codes["INT"]])
+        self.assertIsNone(row[parser_grammar.codes[";"]])
+
+    def test_conflicting_rules_are_rejected(self):
+        rules = (("Statement", (("ID", ":=", "INT"), ("ID", "print"))),)
+        self.assertRaises(ValueError, grammar.Grammar, rules)
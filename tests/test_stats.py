@@ -0,0 +1,51 @@
+import sys
+sys.path.append("..")
+
+from stats import Stats
+from validator import BoazValidator
+from pathlib import Path
+import json
+import unittest
+
+BOAZ_DIR = Path(__file__).parent
+BOAZ_DIR = BOAZ_DIR.parent / "boazfiles"
+
+class TestStats(unittest.TestCase):
+
+    def test_counters_for_a_program(self):
+        stats = Stats()
+        code = 'program x int a; char c; begin while a < 1 do if ((a)) = 2 then c := "b"; fi; od; end'
+        self.assertTrue(BoazValidator(code, stats=stats).run())
+        result = stats.as_dict()
+
+        self.assertEqual(result["calls"]["tokenize"], 1)
+        self.assertEqual(result["calls"]["get_next_token"], result["tokens"])
+        self.assertEqual(result["calls"]["parse_expression"], 3)
+        self.assertEqual(result["token_kinds"]["CHAR_CONST"], 1)
+        self.assertEqual(result["max_block_depth"], 2)
+        self.assertEqual(result["max_expression_depth"], 2)
+        self.assertEqual(result["symbol_table_size"], 2)
+        self.assertEqual(set(result["phases"]), {"tokenize", "parse"})
+
+    def test_streamed_tokens_are_counted(self):
+        stats = Stats()
+        with open(BOAZ_DIR / "simple.boaz") as f:
+            self.assertTrue(BoazValidator(f, stats=stats).run())
+
+        self.assertEqual(stats.as_dict()["tokens"], 4)
+        self.assertEqual(stats.as_dict()["token_kinds"]["KEYWORD"], 3)
+
+    def test_sessions_without_stats_are_not_wrapped(self):
+        validator = BoazValidator("program x begin end")
+        self.assertNotIn("get_next_token", vars(validator.tokenizer))
+        self.assertNotIn("parse_expression", vars(validator.parser))
+
+    def test_formats(self):
+        stats = Stats()
+        BoazValidator("program x begin end", stats=stats).run()
+
+        self.assertEqual(json.loads(stats.format("json"))["tokens"], 4)
+        self.assertIn("get_next_token", stats.format("text"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import sys
+sys.path.append("..")
+
+import symbolindex
+from symbolindex import SymbolIndex, scan_source
+from unittest.mock import patch
+import io
+import os
+import tempfile
+import unittest
+
+COUNTER = "program counter int count, i; char c;\nbegin\n  count := 0;\n  while i < 10 do count := count + i; od;\n  c := \"x\";\nend"
+CHARS = "program chars char count;\nbegin count := \"a\"; print count; end"
+BROKEN = "program broken int x;\nbegin x := 1a; y := x; end"
+
+class TestSymbolIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.index = SymbolIndex(os.path.join(self.dir.name, "index.db"))
+        self.paths = [self.write("counter.boaz", COUNTER), self.write("chars.boaz", CHARS), self.write("broken.boaz", BROKEN)]
+
+    def tearDown(self):
+        self.index.close()
+        self.dir.cleanup()
+
+    def write(self, name, source, mtime=None):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(source)
+        if (mtime is not None):
+            os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def test_scan_source(self):
+        program, ok, error, declarations, references = scan_source(COUNTER.encode())
+
+        self.assertEqual((program, ok, error), ("counter", True, None))
+        self.assertEqual([d[:2] for d in declarations], [("count", "int"), ("i", "int"), ("c", "char")])
+        self.assertEqual(declarations[0][2:], (COUNTER.index("count,"), 1, 21))
+        self.assertEqual([r[:2] for r in references if r[0] == "count"], [("count", "assign"), ("count", "assign"), ("count", "use")])
+        self.assertEqual(references[0][3:], (3, 3))
+
+    def test_files_with_errors_are_indexed(self):
+        program, ok, error, declarations, references = scan_source(BROKEN.encode())
+
+        self.assertEqual((program, ok, error), ("broken", False, "TokenizeException"))
+        self.assertEqual([d[0] for d in declarations], ["x"])
+        self.assertEqual([r[:2] for r in references], [("x", "assign"), ("y", "assign"), ("x", "use")])
+
+    def test_queries(self):
+        self.assertEqual(self.index.update(self.paths, jobs=1), (3, 0, 0))
+
+        self.assertEqual([row[1:3] for row in self.index.declared("count")], [("chars", "char"), ("counter", "int")])
+        self.assertEqual(self.index.declared("count", "char"), [(self.paths[1], "chars", "char", 1, 20)])
+        self.assertEqual([row[0] for row in self.index.references("y", "assign")], [self.paths[2]])
+        self.assertEqual(len(self.index.references("count", "use")), 2)
+        self.assertEqual(self.index.declared("nothing"), [])
+
+    def test_updates_only_changed_files(self):
+        self.index.update(self.paths, jobs=1)
+        self.assertEqual(self.index.update(self.paths, jobs=1), (0, 3, 0))
+
+        # a new mtime with the same contents is only read and hashed
+        self.write("chars.boaz", CHARS, mtime=10**18)
+        with patch.object(symbolindex, "scan_source") as scan:
+            self.assertEqual(self.index.update(self.paths, jobs=1), (0, 3, 0))
+            scan.assert_not_called()
+
+        self.write("chars.boaz", CHARS.replace("char count", "int count"))
+        self.assertEqual(self.index.update(self.paths, jobs=1), (1, 2, 0))
+        self.assertEqual([row[2] for row in self.index.declared("count")], ["int", "int"])
+
+        os.remove(self.paths[2])
+        self.assertEqual(self.index.update(self.paths[:2], jobs=1), (0, 2, 1))
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.references("y"), [])
+
+    def test_non_ascii_files_are_decoded(self):
+        path = self.write("accents.boaz", "program caf\u00e9 int x\u00e9;\nbegin x\u00e9 := 1; end")
+        self.index.update([path], jobs=1)
+
+        self.assertEqual(self.index.declared("x\u00e9"), [(path, "caf\u00e9", "int", 1, 18)])
+        self.assertEqual(self.index.references("x\u00e9", "assign"), [(path, "assign", 2, 7)])
+
+    def test_worker_processes(self):
+        self.assertEqual(self.index.update(self.paths, jobs=2), (3, 0, 0))
+        self.assertEqual(len(self.index.references("count")), 5)
+
+    def test_main(self):
+        out = io.StringIO()
+        with patch("sys.stderr", new_callable=io.StringIO):
+            symbolindex.main(self.index.path, [self.dir.name], jobs=1, declared="count", var_type="int", assigned="y", out=out)
+
+        self.assertEqual(out.getvalue().splitlines(), [
+            "{}\tcounter\tint\t1\t21".format(self.paths[0]),
+            "{}\tassign\t2\t16".format(self.paths[2]),
+        ])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import sys
+sys.path.append("..")
+
+import tokenfile
+from constants import VERSION
+from myparser import Parser
+from tokenfile import ParseResult
+from validator import BoazValidator
+import os
+import tempfile
+import unittest
+
+VALID = "program x int a; char c; begin while a < 10 do a := (a + 1) * 2; od; c := \"z\"; end"
+INVALID = "program x int a; begin a := \"z\"; end"
+
+def validated(source):
+    validator = BoazValidator(source)
+    ok = validator.run()
+    return validator, ParseResult.from_validator(validator, ok)
+
+class TestTokenFile(unittest.TestCase):
+
+    def test_tokens_and_result_round_trip(self):
+        validator, result = validated(VALID)
+        loaded = tokenfile.loads(tokenfile.dumps(validator.tokenizer.TOKENS, result))
+
+        self.assertEqual(list(loaded.tokens), list(validator.tokenizer.TOKENS))
+        self.assertEqual(list(loaded.tokens.starts), list(validator.tokenizer.TOKENS.starts))
+        self.assertEqual(loaded.tokens.source_length(), len(VALID))
+        self.assertEqual(loaded.result, result)
+        self.assertEqual(loaded.result.symbol_table, {"a": "int", "c": "char"})
+        self.assertEqual(loaded.result.max_block_depth, 1)
+
+    def test_error_results_keep_their_offset(self):
+        validator, result = validated(INVALID)
+        loaded = tokenfile.loads(tokenfile.dumps(validator.tokenizer.TOKENS, result))
+
+        self.assertFalse(loaded.result.ok)
+        self.assertEqual(loaded.result.error_kind, "ParserSemanticException")
+        self.assertEqual(loaded.result.message, str(validator.error))
+        self.assertEqual(loaded.result.offset, INVALID.index(";", INVALID.index(":=")))
+
+    def test_strings_are_stored_once(self):
+        validator, _ = validated(VALID)
+        loaded = tokenfile.loads(tokenfile.dumps(validator.tokenizer.TOKENS))
+
+        self.assertIsNone(loaded.result)
+        # every distinct value once, plus the VERSION at index 0
+        values = set(value for _, value in validator.tokenizer.TOKENS)
+        self.assertEqual(len(loaded.tokens.strings), len(values | {VERSION}))
+        self.assertEqual(loaded.tokens.strings[0], VERSION)
+
+    def test_bytes_sources_give_the_same_file(self):
+        text, _ = validated(VALID)
+        data, _ = validated(VALID.encode())
+        self.assertEqual(tokenfile.dumps(text.tokenizer.TOKENS), tokenfile.dumps(data.tokenizer.TOKENS))
+
+    def test_token_lists_without_offsets(self):
+        tokens = [("KEYWORD", "program"), ("IDENTIFIER", "x"), ("KEYWORD", "begin"), ("KEYWORD", "end")]
+        loaded = tokenfile.loads(tokenfile.dumps(tokens))
+        self.assertEqual(list(loaded.tokens), tokens)
+        self.assertIsNone(loaded.tokens.starts)
+
+    def test_parse_from_a_mapped_file(self):
+        validator, result = validated(VALID)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "x.bzt")
+            tokenfile.write(path, validator.tokenizer.TOKENS, result)
+
+            with tokenfile.load(path) as loaded:
+                parser = Parser(loaded.tokenizer())
+                parser.parse()
+                self.assertEqual(parser.SYMBOL_TABLE, result.symbol_table)
+
+    def test_parse_errors_are_found_at_the_same_offset(self):
+        validator, result = validated(INVALID)
+        loaded = tokenfile.loads(tokenfile.dumps(validator.tokenizer.TOKENS))
+
+        tokenizer = loaded.tokenizer()
+        with self.assertRaises(Exception) as context:
+            Parser(tokenizer).parse()
+        self.assertEqual(tokenizer.error_offset(context.exception), result.offset)
+
+    def test_bad_files_are_rejected(self):
+        data = tokenfile.dumps([("KEYWORD", "program")])
+
+        self.assertRaises(ValueError, tokenfile.loads, b"not a token file at all, no not one bit")
+        self.assertRaises(ValueError, tokenfile.loads, data[:tokenfile.HEADER.size + 3])
+
+        newer = bytearray(data)
+        newer[4:6] = (tokenfile.FORMAT_VERSION + 1).to_bytes(2, "little")
+        self.assertRaises(ValueError, tokenfile.loads, bytes(newer))
+
+        # header counts that don't match the rest of the file
+        for string_count in (0, 3, 2**32 - 1):
+            corrupt = bytearray(data)
+            corrupt[8:12] = string_count.to_bytes(4, "little")
+            self.assertRaises(ValueError, tokenfile.loads, bytes(corrupt))
+        corrupt = bytearray(data)
+        corrupt[20:28] = (int.from_bytes(data[20:28], "little") - 1).to_bytes(8, "little")
+        self.assertRaises(ValueError, tokenfile.loads, bytes(corrupt))
+
+if __name__ == "__main__":
+    unittest.main()
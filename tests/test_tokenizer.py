@@ -2,7 +2,9 @@ import sys
 sys.path.append("..")
 
 from tokenizer import Tokenizer
-from exceptions import TokenizeException
+from exceptions import ParserException, TokenizeException
+from tokenstore import TokenStore, BytesTokenStore
+import mmap
 from pathlib import Path
 import unittest
 
@@ -15,11 +17,26 @@ class TestTokenizer(unittest.TestCase):
         with open(BOAZ_DIR / (filename+".boaz")) as f:
             self.tokenizer.CODE = f.read()
 
+    def tokenize_with_engine(self, engine, code):
+        self.tokenizer.ENGINE = engine
+        self.tokenizer.CODE = code
+        self.tokenizer.TOKENS = []
+        try:
+            self.tokenizer.tokenize()
+        except TokenizeException as e:
+            return (list(self.tokenizer.TOKENS), e.token)
+        return (list(self.tokenizer.TOKENS), None)
+
     def setUp(self):
         self.tokenizer = Tokenizer
         self.tokenizer.CODE = None
         self.tokenizer.TOKENS = []
         self.tokenizer.CURRENT_TOKEN = 0
+        self.tokenizer.STREAM = None
+
+    def tearDown(self):
+        self.tokenizer.ENGINE = "regex"
+        self.tokenizer.STREAM = None
 
     def test_error_when_incorrect_int_const(self):
         self.read_boaz_file_and_set_tokenizer_code("incorrect_int_const")
@@ -43,5 +60,109 @@ class TestTokenizer(unittest.TestCase):
         self.tokenizer.tokenize()
         self.assertGreaterEqual(len(self.tokenizer.TOKENS), 1)
 
+    def test_regex_engine_matches_legacy_on_boaz_files(self):
+        for path in sorted(BOAZ_DIR.glob("*.boaz")):
+            with open(path) as f:
+                code = f.read()
+            self.assertEqual(
+                self.tokenize_with_engine("legacy", code),
+                self.tokenize_with_engine("regex", code),
+                path.name
+            )
+
+    def test_regex_engine_matches_legacy_on_edge_cases(self):
+        snippets = [
+            'a:=b<=c>=d!=e', 'x:y ', 'ch:=" "; ', '"ab ', '""" ', 'abc"d ',
+            '12ab ', '_x1,y2;z ', 'a ? b ', 'énorme := 1 ', '\x1ca\x1c',
+            'while(num)do od; ', '1²² ', '½ ',
+        ]
+        for code in snippets:
+            self.assertEqual(
+                self.tokenize_with_engine("legacy", code),
+                self.tokenize_with_engine("regex", code),
+                repr(code)
+            )
+
+    def test_tokens_are_stored_as_source_spans(self):
+        self.tokenizer.CODE = 'program x int n; begin n := "a"; end'
+        self.tokenizer.tokenize()
+        tokens = self.tokenizer.TOKENS
+
+        self.assertIsInstance(tokens, TokenStore)
+        self.assertEqual(tokens.kinds.itemsize, 1)
+        self.assertEqual(tokens.starts[8], 28)
+        self.assertEqual(tokens.value(8), '"a"')
+        self.assertEqual(tokens[8], ("CHAR_CONST", '"a"'))
+        self.assertEqual(tokens[-1], ("KEYWORD", "end"))
+        self.assertEqual(len(list(tokens)), len(tokens))
+
+    def test_streamed_tokens_match_tokenize_across_chunk_sizes(self):
+        self.read_boaz_file_and_set_tokenizer_code("all_legal_syntax")
+        self.tokenizer.tokenize()
+        expected = list(self.tokenizer.TOKENS)
+
+        for size in (1, 2, 3, 7, 64):
+            with open(BOAZ_DIR / "all_legal_syntax.boaz") as f:
+                chunks = self.tokenizer.read_chunks(f, size)
+                self.assertEqual(list(self.tokenizer.generate_tokens(chunks)), expected)
+
+    def test_stream_fails_on_first_bad_token(self):
+        with open(BOAZ_DIR / "untokenizable.boaz") as f:
+            self.tokenizer.stream(f)
+            with self.assertRaises(TokenizeException):
+                while (True):
+                    self.tokenizer.get_next_token()
+        self.assertGreater(self.tokenizer.CURRENT_TOKEN, 0)
+
+    def test_stream_raises_missing_at_eof(self):
+        with open(BOAZ_DIR / "simple.boaz") as f:
+            self.tokenizer.stream(f)
+            for _ in range(4):
+                self.tokenizer.get_next_token()
+            self.assertRaises(ParserException, self.tokenizer.get_next_token)
+
+    def test_parallel_engine_matches_regex(self):
+        tokenizer = Tokenizer()
+        tokenizer.JOBS = 2
+        tokenizer.PARALLEL_CHUNK_SIZE = 8
+
+        sources = [
+            (BOAZ_DIR / "all_legal_syntax.boaz").read_text() * 3,
+            'a ";" b " " c; d := "x" ;"y"; e',
+            # the first bad lexeme is reported, and lone '"' errors read
+            # past the end of their chunk
+            "a b c d e f g h i j k l m n o p q r s t ? u v w x y z ?",
+            'aaaa bbbb cccc dddd eeee " ffff gggg 1a hhhh',
+        ]
+        for code in sources:
+            tokenizer.CODE = code
+            expected = self.tokenize_with_engine("regex", code)
+            self.assertGreater(len(tokenizer.split_points(code, 4)), 3)
+
+            tokenizer.ENGINE = "parallel"
+            try:
+                tokenizer.tokenize()
+                error = None
+            except TokenizeException as e:
+                error = e.token
+            self.assertEqual((list(tokenizer.TOKENS), error), expected, code)
+
+    def test_bytes_tokens_match_str_tokens(self):
+        for path in sorted(BOAZ_DIR.glob("*.boaz")):
+            expected = self.tokenize_with_engine("regex", path.read_text())
+
+            with open(path, "rb") as f:
+                if (path.stat().st_size == 0):
+                    code = f.read()
+                    self.assertEqual(self.tokenize_with_engine("regex", code), expected)
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as code:
+                    self.assertEqual(self.tokenize_with_engine("regex", code), expected, path.name)
+                    self.assertIsInstance(self.tokenizer.TOKENS, BytesTokenStore)
+
+        # \s in a str also matches \x1c-\x1f
+        code = 'a\x1cb\x0bc "\x1c" "'
+        self.assertEqual(self.tokenize_with_engine("regex", code.encode()), self.tokenize_with_engine("regex", code))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
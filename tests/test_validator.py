@@ -0,0 +1,178 @@
+import sys
+sys.path.append("..")
+
+from validator import BoazValidator
+from lineindex import LineIndex
+from tokenizer import Tokenizer
+from myparser import Parser
+from exceptions import ParserSemanticException, TokenizeException
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import mmap
+import unittest
+
+BOAZ_DIR = Path(__file__).parent
+BOAZ_DIR = BOAZ_DIR.parent / "boazfiles"
+
+EXPECTED = {
+    "all_legal_syntax": True,
+    "empty": False,
+    "incorrect_char_const": False,
+    "incorrect_int_const": False,
+    "simple": True,
+    "untokenizable": False,
+}
+
+class TestValidator(unittest.TestCase):
+
+    def read_boaz_file(self, filename):
+        with open(BOAZ_DIR / (filename+".boaz")) as f:
+            return f.read()
+
+    def test_verdicts_for_boaz_files(self):
+        for filename, expected in EXPECTED.items():
+            self.assertEqual(BoazValidator(self.read_boaz_file(filename)).run(), expected, filename)
+
+    def test_verdicts_for_streamed_boaz_files(self):
+        for filename, expected in EXPECTED.items():
+            with open(BOAZ_DIR / (filename+".boaz")) as f:
+                self.assertEqual(BoazValidator(f).run(), expected, filename)
+
+    def test_error_is_kept_on_the_session(self):
+        validator = BoazValidator(self.read_boaz_file("untokenizable"))
+        self.assertFalse(validator.run())
+        self.assertIsInstance(validator.error, TokenizeException)
+
+    def test_error_positions(self):
+        sources = {
+            "program p\nint x;\nbegin\n  x := 1 + :y;\nend;": (4, 12),
+            "program p\nint x;\nbegin\n  x := 1 +;\nend;": (4, 11),
+            "program p\nint x;\nbegin\n  x := 1 + y;\nend;": (4, 12),
+            "program p\nint x;\nbegin\n  x := 1": (4, 9),
+        }
+        for source, position in sources.items():
+            validator = BoazValidator(source)
+            self.assertFalse(validator.run())
+            self.assertEqual(validator.error_position(), position, source)
+
+    def test_streamed_error_positions_match(self):
+        for filename, expected in EXPECTED.items():
+            with open(BOAZ_DIR / (filename+".boaz")) as f:
+                streamed = BoazValidator(f)
+                streamed.run()
+                text = BoazValidator(self.read_boaz_file(filename))
+                text.run()
+                self.assertEqual(streamed.error_position(), text.error_position(), filename)
+
+        self.assertEqual(text.error_position(), (8, 11))
+
+    def test_mmap_source(self):
+        with open(BOAZ_DIR / "untokenizable.boaz", "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as code:
+            validator = BoazValidator(code)
+            self.assertFalse(validator.run())
+            self.assertEqual(validator.error_position(), (8, 11))
+
+        self.assertTrue(BoazValidator(self.read_boaz_file("all_legal_syntax").encode()).run())
+
+    def test_line_index(self):
+        index = LineIndex("ab\n\ncd\n")
+        positions = [index.position(offset) for offset in range(7)]
+
+        self.assertEqual(positions, [(1, 1), (1, 2), (1, 3), (2, 1), (3, 1), (3, 2), (3, 3)])
+
+    def test_recovery_reports_every_error(self):
+        source = (
+            "program p int x; char c; begin\n"
+            "x := c;\n"
+            "z := 1;\n"
+            "if x then print 1 +; fi;\n"
+            "while x < 1 do c := \"a\" & ; od;\n"
+            "c := 5; print z; end;"
+        )
+        validator = BoazValidator(source, recover=True)
+
+        self.assertFalse(validator.run())
+        self.assertEqual([(type(e).__name__, validator.error_position(e)[0]) for e in validator.errors], [
+            ("ParserSemanticException", 2),
+            ("ParserSemanticException", 3),
+            ("ParserSemanticException", 4),
+            ("ParserException", 4),
+            ("ParserException", 5),
+            ("ParserSemanticException", 6),
+        ])
+
+        # the first one is what stops the default mode
+        validator = BoazValidator(source)
+        self.assertFalse(validator.run())
+        self.assertEqual(validator.errors, [])
+        self.assertEqual(str(validator.error), "Wrong type assignment to identifier of type: int")
+
+    def test_recovery_skips_bad_lexemes_and_declarations(self):
+        source = "program p int x 1; int y; begin y := 1a; x := y; end;"
+        validator = BoazValidator(source, recover=True)
+
+        self.assertFalse(validator.run())
+        self.assertEqual([(type(e).__name__, e.offset) for e in validator.errors], [
+            ("ParserException", 16),
+            ("TokenizeException", 37),
+            ("ParserException", 39),
+        ])
+        self.assertTrue(BoazValidator(self.read_boaz_file("all_legal_syntax"), recover=True).run())
+
+    def test_sessions_dont_share_symbol_tables(self):
+        class_tokens, class_symbols = Tokenizer.TOKENS, Parser.SYMBOL_TABLE
+
+        declared = BoazValidator("program a int num; begin num := 1; end")
+        self.assertTrue(declared.run())
+
+        undeclared = BoazValidator("program b begin num := 1; end")
+        self.assertFalse(undeclared.run())
+        self.assertIsInstance(undeclared.error, ParserSemanticException)
+
+        self.assertEqual(declared.parser.SYMBOL_TABLE, {"num": "int"})
+        self.assertIs(Parser.SYMBOL_TABLE, class_symbols)
+        self.assertIs(Tokenizer.TOKENS, class_tokens)
+
+    def test_tiers(self):
+        # (source, lex, syntax, full)
+        cases = [
+            ("program x int a; begin a := 1; end", True, True, True),
+            ("program x begin a := \"c\"; if 1 then print b; fi; end", True, True, False),
+            ("program x begin then := 1; end", True, False, False),
+            ("program x int a; begin a := 1 + print; end", True, False, False),
+            ("program x int a; begin a := ; end", True, False, False),
+            ("program x int a; begin a := 1a; end", False, False, False),
+        ]
+        for source, *expected in cases:
+            self.assertEqual([BoazValidator(source, tier=tier).run() for tier in BoazValidator.TIERS], expected, source)
+
+        for engine in ("descent", "table"):
+            validator = BoazValidator("program x begin then := 1; end", tier="syntax")
+            validator.parser.ENGINE = engine
+            self.assertFalse(validator.run())
+            self.assertEqual(validator.error_kind, "ParserException")
+
+    def test_tiers_when_streamed_and_recovering(self):
+        with open(BOAZ_DIR / "untokenizable.boaz") as f:
+            self.assertFalse(BoazValidator(f, tier="lex").run())
+
+        validator = BoazValidator("program x begin a := 1; b := ; c := 1z; end", tier="syntax", recover=True)
+        self.assertFalse(validator.run())
+        self.assertEqual([type(e).__name__ for e in validator.errors], ["ParserException", "TokenizeException", "ParserException"])
+
+        validator = BoazValidator("program x begin a := ; c := 1z; end", tier="lex", recover=True)
+        self.assertFalse(validator.run())
+        self.assertEqual([type(e).__name__ for e in validator.errors], ["TokenizeException"])
+
+        self.assertRaises(ValueError, BoazValidator, "program x begin end", tier="semantic")
+
+    def test_concurrent_sessions_in_thread_pool(self):
+        sources = [(name, self.read_boaz_file(name)) for name in EXPECTED] * 50
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda item: BoazValidator(item[1]).run(), sources))
+
+        self.assertEqual(results, [EXPECTED[name] for name, _ in sources])
+
+if __name__ == "__main__":
+    unittest.main()
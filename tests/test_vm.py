@@ -0,0 +1,81 @@
+import sys
+sys.path.append("..")
+
+from benchmarks.vmbench import SCENARIOS, AstInterpreter
+from compiler import Compiler, JUMP, JUMP_IF_TRUE
+from exceptions import BoazRuntimeException
+from myparser import Parser
+from tokenizer import Tokenizer
+from vm import VM
+import io
+import unittest
+
+def parse(code):
+    '''
+    (AST, symbol table) of code
+    '''
+    tokenizer = Tokenizer(code)
+    tokenizer.tokenize()
+    parser = Parser(tokenizer)
+    return parser.parse(build_ast=True), parser.SYMBOL_TABLE
+
+class TestVM(unittest.TestCase):
+
+    def run_program(self, code):
+        program, symbol_table = parse(code)
+        out = io.StringIO()
+        machine = VM(Compiler.compile(program, symbol_table), out)
+        machine.run()
+        return out.getvalue().splitlines(), machine.variables()
+
+    def test_statements_and_semantics(self):
+        output, variables = self.run_program('''program p int i, n; char c; begin
+            i := 0; n := 0; c := "x";
+            while i < 5 do
+                if i / 2 * 2 = i then n := n + i; else n := n - 1; fi;
+                i := i + 1;
+            od;
+            c := c + 300;
+            print n; print c; print -7 / 2; print 7 / -2;
+            print n > 3 & !(c = "a"); print 0 | 0;
+        end;''')
+
+        self.assertEqual(output, ["4", chr((ord("x") + 300) & 0xFF), "-3", "-3", "true", "false"])
+        self.assertEqual(variables, {"i": 5, "n": 4, "c": (ord("x") + 300) & 0xFF})
+
+    def test_while_condition_is_compiled_after_its_body(self):
+        program, symbol_table = parse("program p int i; begin while i < 3 do i := i + 1; od; end;")
+        code = Compiler.compile(program, symbol_table).code
+
+        self.assertEqual(code[0], JUMP)
+        self.assertEqual(code[-3:-1], [JUMP_IF_TRUE, 2])
+
+    def test_division_by_zero(self):
+        with self.assertRaises(BoazRuntimeException):
+            self.run_program("program p int i; begin i := 1 / (i - i); end;")
+
+    def test_long_expressions_and_deep_nesting(self):
+        # as big as the parser tests' SYN31 and SYN32
+        output, variables = self.run_program(
+            "program p int num; begin num := " + "- " * 5000 + "num" + " + 1" * 5000 + "; print num; end;"
+        )
+        self.assertEqual((output, variables), (["5000"], {"num": 5000}))
+
+        nested = (
+            "program p int num; begin while 1 < " + "(" * 3000 + "num" + ")" * 3000 + " do "
+            + "while num = 1 do " * 3000 + "od; " * 3001
+            + "if num = 0 then " * 1000 + "num := 7; else num := 8; " + "fi; " * 1000 + "print num; end;"
+        )
+        self.assertEqual(self.run_program(nested)[0], ["7"])
+
+    def test_matches_ast_interpreter(self):
+        for name, template in SCENARIOS.items():
+            program, symbol_table = parse(template.format(outer=3, inner=30))
+            expected = io.StringIO()
+            AstInterpreter(expected).run(program, symbol_table)
+
+            output, _ = self.run_program(template.format(outer=3, inner=30))
+            self.assertEqual(output, expected.getvalue().splitlines(), name)
+
+if __name__ == "__main__":
+    unittest.main()
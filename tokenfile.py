@@ -0,0 +1,298 @@
+import mmap
+import struct
+from array import array
+from constants import TOKEN_KINDS, VERSION
+from tokenizer import Tokenizer
+from tokenstore import TokenStore
+
+# Token files keep the tokens of a source, and optionally what validating
+# it found, so later stages can start from them without the source text.
+# Every number is little-endian and every section starts 8 byte aligned:
+#
+#     header          HEADER
+#     kinds           token count x uint8, index into TOKEN_KINDS
+#     values          token count x uint32, index into the string table
+#     starts, ends    token count x uint32 or uint64 (the header's
+#                     offset typecode), source offsets of each lexeme,
+#                     only if the header has FLAG_OFFSETS
+#     string offsets  (string count + 1) x uint64 into the string data
+#     string data     utf-8 strings, string 0 is the VERSION they were
+#                     made with
+#     result          RESULT, only if the header has FLAG_RESULT
+#     symbols         symbol count x 2 x uint32, (name, type) string
+#                     indexes of the parser's symbol table
+
+MAGIC = b"BZTK"
+# bump whenever the layout changes
+FORMAT_VERSION = 1
+
+# magic, format version, offset typecode, flags, string count, token
+# count, string data size, source length
+HEADER = struct.Struct("<4sHcBIQQQ")
+FLAG_OFFSETS = 1
+FLAG_RESULT = 2
+
+# ok, error kind, message, max block depth, max expression depth, symbol
+# count (strings as indexes), error offset
+RESULT = struct.Struct("<BxxxIIIIIxxxxQ")
+NO_STRING = 2**32 - 1
+NO_OFFSET = 2**64 - 1
+
+KIND_CODES = {kind: code for code, kind in enumerate(TOKEN_KINDS)}
+
+def align(size):
+    return (size + 7) & ~7
+
+class StringTable(dict):
+    '''
+    Maps each string to its index, new ones are added as they're looked up
+    '''
+
+    def __missing__(self, string):
+        index = self[string] = len(self)
+        return index
+
+    def index(self, string):
+        return NO_STRING if string is None else self[string]
+
+    def dumps(self):
+        data = [string.encode("utf-8", "surrogatepass") for string in self]
+        offsets = array("Q", [0])
+        for string in data:
+            offsets.append(offsets[-1] + len(string))
+        return offsets.tobytes(), b"".join(data)
+
+class ParseResult:
+    '''
+    What validating a source found, error_kind and message are None and
+    offset is None for a valid one. symbol_table maps each declared name
+    to "int" or "char"
+    '''
+
+    def __init__(self, ok, error_kind=None, message=None, offset=None, symbol_table=None, max_block_depth=0, max_expression_depth=0):
+        self.ok = ok
+        self.error_kind = error_kind
+        self.message = message
+        self.offset = offset
+        self.symbol_table = symbol_table or {}
+        self.max_block_depth = max_block_depth
+        self.max_expression_depth = max_expression_depth
+
+    @classmethod
+    def from_validator(cls, validator, ok):
+        '''
+        ok is what validator.run() returned
+        '''
+        parser = validator.parser
+        return cls(
+            ok, validator.error_kind,
+            None if validator.error is None else str(validator.error),
+            validator.error_offset(),
+            dict(parser.SYMBOL_TABLE), parser.MAX_BLOCK_DEPTH, parser.MAX_EXPRESSION_DEPTH
+        )
+
+    def __eq__(self, other):
+        return isinstance(other, ParseResult) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return "ParseResult({})".format(", ".join("{}={!r}".format(*item) for item in vars(self).items()))
+
+class MappedTokenStore(TokenStore):
+    '''
+    The tokens of a token file, kinds, values and offsets are views of
+    its data rather than copies, values are looked up in its string table
+    '''
+
+    def __init__(self, kinds, values, starts, ends, strings, source_length):
+        self.code = None
+        self.kinds = kinds
+        self.values = values
+        self.starts = starts
+        self.ends = ends
+        self.strings = strings
+        self.length = source_length
+
+    def source_length(self):
+        return self.length
+
+    def value(self, index):
+        return self.strings[self.values[index]]
+
+    def iter_values(self):
+        return map(self.strings.__getitem__, self.values)
+
+    def __getitem__(self, index):
+        return (TOKEN_KINDS[self.kinds[index]], self.strings[self.values[index]])
+
+    def __iter__(self):
+        strings = self.strings
+        for kind, value in zip(self.kinds, self.values):
+            yield (TOKEN_KINDS[kind], strings[value])
+
+def dumps(tokens, result=None, source_length=None):
+    '''
+    tokens is a TokenStore, whose offsets are kept, or any sequence of
+    (kind, value) tuples. result is an optional ParseResult
+    '''
+    strings = StringTable()
+    strings[VERSION]
+
+    if (isinstance(tokens, TokenStore) and tokens.starts is not None):
+        kinds = tokens.kinds
+        flags = FLAG_OFFSETS
+        typecode = memoryview(tokens.starts).format
+        if (source_length is None):
+            source_length = tokens.source_length()
+        values = tokens.iter_values()
+    else:
+        kinds = array("B", [KIND_CODES[kind] for kind, _ in tokens])
+        flags = 0
+        typecode = "I"
+        values = (value for _, value in tokens)
+    values = array("I", map(strings.__getitem__, values))
+
+    parts = [kinds.tobytes(), values.tobytes()]
+    if (flags & FLAG_OFFSETS):
+        parts += [tokens.starts.tobytes(), tokens.ends.tobytes()]
+
+    tail = []
+    if (result is not None):
+        flags |= FLAG_RESULT
+        symbols = array("I")
+        for name, var_type in result.symbol_table.items():
+            symbols += array("I", (strings[name], strings[var_type]))
+        tail = [
+            RESULT.pack(
+                result.ok, strings.index(result.error_kind), strings.index(result.message),
+                result.max_block_depth, result.max_expression_depth, len(result.symbol_table),
+                NO_OFFSET if result.offset is None else result.offset
+            ),
+            symbols.tobytes(),
+        ]
+
+    # the string table is complete once every string was looked up
+    parts += strings.dumps()
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, typecode.encode(), flags, len(strings), len(kinds), len(parts[-1]), source_length or 0)
+
+    data = bytearray(header)
+    for part in parts + tail:
+        data += bytes(align(len(data)) - len(data))
+        data += part
+    return bytes(data)
+
+def write(path, tokens, result=None, source_length=None):
+    with open(path, "wb") as f:
+        f.write(dumps(tokens, result, source_length))
+
+def loads(data):
+    '''
+    data is a token file's bytes, or any buffer such as an mmap of one
+    '''
+    return TokenFile(data)
+
+def load(path):
+    '''
+    Maps the token file into memory, close the returned TokenFile (or use
+    it as a context manager) once its tokens are no longer used
+    '''
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return TokenFile(data, data)
+
+class TokenFile:
+    '''
+    A loaded token file, tokens is a MappedTokenStore and result the
+    ParseResult or None. Raises ValueError for data that isn't a token
+    file, or one written with another format or VERSION
+    '''
+
+    def __init__(self, data, mapping=None):
+        self.mapping = mapping
+        self.view = memoryview(data)
+        self.views = []
+
+        if (len(self.view) < HEADER.size):
+            raise ValueError("not a Boaz token file")
+        magic, version, typecode, flags, string_count, count, string_size, self.source_length = HEADER.unpack_from(self.view)
+        if (magic != MAGIC):
+            raise ValueError("not a Boaz token file")
+        if (version != FORMAT_VERSION):
+            raise ValueError("unsupported token file format version: {}".format(version))
+        # string 0 is always there, it's the VERSION
+        if (string_count < 1):
+            raise ValueError("corrupt Boaz token file")
+
+        self.offset = HEADER.size
+        kinds = self.section(count, "B")
+        values = self.section(count, "I")
+        starts = ends = None
+        if (flags & FLAG_OFFSETS):
+            starts = self.section(count, typecode.decode())
+            ends = self.section(count, typecode.decode())
+
+        offsets = self.section(string_count + 1, "Q")
+        data = self.section(string_size, "B")
+        if (offsets[0] != 0 or offsets[-1] != string_size or any(offsets[i] > offsets[i+1] for i in range(string_count))):
+            raise ValueError("corrupt Boaz token file")
+        strings = [str(data[offsets[i]:offsets[i+1]], "utf-8", "surrogatepass") for i in range(string_count)]
+        if (strings[0] != VERSION):
+            raise ValueError("token file is from version {}, not {}".format(strings[0], VERSION))
+
+        self.tokens = MappedTokenStore(kinds, values, starts, ends, strings, self.source_length)
+
+        self.result = None
+        if (flags & FLAG_RESULT):
+            self.result = self.read_result(strings)
+
+    def section(self, count, typecode):
+        start = align(self.offset)
+        size = count * struct.calcsize(typecode)
+        if (start + size > len(self.view)):
+            raise ValueError("truncated Boaz token file")
+
+        view = self.view[start:start+size].cast(typecode)
+        self.views.append(view)
+        self.offset = start + size
+        return view
+
+    def read_result(self, strings):
+        self.offset = align(self.offset)
+        if (self.offset + RESULT.size > len(self.view)):
+            raise ValueError("truncated Boaz token file")
+        ok, error_kind, message, max_block_depth, max_expression_depth, symbol_count, offset = RESULT.unpack_from(self.view, self.offset)
+        self.offset += RESULT.size
+
+        symbols = self.section(2 * symbol_count, "I")
+        if (any(index >= len(strings) for index in symbols)):
+            raise ValueError("corrupt Boaz token file")
+        symbol_table = {strings[symbols[i]]: strings[symbols[i+1]] for i in range(0, len(symbols), 2)}
+
+        def string(index):
+            return None if index == NO_STRING else strings[index]
+
+        return ParseResult(
+            bool(ok), string(error_kind), string(message), None if offset == NO_OFFSET else offset,
+            symbol_table, max_block_depth, max_expression_depth
+        )
+
+    def tokenizer(self):
+        '''
+        A Tokenizer session handing out the loaded tokens, for a Parser
+        '''
+        tokenizer = Tokenizer()
+        tokenizer.TOKENS = self.tokens
+        return tokenizer
+
+    def close(self):
+        # views have to go before the mapping they look into
+        for view in self.views:
+            view.release()
+        self.view.release()
+        if (self.mapping is not None):
+            self.mapping.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
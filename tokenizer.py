@@ -1,11 +1,39 @@
+import os
+import re
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from constants import *
-from exceptions import ParserException, TokenizeException
+from exceptions import ParserException, TokenizeException, ResourceLimitException
+from tokenstore import TokenStore, store_class
+from utils import hybridmethod
 
 class Tokenizer:
     CODE = None
     TOKENS = []
     CURRENT_TOKEN = 0
 
+    # token generator that get_next_token pulls from when streaming
+    STREAM = None
+    CHUNK_SIZE = 1 << 16
+
+    # "regex" scans the source in one compiled pass, "parallel" scans
+    # chunks of it in JOBS worker processes (default: one per core),
+    # "legacy" is the original character by character loop, kept so
+    # results can be compared
+    ENGINE = "regex"
+    JOBS = None
+    # sources are only split into chunks of at least this many characters
+    PARALLEL_CHUNK_SIZE = 1 << 22
+
+    # resource budgets (see limits.py) and the monotonic time lexing has
+    # to be done by, None for none. With a DEADLINE the source is lexed
+    # DEADLINE_BATCH tokens at a time, with the clock checked in between
+    LIMITS = None
+    DEADLINE = None
+    DEADLINE_BATCH = 1 << 14
+
     LITERALS = (
         ":=", ",", ";", ")", "("
     ) + ARITHMETIC_OP + BOOLEAN_OP + RELATIONAL_OP + UNARY_OP
@@ -16,15 +44,68 @@ class Tokenizer:
         "print", "program", "then", "while"
     )
 
-    @classmethod
+    # characters that end an identifier or int constant, same set that
+    # gather_chars stops at (whitespace, the 1 character literals and ':')
+    BREAK_CHARS = r"\s,;)(+\-*/&|=<>!:"
+
+    # leading whitespace is folded into every match, then one alternative
+    # per lexeme class, the last one catches anything that can't start a
+    # token so the scan never skips characters
+    MASTER_PATTERN = re.compile(r'''
+        \s*
+        (?:(?P<CHAR_CONST>"[^"]")
+        |(?P<SYMBOL>:=|!=|<=|>=|[,;)(+\-*/&|=<>!])
+        |(?P<WORD>[^"{0}][^{0}]*)
+        |(?P<ERROR>\S))
+    '''.format(BREAK_CHARS), re.VERBOSE)
+
+    KEYWORD_SET = frozenset(KEYWORDS)
+
+    # the same lexemes in ASCII bytes. Whitespace is what \s matches in
+    # a str, and words are told apart by the pattern instead of by
+    # their text, so nothing is sliced out of the source to lex it
+    ASCII_SPACE = r" \t\n\r\x0b\x0c\x1c-\x1f"
+    BYTES_BREAK_CHARS = ASCII_SPACE + BREAK_CHARS[2:]
+    BYTES_MASTER_PATTERN = re.compile(r'''
+        [{0}]*
+        (?:(?P<CHAR_CONST>"[^"]")
+        |(?P<SYMBOL>:=|!=|<=|>=|[,;)(+\-*/&|=<>!])
+        |(?P<KEYWORD>(?:{2})(?![^{1}]))
+        |(?P<IDENTIFIER>[A-Za-z_][^{1}]*)
+        |(?P<INT_CONST>[0-9]+(?![^{1}]))
+        |(?P<BAD_INT>[0-9][^{1}]*)
+        |(?P<BAD_WORD>[^"{1}][^{1}]*)
+        |(?P<ERROR>[^{0}]))
+    '''.format(ASCII_SPACE, BYTES_BREAK_CHARS, "|".join(KEYWORDS)).encode(), re.VERBOSE)
+    BYTES_KINDS = {name: kind for kind, name in enumerate(TOKEN_KINDS)}
+
+    # where a source can be split, no lexeme goes across whitespace or a
+    # ';' unless it's the middle of a char constant, or the text of a
+    # '"' that doesn't start one
+    SPLIT_PATTERN = re.compile(r'(?<!")[ \t\n\r;](?!")')
+    BYTES_SPLIT_PATTERN = re.compile(rb'(?<!")[ \t\n\r;](?!")')
+
+    # bytes sources have to be ASCII, anything else lexes differently
+    # from its decoded text and has to be decoded first
+    NON_ASCII_PATTERN = re.compile(rb"[\x80-\xff]")
+
+    def __init__(self, code=None):
+        self.CODE = code
+        self.TOKENS = []
+        self.CURRENT_TOKEN = 0
+        self.STREAM = None
+        self.LIMITS = None
+        self.DEADLINE = None
+
+    @hybridmethod
     def is_literal(cls, line):
         return line in cls.LITERALS
 
-    @classmethod
+    @hybridmethod
     def is_keyword(cls, line):
         return line in cls.KEYWORDS
 
-    @classmethod
+    @hybridmethod
     def gather_chars(cls, i, char, end):
         token_str = char
         i+=1
@@ -38,8 +119,261 @@ class Tokenizer:
 
         return (token_str, i)
 
-    @classmethod
+    @hybridmethod
     def tokenize(cls):
+        cls.TOKENS = []
+        cls.CURRENT_TOKEN = 0
+
+        # only the regex engine keeps an eye on the clock
+        if (cls.DEADLINE is not None):
+            cls.tokenize_regex()
+        elif (cls.ENGINE == "legacy"):
+            cls.tokenize_legacy()
+        elif (cls.ENGINE == "parallel"):
+            cls.tokenize_parallel()
+        else:
+            cls.tokenize_regex()
+
+    @hybridmethod
+    def tokenize_regex(cls):
+        '''
+        Single pass over the source with MASTER_PATTERN, produces the
+        same tokens and raises on the same lexemes as tokenize_legacy.
+        Tokens are kept as spans of CODE in a TokenStore
+        '''
+        cls.TOKENS = store_class(cls.CODE)(cls.CODE)
+        cls.extend_tokens(cls.generate_spans(cls.CODE))
+
+    @hybridmethod
+    def extend_tokens(cls, spans):
+        '''
+        Appends the spans to TOKENS. With a DEADLINE they're lexed in
+        batches and the clock is checked between them
+        '''
+        if (cls.DEADLINE is None):
+            cls.TOKENS.extend(spans)
+            return
+
+        while (True):
+            count = len(cls.TOKENS)
+            cls.TOKENS.extend(islice(spans, cls.DEADLINE_BATCH))
+            if (len(cls.TOKENS) - count < cls.DEADLINE_BATCH):
+                return
+            if (time.monotonic() > cls.DEADLINE):
+                raise ResourceLimitException("seconds", cls.LIMITS.seconds, cls.TOKENS.starts[-1])
+
+    @hybridmethod
+    def split_points(cls, code, chunks):
+        '''
+        Offsets that cut code into about chunks parts at SPLIT_PATTERN
+        positions, starting with 0 and ending with len(code)
+        '''
+        points = [0]
+        size = max(len(code) // chunks, 1)
+        pattern = cls.SPLIT_PATTERN if isinstance(code, str) else cls.BYTES_SPLIT_PATTERN
+
+        while (True):
+            match = pattern.search(code, points[-1] + size)
+            if (match is None):
+                break
+            points.append(match.start())
+
+        points.append(len(code))
+        return points
+
+    @hybridmethod
+    def tokenize_parallel(cls):
+        '''
+        Same TOKENS and TokenizeException as tokenize_regex, but the chunks
+        of a big source are lexed in a pool of worker processes and
+        their tokens joined back in order. Lexing stops at the first
+        chunk, in source order, that has a bad lexeme
+        '''
+        code = cls.CODE
+        jobs = cls.JOBS or os.cpu_count() or 1
+        chunks = min(jobs * 4, len(code) // cls.PARALLEL_CHUNK_SIZE)
+        if (jobs == 1 or chunks < 2):
+            return cls.tokenize_regex()
+
+        cls.TOKENS = tokens = store_class(code)(code)
+        typecode = tokens.starts.typecode
+        points = cls.split_points(code, chunks)
+        # a chunk's tail, its error text can reach 2 characters past it
+        parts = ((code[start:end+2], start, end-start, typecode) for start, end in zip(points, points[1:]))
+
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        try:
+            for kinds, starts, ends, error in pool.map(lex_chunk, *zip(*parts)):
+                tokens.kinds.frombytes(kinds)
+                tokens.starts.frombytes(starts)
+                tokens.ends.frombytes(ends)
+                if (error is not None):
+                    raise error
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    @hybridmethod
+    def tokenize_all(cls):
+        '''
+        Like tokenize_regex, but a bad lexeme doesn't stop it. Lexing
+        carries on after it and the TokenizeExceptions are returned
+        '''
+        cls.TOKENS = store_class(cls.CODE)(cls.CODE)
+        cls.CURRENT_TOKEN = 0
+        errors = []
+        pos = 0
+
+        while (True):
+            try:
+                cls.extend_tokens(cls.generate_spans(cls.CODE, pos=pos))
+                return errors
+            except TokenizeException as e:
+                errors.append(e)
+                pos = e.offset + len(e.token)
+
+    @hybridmethod
+    def generate_spans(cls, code, final=True, pos=0, endpos=None):
+        '''
+        Yields a (kind code, start, end) span for each token in code. If
+        more source follows (final is False) it stops before any lexeme
+        that reaches the end of code, as it could continue in the next
+        part, and returns where that lexeme starts. Lexing starts at
+        offset pos and stops at endpos, by default the end of code. code
+        is a str, or ASCII bytes-like such as an mmap
+        '''
+        if (not isinstance(code, str)):
+            return (yield from cls.generate_byte_spans(code, final, pos, endpos))
+
+        keywords = cls.KEYWORD_SET
+        end = len(code) if endpos is None else endpos
+
+        for match in cls.MASTER_PATTERN.finditer(code, pos, end):
+            kind = match.lastgroup
+            start = match.start(kind)
+            token_str = match.group(kind)
+
+            if (not final and (match.end() == end or (token_str == '"' and start+3 > end))):
+                return start
+
+            if (kind == "WORD"):
+                char = token_str[0]
+                if ( char.isalpha() or char == "_" ):
+                    if (token_str in keywords):
+                        yield (KEYWORD_KIND, start, match.end())
+                    else:
+                        yield (IDENTIFIER_KIND, start, match.end())
+                elif ( char.isdigit() ):
+                    if (not token_str.isdigit()):
+                        raise TokenizeException(token_str, start)
+                    yield (INT_CONST_KIND, start, match.end())
+                else:
+                    raise TokenizeException(char, start)
+
+            elif (kind == "SYMBOL"):
+                yield (SYMBOL_KIND, start, match.end())
+            elif (kind == "CHAR_CONST"):
+                yield (CHAR_CONST_KIND, start, match.end())
+
+            # a '"' that doesn't open a valid char constant, or a lone ':'
+            elif (token_str == '"'):
+                raise TokenizeException(code[start:start+3], start)
+            else:
+                raise TokenizeException(token_str, start)
+
+        return end
+
+    @hybridmethod
+    def generate_byte_spans(cls, code, final=True, pos=0, endpos=None):
+        '''
+        generate_spans for bytes-like code, the same spans and errors as
+        for the str of ASCII code
+        '''
+        kinds = cls.BYTES_KINDS
+        end = len(code) if endpos is None else endpos
+
+        for match in cls.BYTES_MASTER_PATTERN.finditer(code, pos, end):
+            kind = match.lastgroup
+            start = match.start(kind)
+
+            if (not final and (match.end() == end or (kind == "ERROR" and code[start:start+1] == b'"' and start+3 > end))):
+                return start
+
+            if (kind in kinds):
+                yield (kinds[kind], start, match.end())
+                continue
+
+            # the whole bad int constant, the first character of any
+            # other bad word, a lone '"' with what follows it
+            token = match.group(kind)
+            if (kind == "BAD_WORD"):
+                token = token[:1]
+            elif (token == b'"'):
+                token = code[start:start+3]
+            raise TokenizeException(token.decode("latin-1"), start)
+
+        return end
+
+    @hybridmethod
+    def generate_tokens(cls, chunks):
+        '''
+        Lazily lexes an iterable of source text chunks into (type, value)
+        tokens. A lexeme that reaches the end of a chunk is held back and
+        lexed again together with the following chunk
+        '''
+        buffer = ""
+        chunks = iter(chunks)
+        # offset of the buffer in the whole source
+        base = 0
+
+        while (True):
+            chunk = next(chunks, None)
+            final = chunk is None
+            if (not final):
+                buffer += chunk
+
+            spans = cls.generate_spans(buffer, final)
+            while (True):
+                try:
+                    kind, start, end = next(spans)
+                except StopIteration as stop:
+                    carry = stop.value
+                    break
+                except TokenizeException as e:
+                    e.offset += base
+                    raise
+                yield (TOKEN_KINDS[kind], buffer[start:end])
+
+            if (final):
+                return
+            buffer = buffer[carry:]
+            base += carry
+
+    @hybridmethod
+    def read_chunks(cls, f, size=None):
+        size = size or cls.CHUNK_SIZE
+        return iter(lambda: f.read(size), "")
+
+    @hybridmethod
+    def stream(cls, f):
+        '''
+        Tokens are lexed from the open file f as get_next_token asks for
+        them, instead of materialising TOKENS up front
+        '''
+        cls.STREAM = cls.generate_tokens(cls.read_chunks(f))
+        cls.CURRENT_TOKEN = 0
+
+    @hybridmethod
+    def finish_stream(cls):
+        '''
+        Lexes whatever the parser didn't ask for, so a bad lexeme after
+        the last parsed token is still reported like tokenize would
+        '''
+        for _ in cls.STREAM:
+            pass
+        cls.STREAM = None
+
+    @hybridmethod
+    def tokenize_legacy(cls):
         i = 0
         end = len(cls.CODE)
 
@@ -62,9 +396,10 @@ class Tokenizer:
             
             # check if character is a digit
             elif ( char.isdigit() ):
+                start = i
                 token_str, i = cls.gather_chars(i, char, end)
                 if (not token_str.isdigit()):
-                    raise TokenizeException(token_str)
+                    raise TokenizeException(token_str, start)
 
                 cls.TOKENS.append( ("INT_CONST", token_str) )
 
@@ -75,7 +410,7 @@ class Tokenizer:
                     cls.TOKENS.append( ("CHAR_CONST", token_str))
                     i+=2
                 else:
-                    raise TokenizeException(token_str)
+                    raise TokenizeException(token_str, i)
 
             # the rest are symbols, 1 or 2 character literals
             else:
@@ -90,11 +425,51 @@ class Tokenizer:
                         cls.TOKENS.append( ("SYMBOL", token_str))
                     else:
                         # can't be tokenised, most likely error
-                        raise TokenizeException(token_str)
+                        raise TokenizeException(token_str, i)
             i+=1
 
-    @classmethod
+    @hybridmethod
+    def token_offset(cls, index):
+        '''
+        Source offset of token number index, or the end of CODE if there
+        are fewer tokens. Only TokenStore tokens keep their offsets, for
+        any other CODE is lexed again up to that token
+        '''
+        tokens = cls.TOKENS
+        if (not isinstance(tokens, TokenStore)):
+            tokens = store_class(cls.CODE)(cls.CODE)
+            tokens.extend(islice(cls.generate_spans(cls.CODE), index+1))
+
+        if (index < len(tokens)):
+            return tokens.starts[index]
+        return tokens.source_length()
+
+    @hybridmethod
+    def error_offset(cls, error):
+        '''
+        Source offset of error, unless it already has one it's at the
+        last token read, or past the last token if they ran out
+        '''
+        if (error.offset is None):
+            index = cls.CURRENT_TOKEN
+            if (not isinstance(error, ParserException) or error.type != "MISSING"):
+                index -= 1
+            error.offset = cls.token_offset(index)
+
+        return error.offset
+
+    @hybridmethod
     def get_next_token(cls):
+        if (cls.STREAM is not None):
+            # stream exhausted because eof is reached instead of a keyword
+            try:
+                token = next(cls.STREAM)
+            except StopIteration:
+                raise ParserException("MISSING", "MISSING")
+
+            cls.CURRENT_TOKEN += 1
+            return token
+
         # index error because eof is reached instead of a keyword
         try:
             token = cls.TOKENS[cls.CURRENT_TOKEN]
@@ -103,3 +478,22 @@ class Tokenizer:
 
         cls.CURRENT_TOKEN += 1
         return token
+
+def lex_chunk(chunk, base, length, typecode):
+    '''
+    Worker side of Tokenizer.tokenize_parallel, lexes the first length
+    characters of chunk, which is at offset base in the source. Returns
+    the token arrays as bytes, with offsets into the whole source, and
+    the TokenizeException that stopped it or None
+    '''
+    tokens = TokenStore(chunk)
+    error = None
+    try:
+        tokens.extend(Tokenizer.generate_spans(chunk, endpos=length))
+    except TokenizeException as e:
+        e.offset += base
+        error = e
+
+    starts = array(typecode, map(base.__add__, tokens.starts))
+    ends = array(typecode, map(base.__add__, tokens.ends))
+    return (tokens.kinds.tobytes(), starts.tobytes(), ends.tobytes(), error)
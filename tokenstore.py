@@ -0,0 +1,112 @@
+import struct
+from array import array
+from constants import TOKEN_KINDS
+
+class TokenStore:
+    '''
+    Compact token list, one kind code per token in an array('B') and the
+    start/end offsets of its lexeme in the source in two unsigned int
+    arrays. A token's value is only sliced out of the source when the
+    token is read, as the usual (type, value) tuple
+    '''
+
+    # offset typecode and token count in front of the dumped arrays
+    HEADER = struct.Struct("<cQ")
+
+    def __init__(self, code):
+        self.code = code
+        # 4 byte offsets unless the source is too big for them
+        offset_type = "I" if len(code) < 2**32 else "Q"
+        self.kinds = array("B")
+        self.starts = array(offset_type)
+        self.ends = array(offset_type)
+
+    def dumps(self):
+        '''
+        The token arrays as bytes, the source isn't included
+        '''
+        header = self.HEADER.pack(self.starts.typecode.encode(), len(self.kinds))
+        return header + self.kinds.tobytes() + self.starts.tobytes() + self.ends.tobytes()
+
+    @classmethod
+    def loads(cls, code, data):
+        '''
+        Rebuilds a store dumped from tokenizing code
+        '''
+        store = cls(code)
+        typecode, count = cls.HEADER.unpack_from(data)
+        offset = cls.HEADER.size
+        store.starts = array(typecode.decode())
+        store.ends = array(typecode.decode())
+
+        for tokens in (store.kinds, store.starts, store.ends):
+            size = count * tokens.itemsize
+            tokens.frombytes(data[offset:offset+size])
+            offset += size
+
+        return store
+
+    def append(self, kind, start, end):
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def extend(self, spans):
+        '''
+        spans is an iterable of (kind, start, end), tokens appended before
+        it raises are kept
+        '''
+        kinds, starts, ends = self.kinds.append, self.starts.append, self.ends.append
+        for kind, start, end in spans:
+            kinds(kind)
+            starts(start)
+            ends(end)
+
+    def kind(self, index):
+        return TOKEN_KINDS[self.kinds[index]]
+
+    def source_length(self):
+        return len(self.code)
+
+    def iter_values(self):
+        return map(self.code.__getitem__, map(slice, self.starts, self.ends))
+
+    def value(self, index):
+        return self.code[self.starts[index]:self.ends[index]]
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        return (TOKEN_KINDS[self.kinds[index]], self.code[self.starts[index]:self.ends[index]])
+
+    def __iter__(self):
+        code = self.code
+        for kind, start, end in zip(self.kinds, self.starts, self.ends):
+            yield (TOKEN_KINDS[kind], code[start:end])
+
+class BytesTokenStore(TokenStore):
+    '''
+    TokenStore over ASCII source bytes, e.g. an mmap of the file, values
+    are only decoded as tokens are read
+    '''
+
+    def value(self, index):
+        return self.code[self.starts[index]:self.ends[index]].decode("latin-1")
+
+    def iter_values(self):
+        return (value.decode("latin-1") for value in super().iter_values())
+
+    def __getitem__(self, index):
+        return (TOKEN_KINDS[self.kinds[index]], self.code[self.starts[index]:self.ends[index]].decode("latin-1"))
+
+    def __iter__(self):
+        code = self.code
+        for kind, start, end in zip(self.kinds, self.starts, self.ends):
+            yield (TOKEN_KINDS[kind], code[start:end].decode("latin-1"))
+
+def store_class(code):
+    '''
+    The TokenStore class for tokens of code, a str or bytes-like
+    '''
+    return TokenStore if isinstance(code, str) else BytesTokenStore
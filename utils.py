@@ -0,0 +1,16 @@
+class hybridmethod:
+    '''
+    Works like classmethod when called on the class, but binds to the
+    instance when called on one. The class attributes then act as a
+    shared default session and each instance shadows them with its own
+    state, so the old classmethod API keeps working unchanged
+    '''
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, objtype=None):
+        if (obj is None):
+            return self.func.__get__(objtype, type(objtype))
+        return self.func.__get__(obj, objtype)
@@ -0,0 +1,211 @@
+import mmap
+from exceptions import TokenizeException, ParserException, ParserSemanticException, ResourceLimitException
+from lineindex import LineIndex
+from tokenizer import Tokenizer
+from tokenstore import TokenStore, store_class
+from myparser import Parser
+
+class BoazValidator:
+    '''
+    One validation session. It owns its own Tokenizer and Parser
+    instances (token stream and symbol table), so any number of them
+    can run side by side, e.g. from a thread pool in a long-lived service
+    '''
+
+    ERRORS = (TokenizeException, ParserException, ParserSemanticException, ResourceLimitException)
+
+    # sources that are lexed whole, anything else is a file to stream
+    WHOLE_SOURCES = (str, bytes, bytearray, mmap.mmap)
+
+    # how much of the analysis is run, each one a cheaper filter than the
+    # next: only lexing, lexing and parsing, or also the semantic checks
+    TIERS = ("lex", "syntax", "full")
+
+    def __init__(self, source, cache=None, cache_tokens=False, stats=None, recover=False, tier="full", limits=None):
+        '''
+        source is either the program text, as a str or as ASCII bytes
+        such as an mmap of the file (lexed without decoding it), or an
+        open text file, which is then streamed to the parser. With a ParseCache, a source that was
+        validated before is answered from it, cache_tokens also stores
+        the tokens of program texts. stats is an optional Stats that
+        records timings and counters of the run. With recover, analysis
+        carries on after errors and all of them are kept in self.errors.
+        tier is one of TIERS, a source that passes a tier can still fail
+        a later one. With Limits, going over any of them stops the run
+        with a ResourceLimitException as the error
+        '''
+        if (tier not in self.TIERS):
+            raise ValueError("unknown tier: {}".format(tier))
+
+        self.source = source
+        self.streamed = not isinstance(source, self.WHOLE_SOURCES)
+        self.tokenizer = Tokenizer()
+        self.parser = Parser(self.tokenizer)
+        self.parser.SEMANTIC_CHECKS = tier == "full"
+        self.tier = tier
+        self.limits = limits
+        self.cache = cache
+        self.cache_tokens = cache_tokens
+        self.error = None
+        self.error_kind = None
+        self.cached = False
+        self.line_index = None
+        self.recover = recover
+        self.errors = []
+
+        self.stats = stats
+        if (stats is not None):
+            stats.instrument(self)
+
+    def run(self):
+        '''
+        Returns True if the program is valid Boaz, otherwise False with
+        the exception that stopped the analysis kept in self.error and
+        its class name in self.error_kind. Verdicts answered from the
+        cache only have the error_kind
+        '''
+        if (self.recover):
+            ok = self.validate_all()
+        elif (self.cache is not None):
+            ok = self.run_cached()
+        else:
+            ok = self.validate()
+
+        if (self.stats is not None):
+            self.stats.collect(self)
+        return ok
+
+    def validate(self):
+        lex_only = self.tier == "lex"
+        try:
+            self.start_limits()
+            if (not self.streamed):
+                self.tokenizer.CODE = self.source
+                self.tokenizer.tokenize()
+                self.check_tokens()
+                if (not lex_only):
+                    self.parser.parse()
+            else:
+                self.stream()
+                if (not lex_only):
+                    self.parser.parse()
+                self.tokenizer.finish_stream()
+        except self.ERRORS as e:
+            self.error = e
+            self.error_kind = type(e).__name__
+            return False
+
+        return True
+
+    def validate_all(self):
+        '''
+        One pass that finds every error, lexical ones first skip the bad
+        lexeme, the parser then recovers from the rest, see Parser.parse_all
+        '''
+        self.source_text()
+        try:
+            self.start_limits()
+            errors = self.tokenizer.tokenize_all()
+            self.check_tokens()
+        except ResourceLimitException as e:
+            errors = [e]
+        else:
+            if (self.tier != "lex"):
+                errors += self.parser.parse_all()
+        self.errors = sorted(errors, key=lambda e: e.offset)
+
+        if (self.errors):
+            self.error = self.errors[0]
+            self.error_kind = type(self.error).__name__
+            return False
+
+        return True
+
+    def start_limits(self):
+        '''
+        Hands the limits to the parser and starts the clock, a source
+        that is there whole is checked for size before it's lexed
+        '''
+        if (self.limits is None):
+            return
+
+        self.parser.LIMITS = self.tokenizer.LIMITS = self.limits
+        self.parser.DEADLINE = self.tokenizer.DEADLINE = self.limits.deadline()
+        if (not self.streamed or self.tokenizer.CODE is not None):
+            self.limits.check_source(self.source_text())
+
+    def check_tokens(self):
+        # lexing a whole source can't be stopped part way through
+        if (self.limits is not None):
+            self.limits.check_tokens(self.tokenizer.TOKENS)
+            self.parser.check_deadline()
+
+    def stream(self):
+        tokenizer = self.tokenizer
+        tokenizer.stream(self.source)
+        if (self.limits is not None):
+            chunks = self.limits.sized(tokenizer.read_chunks(self.source))
+            tokenizer.STREAM = self.limits.counted(tokenizer.generate_tokens(chunks))
+
+    def error_offset(self, error=None):
+        '''
+        Source offset of error, by default self.error. Tokenizer errors
+        know theirs, parser errors are at the last token read or at the
+        end of the source if it ran out of tokens. None without an error
+        object
+        '''
+        error = error or self.error
+        if (error is None):
+            return None
+
+        self.source_text()
+        return self.tokenizer.error_offset(error)
+
+    def source_text(self):
+        if (self.tokenizer.CODE is None):
+            if (not self.streamed):
+                self.tokenizer.CODE = self.source
+            else:
+                # a streamed file is only read whole once it's needed
+                self.source.seek(0)
+                self.tokenizer.CODE = self.source.read()
+        return self.tokenizer.CODE
+
+    def error_position(self, error=None):
+        '''
+        1-based (line, column) of error, by default self.error, or None
+        '''
+        offset = self.error_offset(error)
+        if (offset is None):
+            return None
+
+        if (self.line_index is None):
+            self.line_index = LineIndex(self.source_text())
+        return self.line_index.position(offset)
+
+    def run_cached(self):
+        key = self.cache.key(self.source, self.tier)
+        hit = self.cache.get(key)
+
+        if (hit is not None):
+            ok, self.error_kind, tokens = hit
+            self.cached = True
+            if (tokens is not None and not self.streamed):
+                self.tokenizer.CODE = self.source
+                self.tokenizer.TOKENS = store_class(self.source).loads(self.source, tokens)
+            return ok
+
+        # hashing read the file to its end
+        if (self.streamed):
+            self.source.seek(0)
+
+        ok = self.validate()
+
+        tokens = None
+        if (self.cache_tokens and isinstance(self.tokenizer.TOKENS, TokenStore) and not isinstance(self.error, TokenizeException)):
+            tokens = self.tokenizer.TOKENS.dumps()
+
+        # running out of budget says nothing about the source
+        if (not isinstance(self.error, ResourceLimitException)):
+            self.cache.put(key, ok, self.error_kind, tokens)
+        return ok
@@ -0,0 +1,104 @@
+import sys
+from compiler import *
+from exceptions import BoazRuntimeException
+
+class VM:
+    '''
+    Runs Bytecode on an operand stack. Arithmetic is on Python ints, '/'
+    truncates towards zero, storing to a char variable keeps the low 8
+    bits. '&', '|' and '!' are logical, any non-zero value is true, and
+    both sides of '&' and '|' are always evaluated. print writes one
+    line per value, bools as true or false
+    '''
+
+    def __init__(self, bytecode, out=None):
+        self.bytecode = bytecode
+        self.out = out or sys.stdout
+        # variables start out as 0
+        self.slots = [0] * len(bytecode.names)
+
+    def variables(self):
+        return dict(zip(self.bytecode.names, self.slots))
+
+    def run(self):
+        code = self.bytecode.code
+        slots = self.slots
+        write = self.out.write
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+
+        # one comparison chain instead of a call per instruction, the
+        # common opcodes are tested first
+        while (True):
+            op = code[pc]
+
+            if (op < ADD):
+                if (op == LOAD):
+                    push(slots[code[pc+1]])
+                elif (op == CONST):
+                    push(code[pc+1])
+                elif (op == STORE):
+                    slots[code[pc+1]] = pop()
+                else:
+                    slots[code[pc+1]] = pop() & 0xFF
+                pc += 2
+            elif (op < NEG):
+                right = pop()
+                if (op == ADD):
+                    stack[-1] += right
+                elif (op == SUB):
+                    stack[-1] -= right
+                elif (op == LT):
+                    stack[-1] = stack[-1] < right
+                elif (op == GT):
+                    stack[-1] = stack[-1] > right
+                elif (op == EQ):
+                    stack[-1] = stack[-1] == right
+                elif (op == NE):
+                    stack[-1] = stack[-1] != right
+                elif (op == LE):
+                    stack[-1] = stack[-1] <= right
+                elif (op == GE):
+                    stack[-1] = stack[-1] >= right
+                elif (op == MUL):
+                    stack[-1] *= right
+                elif (op == DIV):
+                    stack[-1] = self.divide(stack[-1], right)
+                elif (op == AND):
+                    stack[-1] = bool(stack[-1]) and bool(right)
+                else:
+                    stack[-1] = bool(stack[-1]) or bool(right)
+                pc += 1
+            elif (op == JUMP_IF_TRUE):
+                pc = code[pc+1] if pop() else pc+2
+            elif (op == JUMP_IF_FALSE):
+                pc = pc+2 if pop() else code[pc+1]
+            elif (op == JUMP):
+                pc = code[pc+1]
+            elif (op == NEG):
+                stack[-1] = -stack[-1]
+                pc += 1
+            elif (op == NOT):
+                stack[-1] = not stack[-1]
+                pc += 1
+            elif (op == PRINT_INT):
+                write("{}\n".format(int(pop())))
+                pc += 1
+            elif (op == PRINT_CHAR):
+                write(chr(pop() & 0xFF) + "\n")
+                pc += 1
+            elif (op == PRINT_BOOL):
+                write("true\n" if pop() else "false\n")
+                pc += 1
+            else:
+                return
+
+    @staticmethod
+    def divide(left, right):
+        if (right == 0):
+            raise BoazRuntimeException("Division by zero")
+
+        quotient = abs(left) // abs(right)
+        return quotient if (left < 0) == (right < 0) else -quotient